@@ -1,35 +1,139 @@
+import time
+
 import frappe
+from frappe import _
+from frappe.utils import add_to_date, now_datetime
+
+from lms.lms.mailer import send_bulk_mail
+
+ANNOUNCEMENT_CHUNK_SIZE = 500
+# seconds to wait between chunks so large sites don't flood the mail queue
+ANNOUNCEMENT_CHUNK_INTERVAL = 2
+ANNOUNCEMENT_JOB_TIMEOUT = 3600
+
 
 def notify_users_on_new_course(doc, method):
-    """Send email to all active users when a new course is added"""
-    course_title = doc.title
-    course_link = frappe.utils.get_url(f"/lms/courses/{doc.name}")
-    sender = frappe.session.user or "Administrator"
-
-    # Get all users except Guest
-    users = frappe.get_all("User", filters={"enabled": 1}, fields=["email"])
-    recipient_emails = [u.email for u in users if u.email and u.email != "guest@example.com"]
-
-    if not recipient_emails:
-        frappe.logger().info("No recipients found for course notification.")
-        return
-
-    subject = f"New Course Added: {course_title}"
-    message = f"""
-    <p>Hello,</p>
-    <p>A new course <b>{course_title}</b> has just been uploaded to the LMS.</p>
-    <p>You can check it out here: <a href="{course_link}">{course_link}</a></p>
-    <br>
-    <p>Best regards,<br>Your LMS Team</p>
-    """
-
-    # Send the email
-    frappe.sendmail(
-        recipients=recipient_emails,
-        sender=sender,
-        subject=subject,
-        message=message,
-        delayed=False  # Set to True if you want to queue it for later sending
-    )
-
-    frappe.logger().info(f"Sent new course notification for '{course_title}' to {len(recipient_emails)} users.")
+	"""Queue an announcement to all active users when a course is published"""
+	if not doc.published or not doc.has_value_changed("published"):
+		return
+
+	if frappe.db.exists("LMS Course Announcement", {"course": doc.name}):
+		return
+
+	announcement = frappe.get_doc({"doctype": "LMS Course Announcement", "course": doc.name})
+	announcement.insert(ignore_permissions=True)
+	enqueue_announcement(announcement.name)
+
+
+def enqueue_announcement(announcement):
+	frappe.enqueue(
+		send_course_announcement,
+		queue="long",
+		timeout=ANNOUNCEMENT_JOB_TIMEOUT,
+		job_id=f"lms_course_announcement::{announcement}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		announcement=announcement,
+	)
+
+
+@frappe.whitelist()
+def resume_course_announcement(announcement):
+	frappe.only_for("System Manager")
+	status = frappe.db.get_value("LMS Course Announcement", announcement, "status")
+	if status == "Completed":
+		frappe.throw(_("This announcement has already been sent."))
+
+	frappe.db.set_value("LMS Course Announcement", announcement, {"status": "Queued", "error": None})
+	enqueue_announcement(announcement)
+
+
+def send_course_announcement(announcement):
+	"""Mails the course announcement to every enabled user.
+
+	Users are read in chunks ordered by name, and the last user of each
+	chunk is saved on the announcement once that chunk is queued. A failed
+	or interrupted run continues from there when it is resumed.
+	"""
+	announcement = frappe.get_doc("LMS Course Announcement", announcement)
+	if announcement.status == "Completed":
+		return
+
+	course = frappe.db.get_value("LMS Course", announcement.course, ["name", "title"], as_dict=1)
+	subject, message = get_announcement_content(course)
+	announcement.db_set(
+		{"status": "In Progress", "started_on": announcement.started_on or now_datetime()}, commit=True
+	)
+
+	try:
+		while True:
+			users = get_users_after(announcement.last_recipient)
+			if not users:
+				break
+
+			sent = send_bulk_mail(
+				"new_course_announcement",
+				[user for user in users if user not in ("Guest", "Administrator")],
+				subject=subject,
+				message=message,
+				reference_doctype="LMS Course",
+				reference_name=course.name,
+			)
+			announcement.db_set(
+				{"last_recipient": users[-1], "recipients": announcement.recipients + sent}, commit=True
+			)
+			time.sleep(ANNOUNCEMENT_CHUNK_INTERVAL)
+
+	except Exception:
+		frappe.db.rollback()
+		announcement.db_set({"status": "Failed", "error": frappe.get_traceback()}, commit=True)
+		frappe.log_error(title=f"Course announcement failed for {course.name}")
+		return
+
+	announcement.db_set({"status": "Completed", "completed_on": now_datetime()}, commit=True)
+	frappe.logger().info(
+		f"Queued new course notification for '{course.title}' to {announcement.recipients} users."
+	)
+
+
+def fail_stale_announcements():
+	"""Marks announcements Failed when their job has made no progress for
+	longer than it is allowed to run, e.g. because the worker was killed,
+	so that they can be resumed."""
+	stale = frappe.get_all(
+		"LMS Course Announcement",
+		{
+			"status": ["in", ["Queued", "In Progress"]],
+			"modified": ["<", add_to_date(now_datetime(), seconds=-ANNOUNCEMENT_JOB_TIMEOUT)],
+		},
+		pluck="name",
+	)
+	for announcement in stale:
+		frappe.db.set_value(
+			"LMS Course Announcement",
+			announcement,
+			{"status": "Failed", "error": _("The announcement job stopped without finishing.")},
+		)
+
+
+def get_users_after(last_recipient):
+	filters = {"enabled": 1}
+	if last_recipient:
+		filters["name"] = [">", last_recipient]
+
+	return frappe.get_all(
+		"User", filters=filters, pluck="name", order_by="name asc", limit=ANNOUNCEMENT_CHUNK_SIZE
+	)
+
+
+def get_announcement_content(course):
+	course_link = frappe.utils.get_url(f"/lms/courses/{course.name}")
+	subject = f"New Course Added: {course.title}"
+	message = f"""
+	<p>Hello,</p>
+	<p>A new course <b>{course.title}</b> has just been uploaded to the LMS.</p>
+	<p>You can check it out here: <a href="{course_link}">{course_link}</a></p>
+	<br>
+	<p>Best regards,<br>Your LMS Team</p>
+	"""
+	return subject, message
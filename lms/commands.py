@@ -0,0 +1,22 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-revenue-summary")
+@pass_context
+def rebuild_revenue_summary(context):
+	"Recompute LMS Revenue Summary from payments with a submitted invoice"
+	from lms.lms.doctype.lms_revenue_summary.lms_revenue_summary import rebuild_revenue_summary as rebuild
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		rows = rebuild()
+		frappe.db.commit()
+		click.echo(f"Rebuilt {rows} revenue summary rows")
+	finally:
+		frappe.destroy()
+
+
+commands = [rebuild_revenue_summary]
@@ -106,24 +106,84 @@ doc_events = {
 	"User": {
 		"validate": "lms.lms.user.validate_username_duplicates",
 		"after_insert": "lms.lms.user.after_insert",
+		"on_update": [
+			"lms.lms.user_cards.clear_user_card",
+			"lms.lms.route_meta.update_document_meta",
+		],
+		"on_trash": [
+			"lms.lms.user_cards.clear_user_card",
+			"lms.lms.route_meta.clear_document_meta",
+		],
 	},
 	"LMS Course": {
-			"after_insert": "lms.api.course_notifications.notify_users_on_new_course"
+		"on_update": [
+			"lms.api.course_notifications.notify_users_on_new_course",
+			"lms.page_renderers.clear_guest_page_cache",
+			"lms.lms.route_meta.update_document_meta",
+		],
+		"on_trash": [
+			"lms.page_renderers.clear_guest_page_cache",
+			"lms.lms.route_meta.clear_document_meta",
+		],
+	},
+	"LMS Course Review": {
+		"on_update": "lms.page_renderers.clear_guest_page_cache",
+		"on_trash": "lms.page_renderers.clear_guest_page_cache",
+	},
+	"LMS Category": {
+		"on_update": [
+			"lms.page_renderers.clear_guest_page_cache",
+			"lms.www.lms.clear_shell_context",
+		],
+		"on_trash": [
+			"lms.page_renderers.clear_guest_page_cache",
+			"lms.www.lms.clear_shell_context",
+		],
+	},
+	"LMS Batch": {
+		"on_update": "lms.lms.route_meta.update_document_meta",
+		"on_trash": "lms.lms.route_meta.clear_document_meta",
+	},
+	"Job Opportunity": {
+		"on_update": "lms.lms.route_meta.update_document_meta",
+		"on_trash": "lms.lms.route_meta.clear_document_meta",
+	},
+	"LMS Badge": {
+		"on_update": "lms.lms.route_meta.update_document_meta",
+		"on_trash": "lms.lms.route_meta.clear_document_meta",
+	},
+	"LMS Quiz": {
+		"on_update": "lms.lms.route_meta.update_document_meta",
+		"on_trash": "lms.lms.route_meta.clear_document_meta",
+	},
+	"LMS Assignment": {
+		"on_update": "lms.lms.route_meta.update_document_meta",
+		"on_trash": "lms.lms.route_meta.clear_document_meta",
+	},
+	"LMS Settings": {"on_update": "lms.lms.route_meta.clear_route_meta"},
+	"Website Settings": {"on_update": "lms.lms.route_meta.clear_route_meta"},
+	"Website Route Meta": {
+		"on_update": "lms.lms.route_meta.clear_route_meta",
+		"on_trash": "lms.lms.route_meta.clear_route_meta",
 	},
-	"LMS Payment": {
-		"after_insert": "lms.api.invoice.create_invoice_for_payment",
-		"on_update": "lms.api.invoice.create_invoice_for_payment"
-	}
 }
 
 # Scheduled Tasks
 # ---------------
 scheduler_events = {
+	"all": [
+		"lms.lms.doctype.lms_webhook_event.lms_webhook_event.retry_webhook_events",
+		"lms.lms.scorm_runtime.flush_dirty_attempts",
+	],
 	"hourly": [
 		"lms.lms.doctype.lms_certificate_request.lms_certificate_request.schedule_evals",
 		"lms.lms.api.update_course_statistics",
 		"lms.lms.doctype.lms_certificate_request.lms_certificate_request.mark_eval_as_completed",
 		"lms.lms.doctype.lms_live_class.lms_live_class.update_attendance",
+		"lms.api.course_notifications.fail_stale_announcements",
+	],
+	"hourly_long": [
+		"lms.lms.doctype.lms_course_analytics.lms_course_analytics.refresh_course_analytics",
 	],
 	"daily": [
 		"lms.job.doctype.job_opportunity.job_opportunity.update_job_openings",
@@ -209,6 +269,8 @@ update_website_context = [
 	"lms.widgets.update_website_context",
 ]
 
+after_request = ["lms.widgets.add_server_timing"]
+
 jinja = {
 	"methods": [
 		"lms.lms.utils.get_signup_optin_checks",
@@ -254,6 +316,7 @@ lms_markdown_macro_renderers = {
 
 page_renderer = [
 	"lms.page_renderers.SCORMRenderer",
+	"lms.page_renderers.GuestPageRenderer",
 ]
 
 # set this to "/" to have profiles on the top-level
@@ -274,9 +337,3 @@ add_to_apps_screen = [
 		"has_permission": "lms.lms.api.check_app_permission",
 	}
 ]
-
-# hooks.py - Add to your LMS app hooks
-def after_payment_processed(payment_name):
-    """Hook to run after payment is processed"""
-    from lms.lms.doctype.lms_invoice.lms_invoice import create_invoice_from_payment
-    create_invoice_from_payment(payment_name)
\ No newline at end of file
@@ -2,11 +2,7 @@
 
 import json
 import os
-import re
 import shutil
-import xml.etree.ElementTree as ET
-import zipfile
-from xml.dom.minidom import parseString
 
 import frappe
 from frappe import _
@@ -19,6 +15,7 @@ from frappe.translate import get_all_translations
 from frappe.utils import (
 	add_days,
 	cint,
+	cstr,
 	date_diff,
 	flt,
 	format_date,
@@ -28,7 +25,8 @@ from frappe.utils import (
 from frappe.utils.response import Response
 
 from lms.lms.doctype.course_lesson.course_lesson import save_progress
-from lms.lms.utils import get_average_rating, get_lesson_count
+from lms.lms.scorm import clear_file_index, enqueue_ingest
+from lms.lms.user_cards import get_user_cards
 
 
 @frappe.whitelist()
@@ -892,21 +890,96 @@ def get_new_gateway_fields(doctype):
 
 
 def update_course_statistics():
-	courses = frappe.get_all("LMS Course", fields=["name"])
+	"""Corrects any drift in the lessons, enrollments and rating counters of
+	courses, which are otherwise kept up to date as records change. Uses
+	one grouped query per counter for all courses and only writes the
+	courses whose counters differ."""
+	lessons = dict(
+		frappe.db.sql(
+			"""
+			SELECT cr.parent, COUNT(lr.name)
+			FROM `tabChapter Reference` cr
+			JOIN `tabLesson Reference` lr ON lr.parent = cr.chapter
+			WHERE cr.parenttype = 'LMS Course'
+			GROUP BY cr.parent
+			"""
+		)
+	)
+	enrollments = dict(
+		frappe.db.sql(
+			"""
+			SELECT course, COUNT(*)
+			FROM `tabLMS Enrollment`
+			WHERE member_type = 'Student'
+			GROUP BY course
+			"""
+		)
+	)
+	ratings = dict(
+		frappe.db.sql(
+			"""
+			SELECT course, AVG(rating)
+			FROM `tabLMS Course Review`
+			GROUP BY course
+			"""
+		)
+	)
 
-	for course in courses:
-		lessons = get_lesson_count(course.name)
+	for course in frappe.get_all("LMS Course", fields=["name", "lessons", "enrollments", "rating"]):
+		values = {
+			"lessons": lessons.get(course.name, 0),
+			"enrollments": enrollments.get(course.name, 0),
+			"rating": get_rating_value(ratings.get(course.name)),
+		}
+		if any(cstr(course[field]) != cstr(value) for field, value in values.items()):
+			frappe.db.set_value("LMS Course", course.name, values, update_modified=False)
+
+
+def update_course_lessons(course):
+	lessons = frappe.db.sql(
+		"""
+		SELECT COUNT(lr.name)
+		FROM `tabChapter Reference` cr
+		JOIN `tabLesson Reference` lr ON lr.parent = cr.chapter
+		WHERE cr.parent = %s AND cr.parenttype = 'LMS Course'
+		""",
+		course,
+	)[0][0]
+	frappe.db.set_value("LMS Course", course, "lessons", lessons, update_modified=False)
+
+
+def update_course_enrollments(course, change):
+	"""Adds `change` to the enrollment count in place, so concurrent
+	enrollments don't overwrite each other's count."""
+	frappe.db.sql(
+		"""
+		UPDATE `tabLMS Course`
+		SET enrollments = GREATEST(COALESCE(enrollments, 0) + %s, 0)
+		WHERE name = %s
+		""",
+		(change, course),
+	)
+	frappe.clear_document_cache("LMS Course", course)
 
-		enrollments = frappe.db.count("LMS Enrollment", {"course": course.name, "member_type": "Student"})
 
-		avg_rating = get_average_rating(course.name) or 0
-		avg_rating = flt(avg_rating, frappe.get_system_settings("float_precision") or 3)
+def update_course_rating(course):
+	average = frappe.db.sql("SELECT AVG(rating) FROM `tabLMS Course Review` WHERE course = %s", course)[0][0]
+	frappe.db.set_value("LMS Course", course, "rating", get_rating_value(average), update_modified=False)
 
-		frappe.db.set_value(
-			"LMS Course",
-			course.name,
-			{"lessons": lessons, "enrollments": enrollments, "rating": avg_rating},
-		)
+
+def get_rating_value(average):
+	"""Reviews store the rating as a fraction of the maximum number of stars,
+	while the course shows it in stars."""
+	if not average:
+		return 0
+	return flt(average * get_rating_scale(), frappe.get_system_settings("float_precision") or 3)
+
+
+def get_rating_scale():
+	out_of_ratings = frappe.db.get_all(
+		"DocField", {"parent": "LMS Course Review", "fieldtype": "Rating"}, ["options"]
+	)
+	return cint(len(out_of_ratings) and out_of_ratings[0].options) or 5
 
 
 @frappe.whitelist()
@@ -929,8 +1002,10 @@ def get_announcements(batch):
 		order_by="communication_date desc",
 	)
 
+	senders = get_user_cards([communication.sender for communication in communications])
 	for communication in communications:
-		communication.image = frappe.get_cached_value("User", communication.sender, "user_image")
+		sender = senders.get(communication.sender)
+		communication.image = sender and sender.user_image
 
 	return communications
 
@@ -1022,100 +1097,37 @@ def give_discussions_permission():
 def upsert_chapter(title, course, is_scorm_package, scorm_package, name=None):
 	values = frappe._dict({"title": title, "course": course, "is_scorm_package": is_scorm_package})
 
-	if is_scorm_package:
-		scorm_package = frappe._dict(scorm_package)
-		extract_path = extract_package(course, title, scorm_package)
-
-		values.update(
-			{
-				"scorm_package": scorm_package.name,
-				"scorm_package_path": extract_path.split("public")[1],
-				"manifest_file": get_manifest_file(extract_path).split("public")[1],
-				"launch_file": get_launch_file(extract_path).split("public")[1],
-			}
-		)
-
 	if name:
 		chapter = frappe.get_doc("Course Chapter", name)
 	else:
 		chapter = frappe.new_doc("Course Chapter")
 
+	package = None
+	if is_scorm_package:
+		package = scorm_package.get("name") if isinstance(scorm_package, dict) else scorm_package
+		values.scorm_package = package
+
+	# the package is extracted in the background, again whenever it or the
+	# folder it goes to (named after the title) changes
+	ingest = package and (
+		chapter.is_new()
+		or chapter.scorm_package != package
+		or chapter.title != title
+		or chapter.scorm_ingest_status != "Ready"
+	)
+
 	chapter.update(values)
 	chapter.save()
 
+	if ingest:
+		enqueue_ingest(chapter.name, package, title)
+
 	if is_scorm_package and not len(chapter.lessons):
 		add_lesson(title, chapter.name, course, 1)
 
 	return chapter
 
 
-def extract_package(course, title, scorm_package):
-	package = frappe.get_doc("File", scorm_package.name)
-	zip_path = package.get_full_path()
-	# check_for_malicious_code(zip_path)
-	extract_path = frappe.get_site_path("public", "scorm", course, title)
-	zipfile.ZipFile(zip_path).extractall(extract_path)
-	return extract_path
-
-
-def check_for_malicious_code(zip_path):
-	suspicious_patterns = [
-		# Unsafe inline JavaScript
-		r'on(click|load|mouseover|error|submit|focus|blur|change|keyup|keydown|keypress|resize)=".*?"',  # Inline event handlers (e.g., onerror, onclick)
-		r'<script.*?src=["\']http',  # External script tags
-		r"eval\(",  # Usage of eval()
-		r"Function\(",  # Usage of Function constructor
-		r"(btoa|atob)\(",  # Base64 encoding/decoding
-		# Dangerous XML patterns
-		r"<!ENTITY",  # XXE-related
-		r"<\?xml-stylesheet .*?>",  # External stylesheets in XML
-	]
-
-	with zipfile.ZipFile(zip_path, "r") as zf:
-		for file_name in zf.namelist():
-			if file_name.endswith((".html", ".js", ".xml")):
-				with zf.open(file_name) as file:
-					content = file.read().decode("utf-8", errors="ignore")
-					for pattern in suspicious_patterns:
-						if re.search(pattern, content):
-							frappe.throw(_("Suspicious pattern found in {0}: {1}").format(file_name, pattern))
-
-
-def get_manifest_file(extract_path):
-	manifest_file = None
-	for root, _dirs, files in os.walk(extract_path):
-		for file in files:
-			if file == "imsmanifest.xml":
-				manifest_file = os.path.join(root, file)
-				break
-		if manifest_file:
-			break
-	return manifest_file
-
-
-def get_launch_file(extract_path):
-	launch_file = None
-	manifest_file = get_manifest_file(extract_path)
-
-	if manifest_file:
-		with open(manifest_file) as file:
-			data = file.read()
-			dom = parseString(data)
-			resource = dom.getElementsByTagName("resource")
-			for res in resource:
-				if (
-					res.getAttribute("adlcp:scormtype") == "sco"
-					or res.getAttribute("adlcp:scormType") == "sco"
-				):
-					launch_file = res.getAttribute("href")
-					break
-
-		if launch_file:
-			launch_file = os.path.join(os.path.dirname(manifest_file), launch_file)
-
-	return launch_file
-
-
 def add_lesson(title, chapter, course, idx):
 	lesson = frappe.new_doc("Course Lesson")
 	lesson.update(
@@ -1143,16 +1155,18 @@ def add_lesson(title, chapter, course, idx):
 @frappe.whitelist()
 def delete_chapter(chapter):
 	chapterInfo = frappe.db.get_value(
-		"Course Chapter", chapter, ["is_scorm_package", "scorm_package_path"], as_dict=True
+		"Course Chapter", chapter, ["course", "is_scorm_package", "scorm_package_path"], as_dict=True
 	)
 
 	if chapterInfo.is_scorm_package:
 		delete_scorm_package(chapterInfo.scorm_package_path)
+		clear_file_index(chapterInfo.scorm_package_path)
 
 	frappe.db.delete("Chapter Reference", {"chapter": chapter})
 	frappe.db.delete("Lesson Reference", {"parent": chapter})
 	frappe.db.delete("Course Lesson", {"chapter": chapter})
 	frappe.db.delete("Course Chapter", chapter)
+	update_course_lessons(chapterInfo.course)
 
 
 def delete_scorm_package(scorm_package_path):
@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from lms.lms.api import update_course_lessons
+
 
 class ChapterReference(Document):
-	pass
+	def after_insert(self):
+		update_course_lessons(self.parent)
+
+	def on_trash(self):
+		update_course_lessons(self.parent)
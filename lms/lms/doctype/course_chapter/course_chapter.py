@@ -4,14 +4,25 @@
 import frappe
 from frappe.model.document import Document
 
-from lms.lms.api import update_course_statistics
+from lms.lms.api import update_course_lessons
+from lms.lms.scorm import clear_file_index
 from lms.lms.utils import get_course_progress
 
 
 class CourseChapter(Document):
 	def on_update(self):
 		self.recalculate_course_progress()
-		update_course_statistics()
+		update_course_lessons(self.course)
+		self.clear_scorm_file_index()
+
+	def clear_scorm_file_index(self):
+		previous = self.get_doc_before_save()
+		if previous and (
+			previous.scorm_package_path != self.scorm_package_path
+			or previous.scorm_file_index != self.scorm_file_index
+		):
+			clear_file_index(previous.scorm_package_path)
+			clear_file_index(self.scorm_package_path)
 
 	def recalculate_course_progress(self):
 		previous_lessons = self.get_doc_before_save() and self.get_doc_before_save().as_dict().lessons
@@ -102,7 +102,13 @@ def save_progress(lesson, course, scorm_details=None):
 			},
 		)
 
-	progress = get_course_progress(course)
+	return update_enrollment_progress(membership, course, lesson)
+
+
+def update_enrollment_progress(membership, course, lesson, member=None):
+	"""Recomputes the course progress of an enrollment after a lesson's
+	progress changed, and returns it."""
+	progress = get_course_progress(course, member)
 	capture_progress_for_analytics(progress, course)
 
 	# Had to get doc, as on_change doesn't trigger when you use set_value. The trigger is necessary for badge to get assigned.
@@ -1,9 +1,20 @@
 # Copyright (c) 2021, FOSS United and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+from lms.lms.api import update_course_lessons
+
 
 class LessonReference(Document):
-	pass
+	def after_insert(self):
+		self.update_course_lessons()
+
+	def on_trash(self):
+		self.update_course_lessons()
+
+	def update_course_lessons(self):
+		course = frappe.db.get_value("Course Chapter", self.parent, "course")
+		if course:
+			update_course_lessons(course)
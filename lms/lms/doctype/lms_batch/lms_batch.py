@@ -1,16 +1,16 @@
 # Copyright (c) 2022, Frappe and contributors
 # For license information, please see license.txt
 
-import base64
 import json
 from datetime import timedelta
 
 import frappe
-import requests
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import add_days, cint, format_datetime, get_time, nowdate
 
+from lms.lms import zoom
+from lms.lms.mailer import send_bulk_mail
 from lms.lms.utils import (
 	generate_slug,
 	get_assignment_details,
@@ -155,13 +155,7 @@ def create_live_class(
 		"auto_recording": "none" if auto_recording == "No Recording" else auto_recording.lower(),
 		"timezone": timezone,
 	}
-	headers = {
-		"Authorization": "Bearer " + authenticate(zoom_account),
-		"content-type": "application/json",
-	}
-	response = requests.post(
-		"https://api.zoom.us/v2/users/me/meetings", headers=headers, data=json.dumps(payload)
-	)
+	response = zoom.post(zoom_account, "/users/me/meetings", data=json.dumps(payload))
 
 	if response.status_code == 201:
 		data = json.loads(response.text)
@@ -191,25 +185,7 @@ def create_live_class(
 
 
 def authenticate(zoom_account):
-	zoom = frappe.get_doc("LMS Zoom Settings", zoom_account)
-	if not zoom.enabled:
-		frappe.throw(_("Please enable the zoom account to use this feature."))
-
-	authenticate_url = (
-		f"https://zoom.us/oauth/token?grant_type=account_credentials&account_id={zoom.account_id}"
-	)
-
-	headers = {
-		"Authorization": "Basic "
-		+ base64.b64encode(
-			bytes(
-				zoom.client_id + ":" + zoom.get_password(fieldname="client_secret", raise_exception=False),
-				encoding="utf8",
-			)
-		).decode()
-	}
-	response = requests.request("POST", authenticate_url, headers=headers)
-	return response.json()["access_token"]
+	return zoom.get_access_token(zoom_account)
 
 
 @frappe.whitelist()
@@ -300,16 +276,14 @@ def send_batch_start_reminder():
 
 	for batch in batches:
 		students = frappe.get_all("LMS Batch Enrollment", {"batch": batch.name}, ["member", "member_name"])
-		for student in students:
-			send_mail(batch, student)
+		send_mail(batch, students)
 
 
-def send_mail(batch, student):
+def send_mail(batch, students):
 	subject = _("Your batch {0} is starting tomorrow").format(batch.title)
 	template = "batch_start_reminder"
 
 	args = {
-		"student_name": student.member_name,
 		"title": batch.title,
 		"start_date": batch.start_date,
 		"start_time": batch.start_time,
@@ -317,10 +291,14 @@ def send_mail(batch, student):
 		"name": batch.name,
 	}
 
-	frappe.sendmail(
-		recipients=student.member,
+	send_bulk_mail(
+		"batch_start_reminder",
+		[student.member for student in students],
 		subject=subject,
 		template=template,
 		args=args,
 		header=[_(f"Batch Start Reminder: {batch.title}"), "orange"],
+		reference_doctype="LMS Batch",
+		reference_name=batch.name,
+		recipient_args={student.member: {"student_name": student.member_name} for student in students},
 	)
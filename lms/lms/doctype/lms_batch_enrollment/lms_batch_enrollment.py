@@ -8,6 +8,8 @@ from frappe import _
 from frappe.email.doctype.email_template.email_template import get_email_template
 from frappe.model.document import Document
 
+from lms.lms.doctype.lms_live_class.lms_live_class import enqueue_calendar_sync, insert_event_participants
+
 
 class LMSBatchEnrollment(Document):
 	def after_insert(self):
@@ -39,21 +41,13 @@ class LMSBatchEnrollment(Document):
 				enrollment.save()
 
 	def add_member_to_live_class(self):
-		live_classes = frappe.get_all("LMS Live Class", {"batch_name": self.batch}, ["name", "event"])
-
-		for live_class in live_classes:
-			if live_class.event:
-				frappe.get_doc(
-					{
-						"doctype": "Event Participants",
-						"reference_doctype": "User",
-						"reference_docname": self.member,
-						"email": self.member,
-						"parent": live_class.event,
-						"parenttype": "Event",
-						"parentfield": "event_participants",
-					}
-				).save()
+		events = frappe.get_all(
+			"LMS Live Class", {"batch_name": self.batch, "event": ["is", "set"]}, pluck="event"
+		)
+
+		for event in set(events):
+			if insert_event_participants(event, [self.member]):
+				enqueue_calendar_sync(event)
 
 
 @frappe.whitelist()
@@ -0,0 +1,265 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_months, flt, getdate, now_datetime
+
+MONTHS_PER_CHUNK = 6
+
+FIELDS = [
+	"enrollments",
+	"completions",
+	"quiz_submissions",
+	"quiz_passes",
+	"quiz_pass_rate",
+	"revenue",
+	"active_learners",
+]
+
+# (doctype, date field) of the records each month's numbers are computed from
+SOURCES = [
+	("LMS Enrollment", "creation"),
+	("LMS Enrollment", "completed_on"),
+	("LMS Quiz Submission", "creation"),
+	("LMS Course Progress", "creation"),
+	("LMS Revenue Summary", "month"),
+]
+
+
+class LMSCourseAnalytics(Document):
+	pass
+
+
+@frappe.whitelist()
+def enqueue_refresh(full=False):
+	frappe.only_for("System Manager")
+	frappe.enqueue(
+		refresh_course_analytics,
+		queue="long",
+		job_id="lms_course_analytics_refresh",
+		deduplicate=True,
+		full=frappe.parse_json(full),
+	)
+
+
+def refresh_course_analytics(full=False):
+	"""Recomputes the analytics of the months whose source records changed
+	since the last refresh, or of every month with `full`.
+
+	Months are computed a few at a time with one grouped query per metric
+	and committed as they are done. Rows are stamped with the time the
+	refresh started, which is where the next refresh looks for changes.
+	"""
+	started = now_datetime()
+	since = None if full else frappe.db.sql("select max(modified) from `tabLMS Course Analytics`")[0][0]
+	reopened = update_completion_dates()
+	months = sorted(set(get_changed_months(since)) | reopened | get_deleted_months(since))
+
+	if full:
+		frappe.db.delete("LMS Course Analytics")
+
+	for i in range(0, len(months), MONTHS_PER_CHUNK):
+		chunk = months[i : i + MONTHS_PER_CHUNK]
+		save_months(chunk, compute_months(chunk), started)
+		frappe.db.commit()
+
+	return len(months)
+
+
+def get_changed_months(since=None):
+	"""Returns the first days of the months that have records modified
+	after `since`, or of all months with records."""
+	months = set()
+	for doctype, field in SOURCES:
+		condition = "WHERE modified > %(since)s" if since else ""
+		rows = frappe.db.sql(
+			f"""
+			SELECT DISTINCT DATE_FORMAT(`{field}`, '%%Y-%%m-01')
+			FROM `tab{doctype}`
+			{condition}
+			""",
+			{"since": since},
+		)
+		months.update(getdate(row[0]) for row in rows if row[0])
+	return sorted(months)
+
+
+def update_completion_dates():
+	"""Sets completed_on of the enrollments that reached 100% since the last
+	refresh to the time they were last updated, and clears it for the ones
+	that fell below 100%, e.g. because lessons were added. Returns the
+	months the cleared enrollments were completed in.
+
+	Enrollments keep the month they were completed in when they are
+	updated later. modified is left alone."""
+	reopened = frappe.db.sql(
+		"""
+		SELECT DISTINCT DATE_FORMAT(completed_on, %(month_format)s)
+		FROM `tabLMS Enrollment`
+		WHERE progress < 100 AND completed_on IS NOT NULL
+		""",
+		{"month_format": "%Y-%m-01"},
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabLMS Enrollment`
+		SET completed_on = NULL
+		WHERE progress < 100 AND completed_on IS NOT NULL
+		"""
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabLMS Enrollment`
+		SET completed_on = modified
+		WHERE progress >= 100 AND completed_on IS NULL
+		"""
+	)
+	return {getdate(row[0]) for row in reopened}
+
+
+def get_deleted_months(since=None):
+	"""Returns the first days of the months that deleted source records
+	were counted in."""
+	if not since:
+		return set()
+
+	doctypes = {doctype for doctype, _field in SOURCES}
+	months = set()
+	for row in frappe.get_all(
+		"Deleted Document",
+		{"deleted_doctype": ["in", list(doctypes)], "creation": [">", since]},
+		["deleted_doctype", "data"],
+	):
+		data = json.loads(row.data)
+		for doctype, field in SOURCES:
+			if doctype == row.deleted_doctype and data.get(field):
+				months.add(getdate(data[field]).replace(day=1))
+	return months
+
+
+def compute_months(months):
+	"""Returns {(course, month): values} for the given months."""
+	values = {
+		"start": months[0],
+		"end": add_months(months[-1], 1),
+		"month_format": "%Y-%m-01",
+	}
+	metrics = {}
+
+	def add(rows, *fields):
+		for row in rows:
+			month = getdate(row.month)
+			if month not in months or not row.course:
+				continue
+			entry = metrics.setdefault((row.course, month), dict.fromkeys(FIELDS, 0))
+			for field in fields:
+				entry[field] = row[field]
+
+	add(
+		frappe.db.sql(
+			"""
+			SELECT course, DATE_FORMAT(creation, %(month_format)s) AS month, COUNT(*) AS enrollments
+			FROM `tabLMS Enrollment`
+			WHERE creation >= %(start)s AND creation < %(end)s
+			GROUP BY course, month
+			""",
+			values,
+			as_dict=True,
+		),
+		"enrollments",
+	)
+	add(
+		frappe.db.sql(
+			"""
+			SELECT course, DATE_FORMAT(completed_on, %(month_format)s) AS month, COUNT(*) AS completions
+			FROM `tabLMS Enrollment`
+			WHERE completed_on >= %(start)s AND completed_on < %(end)s
+			GROUP BY course, month
+			""",
+			values,
+			as_dict=True,
+		),
+		"completions",
+	)
+	add(
+		frappe.db.sql(
+			"""
+			SELECT
+				course,
+				DATE_FORMAT(creation, %(month_format)s) AS month,
+				COUNT(*) AS quiz_submissions,
+				SUM(CASE WHEN percentage >= passing_percentage THEN 1 ELSE 0 END) AS quiz_passes
+			FROM `tabLMS Quiz Submission`
+			WHERE creation >= %(start)s AND creation < %(end)s
+			GROUP BY course, month
+			""",
+			values,
+			as_dict=True,
+		),
+		"quiz_submissions",
+		"quiz_passes",
+	)
+	add(
+		frappe.db.sql(
+			"""
+			SELECT
+				course,
+				DATE_FORMAT(creation, %(month_format)s) AS month,
+				COUNT(DISTINCT member) AS active_learners
+			FROM `tabLMS Course Progress`
+			WHERE creation >= %(start)s AND creation < %(end)s
+			GROUP BY course, month
+			""",
+			values,
+			as_dict=True,
+		),
+		"active_learners",
+	)
+	add(
+		frappe.db.sql(
+			"""
+			SELECT payment_for_document AS course, month, SUM(total_amount) AS revenue
+			FROM `tabLMS Revenue Summary`
+			WHERE payment_for_document_type = 'LMS Course' AND month >= %(start)s AND month < %(end)s
+			GROUP BY payment_for_document, month
+			""",
+			values,
+			as_dict=True,
+		),
+		"revenue",
+	)
+
+	for entry in metrics.values():
+		if entry["quiz_submissions"]:
+			entry["quiz_pass_rate"] = flt(entry["quiz_passes"] * 100 / entry["quiz_submissions"], 2)
+
+	return metrics
+
+
+def save_months(months, metrics, modified):
+	frappe.db.delete("LMS Course Analytics", {"month": ["in", months]})
+	frappe.db.bulk_insert(
+		"LMS Course Analytics",
+		["name", "course", "month", *FIELDS, "creation", "modified", "owner", "modified_by"],
+		[
+			(
+				get_analytics_name(course, month),
+				course,
+				month,
+				*(entry[field] for field in FIELDS),
+				modified,
+				modified,
+				"Administrator",
+				"Administrator",
+			)
+			for (course, month), entry in metrics.items()
+		],
+	)
+
+
+def get_analytics_name(course, month):
+	return hashlib.sha1(f"{course}|{month}".encode()).hexdigest()[:20]
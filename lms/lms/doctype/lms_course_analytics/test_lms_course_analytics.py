@@ -0,0 +1,65 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import get_first_day, nowdate
+
+from lms.lms.doctype.lms_course.test_lms_course import new_course, new_user
+from lms.lms.doctype.lms_course_analytics.lms_course_analytics import refresh_course_analytics
+
+
+class IntegrationTestLMSCourseAnalytics(IntegrationTestCase):
+	def get_analytics(self, course):
+		return frappe.db.get_value(
+			"LMS Course Analytics",
+			{"course": course, "month": get_first_day(nowdate())},
+			["enrollments", "completions"],
+			as_dict=True,
+		)
+
+	def enroll(self, course, email):
+		return frappe.get_doc(
+			{
+				"doctype": "LMS Enrollment",
+				"course": course,
+				"member": new_user("Analyst", email).name,
+				"progress": 100,
+			}
+		).insert(ignore_permissions=True)
+
+	def test_incremental_refresh(self):
+		course = new_course("Analytics Course").name
+		refresh_course_analytics(full=True)
+		before = self.get_analytics(course) or {"enrollments": 0, "completions": 0}
+
+		self.enroll(course, "analyst@example.com")
+
+		self.assertGreaterEqual(refresh_course_analytics(), 1)
+		after = self.get_analytics(course)
+		self.assertEqual(after.enrollments, before["enrollments"] + 1)
+		self.assertEqual(after.completions, before["completions"] + 1)
+		self.assertEqual(refresh_course_analytics(), 0)
+
+	def test_reopened_and_deleted_enrollments_are_taken_out(self):
+		course = new_course("Analytics Course").name
+		refresh_course_analytics(full=True)
+		before = self.get_analytics(course) or frappe._dict(enrollments=0, completions=0)
+
+		enrollment = self.enroll(course, "reopened.analyst@example.com")
+		refresh_course_analytics()
+		completed_on = frappe.db.get_value("LMS Enrollment", enrollment.name, "completed_on")
+
+		frappe.db.set_value("LMS Enrollment", enrollment.name, "member_type", "Student")
+		refresh_course_analytics()
+		self.assertEqual(frappe.db.get_value("LMS Enrollment", enrollment.name, "completed_on"), completed_on)
+		self.assertEqual(self.get_analytics(course).completions, before.completions + 1)
+
+		frappe.db.set_value("LMS Enrollment", enrollment.name, "progress", 50)
+		refresh_course_analytics()
+		self.assertEqual(self.get_analytics(course).completions, before.completions)
+
+		frappe.delete_doc("LMS Enrollment", enrollment.name, ignore_permissions=True)
+		refresh_course_analytics()
+		after = self.get_analytics(course) or frappe._dict(enrollments=0, completions=0)
+		self.assertEqual(after.enrollments, before.enrollments)
@@ -0,0 +1,16 @@
+// Copyright (c) 2026, Frappe and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("LMS Course Announcement", {
+	refresh(frm) {
+		if (frm.doc.status == "Failed") {
+			frm.add_custom_button(__("Resume"), () => {
+				frappe.call({
+					method: "lms.api.course_notifications.resume_course_announcement",
+					args: { announcement: frm.doc.name },
+					callback: () => frm.reload_doc(),
+				});
+			});
+		}
+	},
+});
@@ -0,0 +1,115 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from lms.api.course_notifications import (
+	fail_stale_announcements,
+	send_course_announcement,
+)
+from lms.lms.doctype.lms_course.test_lms_course import new_course, new_user
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestLMSCourseAnnouncement(UnitTestCase):
+	"""
+	Unit tests for LMSCourseAnnouncement.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+@patch.object(frappe.db, "commit")
+@patch("lms.api.course_notifications.ANNOUNCEMENT_CHUNK_INTERVAL", 0)
+@patch("lms.api.course_notifications.ANNOUNCEMENT_CHUNK_SIZE", 2)
+class IntegrationTestLMSCourseAnnouncement(IntegrationTestCase):
+	"""
+	Integration tests for LMSCourseAnnouncement.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def setUp(self):
+		for i in range(3):
+			new_user(f"Announcement Reader {i}", f"announcement.reader{i}@example.com")
+		self.course = new_course("Announcement Course")
+		self.announcement = frappe.get_doc(
+			{"doctype": "LMS Course Announcement", "course": self.course.name}
+		).insert(ignore_permissions=True)
+		self.users = frappe.get_all(
+			"User",
+			{"enabled": 1, "name": ["not in", ["Guest", "Administrator"]]},
+			pluck="name",
+			order_by="name asc",
+		)
+
+	def get_mailed(self, send):
+		return [user for call in send.call_args_list for user in call.args[1]]
+
+	@patch("lms.api.course_notifications.send_bulk_mail", side_effect=lambda _, users, **kwargs: len(users))
+	def test_users_are_mailed_in_chunks(self, send, commit):
+		send_course_announcement(self.announcement.name)
+		self.announcement.reload()
+
+		self.assertTrue(all(len(call.args[1]) <= 2 for call in send.call_args_list))
+		self.assertEqual(self.get_mailed(send), self.users)
+		self.assertEqual(self.announcement.status, "Completed")
+		self.assertEqual(self.announcement.recipients, len(self.users))
+
+	@patch("lms.api.course_notifications.send_bulk_mail")
+	def test_failed_announcement_resumes_after_last_chunk(self, send, commit):
+		def fail_second_chunk(_, users, **kwargs):
+			if send.call_count == 2:
+				raise Exception("SMTP down")
+			return len(users)
+
+		send.side_effect = fail_second_chunk
+		send_course_announcement(self.announcement.name)
+		self.announcement.reload()
+		first_chunk = send.call_args_list[0].args[1]
+
+		self.assertEqual(self.announcement.status, "Failed")
+		self.assertEqual(self.announcement.recipients, len(first_chunk))
+
+		send.reset_mock()
+		send.side_effect = lambda _, users, **kwargs: len(users)
+		send_course_announcement(self.announcement.name)
+		self.announcement.reload()
+
+		self.assertEqual(first_chunk + self.get_mailed(send), self.users)
+		self.assertEqual(self.announcement.status, "Completed")
+		self.assertEqual(self.announcement.recipients, len(self.users))
+
+	@patch("lms.api.course_notifications.enqueue_announcement")
+	def test_course_is_announced_once(self, enqueue, commit):
+		course = new_course("Republished Course")
+		for published in (1, 0, 1):
+			course.published = published
+			course.save()
+
+		self.assertEqual(frappe.db.count("LMS Course Announcement", {"course": course.name}), 1)
+		self.assertEqual(enqueue.call_count, 1)
+
+	def test_stale_announcement_is_marked_failed(self, commit):
+		self.announcement.db_set("status", "In Progress")
+		frappe.db.set_value(
+			"LMS Course Announcement",
+			self.announcement.name,
+			"modified",
+			add_to_date(now_datetime(), hours=-2),
+			update_modified=False,
+		)
+
+		fail_stale_announcements()
+		self.assertEqual(
+			frappe.db.get_value("LMS Course Announcement", self.announcement.name, "status"), "Failed"
+		)
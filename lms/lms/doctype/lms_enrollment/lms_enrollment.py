@@ -6,14 +6,29 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import ceil
 
+from lms.lms.api import update_course_enrollments
+
 
 class LMSEnrollment(Document):
 	def validate(self):
 		self.validate_membership_in_same_batch()
 		self.validate_membership_in_different_batch_same_course()
 
+	def after_insert(self):
+		if self.member_type == "Student":
+			update_course_enrollments(self.course, 1)
+
 	def on_update(self):
 		update_program_progress(self.member)
+		if not self.flags.in_insert and self.has_value_changed("member_type"):
+			if self.member_type == "Student":
+				update_course_enrollments(self.course, 1)
+			elif self.get_doc_before_save().member_type == "Student":
+				update_course_enrollments(self.course, -1)
+
+	def on_trash(self):
+		if self.member_type == "Student":
+			update_course_enrollments(self.course, -1)
 
 	def validate_membership_in_same_batch(self):
 		filters = {"member": self.member, "course": self.course, "name": ["!=", self.name]}
@@ -66,3 +66,14 @@ class TestLMSEnrollment(unittest.TestCase):
 		# it should be possible to change role
 		membership.role = "Admin"
 		membership.save()
+
+	def test_course_enrollment_count(self):
+		course, batch = self.new_course_batch()
+		frappe.db.set_value("LMS Course", course.name, "enrollments", 0)
+
+		student = self.add_membership(batch.name, new_user("Test", "test01@test.com").name, course.name)
+		self.add_membership(batch.name, new_user("Mentor", "test02@test.com").name, course.name, "Mentor")
+		self.assertEqual(frappe.db.get_value("LMS Course", course.name, "enrollments"), 1)
+
+		student.delete()
+		self.assertEqual(frappe.db.get_value("LMS Course", course.name, "enrollments"), 0)
@@ -1,16 +1,26 @@
 # Copyright (c) 2023, Frappe and contributors
 # For license information, please see license.txt
 
-import json
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import partial
 
 import frappe
 import requests
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import cint, format_date, format_time, get_datetime, nowdate
+from frappe.utils import cint, format_date, format_time, get_datetime, now_datetime, nowdate
 
-from lms.lms.doctype.lms_batch.lms_batch import authenticate
+from lms.lms import zoom
+from lms.lms.mailer import send_bulk_mail
+
+MAX_ATTENDANCE_SYNC_ATTEMPTS = 3
+ATTENDANCE_SYNC_WORKERS = 4
+EVENT_PARTICIPANT_BATCH_SIZE = 500
+# how long a queued calendar sync keeps later calls from queueing another
+CALENDAR_SYNC_PENDING_TTL = 10 * 60
 
 
 class LMSLiveClass(Document):
@@ -45,31 +55,120 @@ class LMSLiveClass(Document):
 
 		participants.append(frappe.session.user)
 		participants.extend(instructors)
-		participants = list(set(participants))
-
-		for participant in participants:
-			frappe.get_doc(
-				{
-					"doctype": "Event Participants",
-					"reference_doctype": "User",
-					"reference_docname": participant,
-					"email": participant,
-					"parent": event.name,
-					"parenttype": "Event",
-					"parentfield": "event_participants",
-				}
-			).save()
-
-		event.reload()
-		event.update(
+
+		insert_event_participants(event.name, participants)
+		enqueue_calendar_sync(
+			event.name,
 			{
 				"sync_with_google_calendar": 1,
 				"google_calendar": calendar,
 				"description": f"A Live Class has been scheduled on {format_date(self.date, 'medium')} at {format_time(self.time, 'hh:mm a')}. Click on this link to join. {self.join_url}. {self.description}",
-			}
+			},
 		)
 
-		event.save()
+
+def insert_event_participants(event, participants):
+	"""Adds users to the participants table of an event in bulk.
+
+	Users that are already participants of the event are skipped, so this
+	is safe to call repeatedly. Returns the number of rows inserted.
+	"""
+	existing = frappe.get_all(
+		"Event Participants",
+		{"parent": event, "parenttype": "Event", "reference_doctype": "User"},
+		["reference_docname", "idx"],
+	)
+	existing_users = {row.reference_docname for row in existing}
+	idx = max((row.idx for row in existing), default=0)
+
+	now = now_datetime()
+	owner = frappe.session.user
+	values = []
+	for participant in dict.fromkeys(participants):
+		if not participant or participant in existing_users:
+			continue
+
+		idx += 1
+		values.append(
+			(
+				frappe.generate_hash(),
+				now,
+				now,
+				owner,
+				owner,
+				event,
+				"Event",
+				"event_participants",
+				idx,
+				"User",
+				participant,
+				participant,
+			)
+		)
+
+	frappe.db.bulk_insert(
+		"Event Participants",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"idx",
+			"reference_doctype",
+			"reference_docname",
+			"email",
+		],
+		values=values,
+		chunk_size=EVENT_PARTICIPANT_BATCH_SIZE,
+	)
+	return len(values)
+
+
+def enqueue_calendar_sync(event, values=None):
+	"""Saves the event in the background, once the current transaction is
+	committed, so google calendar gets the updated participant list.
+
+	The sync reads the participants when it starts, so calls made while
+	one is waiting in the queue are collapsed into it. Calls made after
+	it has started queue another one."""
+	frappe.db.after_commit.add(partial(queue_calendar_sync, event, values))
+
+
+def queue_calendar_sync(event, values=None):
+	cache = frappe.cache()
+	pending = cache.set(
+		cache.make_key(get_calendar_sync_key(event)), 1, nx=True, ex=CALENDAR_SYNC_PENDING_TTL
+	)
+	if not pending and not values:
+		return
+
+	frappe.enqueue(sync_event_with_calendar, queue="short", event=event, values=values)
+
+
+def get_calendar_sync_key(event):
+	return f"lms:event_calendar_sync:{event}"
+
+
+def sync_event_with_calendar(event, values=None):
+	# participants added from here on are left to the next sync
+	frappe.cache().delete_value(get_calendar_sync_key(event))
+
+	for attempt in range(3):
+		try:
+			doc = frappe.get_doc("Event", event)
+			if values:
+				doc.update(values)
+			doc.save(ignore_permissions=True)
+			return
+		except frappe.TimestampMismatchError:
+			# another sync of the event saved it first
+			if attempt == 2:
+				raise
+			frappe.db.rollback()
 
 
 def send_live_class_reminder():
@@ -83,83 +182,208 @@ def send_live_class_reminder():
 
 	for live_class in classes:
 		students = frappe.get_all(
-			"LMS Batch Enrollment",
-			{"batch": live_class.batch_name},
-			["member", "member_name"],
+			"LMS Batch Enrollment", {"batch": live_class.batch_name}, ["member", "member_name"]
 		)
-		for student in students:
-			send_mail(live_class, student)
+		send_mail(live_class, students)
 
 
-def send_mail(live_class, student):
+def send_mail(live_class, students):
 	subject = _("Your class on {0} is today").format(live_class.title)
 	template = "live_class_reminder"
 
 	args = {
-		"student_name": student.member_name,
 		"title": live_class.title,
 		"date": live_class.date,
 		"time": live_class.time,
 		"batch_name": live_class.batch_name,
 	}
 
-	frappe.sendmail(
-		recipients=student.member,
+	send_bulk_mail(
+		"live_class_reminder",
+		[student.member for student in students],
 		subject=subject,
 		template=template,
 		args=args,
 		header=[_(f"Class Reminder: {live_class.title}"), "orange"],
+		reference_doctype="LMS Live Class",
+		reference_name=live_class.name,
+		recipient_args={student.member: {"student_name": student.member_name} for student in students},
 	)
 
 
 def update_attendance():
-	past_live_classes = frappe.get_all(
+	"""Syncs zoom attendance for every live class that has ended.
+
+	Participants are fetched from zoom concurrently, while all database
+	writes happen on this thread. Each class is committed on its own so a
+	failure only affects that class, which is retried on the next run
+	until it runs out of attempts.
+	"""
+	start = time.monotonic()
+	live_classes = get_classes_pending_attendance()
+	metrics = frappe._dict(classes=len(live_classes), synced=0, failed=0, rows=0)
+
+	if live_classes:
+		sync_attendance(live_classes, metrics)
+
+	metrics.duration = round(time.monotonic() - start, 3)
+	frappe.logger("lms").info(f"Live class attendance sync: {metrics}")
+	return metrics
+
+
+def get_classes_pending_attendance():
+	live_classes = frappe.get_all(
 		"LMS Live Class",
 		{
 			"uuid": ["is", "set"],
-			"attendees": ["is", "not set"],
+			"date": ["<=", nowdate()],
+			"attendance_sync_status": ["!=", "Synced"],
+			"attendance_sync_attempts": ["<", MAX_ATTENDANCE_SYNC_ATTEMPTS],
 		},
-		["name", "uuid", "zoom_account"],
+		["name", "uuid", "zoom_account", "date", "time", "duration", "attendance_sync_attempts"],
 	)
 
-	for live_class in past_live_classes:
-		attendance_data = get_attendance(live_class)
-		create_attendance(live_class, attendance_data)
-		update_attendees_count(live_class, attendance_data)
-
+	now = now_datetime()
+	return [
+		live_class
+		for live_class in live_classes
+		if get_datetime(f"{live_class.date} {live_class.time}") + timedelta(minutes=cint(live_class.duration))
+		< now
+	]
+
+
+def sync_attendance(live_classes, metrics):
+	tokens = get_zoom_tokens(live_classes)
+	zoom.get_session()
+
+	# the database is only used once every fetch is done, the threads reach it
+	# just to refresh a revoked token
+	with ThreadPoolExecutor(max_workers=ATTENDANCE_SYNC_WORKERS) as executor:
+		futures = {}
+		for live_class in live_classes:
+			if not tokens.get(live_class.zoom_account):
+				mark_attendance_failed(live_class, _("Could not authenticate with Zoom."))
+				metrics.failed += 1
+				continue
+
+			encoded_uuid = requests.utils.quote(live_class.uuid, safe="")
+			future = executor.submit(
+				contextvars.copy_context().run,
+				zoom.get_all_pages,
+				live_class.zoom_account,
+				f"/past_meetings/{encoded_uuid}/participants",
+				"participants",
+			)
+			futures[future] = live_class
+
+	for future, live_class in futures.items():
+		try:
+			participants = future.result()
+			metrics.rows += create_attendance(live_class, participants)
+			update_attendees_count(live_class, participants)
+			frappe.db.commit()
+			metrics.synced += 1
+		except Exception:
+			frappe.db.rollback()
+			mark_attendance_failed(live_class, frappe.get_traceback())
+			metrics.failed += 1
+
+
+def get_zoom_tokens(live_classes):
+	tokens = {}
+	for account in {live_class.zoom_account for live_class in live_classes}:
+		try:
+			tokens[account] = zoom.get_access_token(account)
+		except Exception:
+			frappe.clear_messages()
+			frappe.log_error(frappe.get_traceback(), f"Zoom authentication failed for {account}")
+	return tokens
+
+
+def mark_attendance_failed(live_class, error):
+	frappe.db.set_value(
+		"LMS Live Class",
+		live_class.name,
+		{
+			"attendance_sync_status": "Failed",
+			"attendance_sync_attempts": cint(live_class.attendance_sync_attempts) + 1,
+		},
+	)
+	frappe.log_error(error, f"Attendance sync failed for live class {live_class.name}")
+	frappe.db.commit()
 
-def get_attendance(live_class):
-	headers = {
-		"Authorization": "Bearer " + authenticate(live_class.zoom_account),
-		"content-type": "application/json",
-	}
 
-	encoded_uuid = requests.utils.quote(live_class.uuid, safe="")
-	response = requests.get(
-		f"https://api.zoom.us/v2/past_meetings/{encoded_uuid}/participants", headers=headers
+def create_attendance(live_class, data):
+	"""Inserts all participants of the live class in one statement and
+	returns the number of rows inserted. Participants without an LMS
+	account are skipped, and previously synced rows are replaced."""
+	emails = {participant.get("user_email") for participant in data if participant.get("user_email")}
+	if not emails:
+		return 0
+
+	users = frappe.get_all(
+		"User",
+		{"name": ["in", list(emails)]},
+		["name", "full_name", "user_image", "username"],
 	)
+	users = {user.name: user for user in users}
 
-	if response.status_code != 200:
-		frappe.throw(
-			_("Failed to fetch attendance data from Zoom for class {0}: {1}").format(
-				live_class, response.text
+	frappe.db.delete("LMS Live Class Participant", {"live_class": live_class.name})
+
+	now = now_datetime()
+	owner = frappe.session.user
+	values = []
+	for participant in data:
+		user = users.get(participant.get("user_email"))
+		if not user:
+			continue
+
+		values.append(
+			(
+				frappe.generate_hash(),
+				now,
+				now,
+				owner,
+				owner,
+				live_class.name,
+				user.name,
+				user.full_name,
+				user.user_image,
+				user.username,
+				get_datetime(participant.get("join_time")),
+				get_datetime(participant.get("leave_time")),
+				cint(participant.get("duration")),
 			)
 		)
 
-	data = response.json()
-	return data.get("participants", [])
-
-
-def create_attendance(live_class, data):
-	for participant in data:
-		doc = frappe.new_doc("LMS Live Class Participant")
-		doc.live_class = live_class.name
-		doc.member = participant.get("user_email")
-		doc.joined_at = participant.get("join_time")
-		doc.left_at = participant.get("leave_time")
-		doc.duration = participant.get("duration")
-		doc.insert()
+	frappe.db.bulk_insert(
+		"LMS Live Class Participant",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"live_class",
+			"member",
+			"member_name",
+			"member_image",
+			"member_username",
+			"joined_at",
+			"left_at",
+			"duration",
+		],
+		values=values,
+	)
+	return len(values)
 
 
 def update_attendees_count(live_class, data):
-	frappe.db.set_value("LMS Live Class", live_class.name, "attendees", len(data))
+	frappe.db.set_value(
+		"LMS Live Class",
+		live_class.name,
+		{
+			"attendees": len(data),
+			"attendance_sync_status": "Synced",
+		},
+	)
@@ -1,9 +1,35 @@
 # Copyright (c) 2023, Frappe and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from lms.lms.doctype.lms_live_class.lms_live_class import get_calendar_sync_key, queue_calendar_sync
 
 
 class TestLMSLiveClass(UnitTestCase):
 	pass
+
+
+class IntegrationTestLMSLiveClass(IntegrationTestCase):
+	def setUp(self):
+		frappe.cache().delete_value(get_calendar_sync_key("Test Event"))
+
+	def tearDown(self):
+		frappe.cache().delete_value(get_calendar_sync_key("Test Event"))
+
+	@patch("frappe.enqueue")
+	def test_pending_calendar_sync_collapses_calls(self, enqueue):
+		queue_calendar_sync("Test Event")
+		queue_calendar_sync("Test Event")
+		self.assertEqual(enqueue.call_count, 1)
+
+	@patch("frappe.enqueue")
+	def test_started_calendar_sync_queues_another(self, enqueue):
+		queue_calendar_sync("Test Event")
+		# what the job does when it starts
+		frappe.cache().delete_value(get_calendar_sync_key("Test Event"))
+		queue_calendar_sync("Test Event")
+		self.assertEqual(enqueue.call_count, 2)
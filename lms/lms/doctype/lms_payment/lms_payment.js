@@ -36,16 +36,26 @@ frappe.ui.form.on('LMS Payment', {
         // Add bulk action in list view
         if (frm.is_list) {
             frm.page.add_menu_item(__('Create Invoices for Completed Payments'), function() {
+                frappe.realtime.off('lms_bulk_invoicing_progress');
+                frappe.realtime.on('lms_bulk_invoicing_progress', function(progress) {
+                    let done = progress.processed + progress.failed;
+                    frappe.show_progress(__('Creating Invoices'), done, progress.total,
+                        __('{0} created, {1} failed', [progress.processed, progress.failed]));
+                    if (progress.completed) {
+                        frappe.hide_progress();
+                        frappe.realtime.off('lms_bulk_invoicing_progress');
+                        frappe.msgprint(__('Processed {0} payments, {1} failed', [progress.processed, progress.failed]));
+                        frm.refresh();
+                    }
+                });
                 frappe.call({
                     method: 'lms.lms.doctype.lms_invoice.lms_invoice.auto_create_invoices_for_completed_payments',
                     callback: function(r) {
-                        if (r.message) {
-                            let msg = `Processed ${r.message.total_processed} payments:\n\n`;
-                            r.message.results.forEach(result => {
-                                msg += `• ${result.payment}: ${result.status}\n`;
+                        if (r.message && r.message.queued) {
+                            frappe.show_alert({
+                                message: __('Invoices are being created in the background'),
+                                indicator: 'blue'
                             });
-                            frappe.msgprint(msg);
-                            frm.refresh();
                         }
                     }
                 });
@@ -9,34 +9,21 @@ class LMSPayment(Document):
             self.payment_received = 1
     
     def on_update(self):
-        """Create invoice automatically when payment is marked as received"""
-        if self.payment_received and not self.is_new():
-            self.create_automated_invoice()
-    
-    def create_automated_invoice(self):
-        """Automatically create invoice when payment is received"""
-        try:
-            # Check if invoice already exists for this payment
-            existing_invoice = frappe.db.exists("LMS Invoice", {
-                "payment_reference": self.name
-            })
-            
-            if existing_invoice:
-                frappe.msgprint(f"Invoice already exists: {existing_invoice}")
-                return
-            
-            # Create invoice using the existing function
-            from lms.lms.doctype.lms_invoice.lms_invoice import create_invoice_from_payment
-            invoice_name = create_invoice_from_payment(self.name)
-            
-            frappe.msgprint(f"Auto-generated invoice: {invoice_name}")
-            
-        except Exception as e:
-            frappe.log_error(f"Failed to auto-create invoice for payment {self.name}: {str(e)}")
-            # Don't throw error to avoid blocking payment save
+        """Fulfill the payment when it is marked as received.
+
+        Callers that fulfill the payment themselves, like the payment
+        webhooks, set `flags.skip_fulfillment`.
+        """
+        if (
+            self.payment_received
+            and self.has_value_changed("payment_received")
+            and not self.flags.skip_fulfillment
+        ):
+            from lms.lms.payment_fulfillment import fulfill_payment
+            fulfill_payment(self.name)
 
 @frappe.whitelist()
 def create_invoice_for_payment(payment_name):
     """API endpoint to manually create invoice for payment"""
     from lms.lms.doctype.lms_invoice.lms_invoice import create_invoice_from_payment
-    return create_invoice_from_payment(payment_name)
\ No newline at end of file
+    return create_invoice_from_payment(payment_name)
@@ -1,9 +1,80 @@
 # Copyright (c) 2023, Frappe and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+import frappe
+from frappe.tests import IntegrationTestCase
 
+from lms.lms.doctype.lms_course.test_lms_course import new_course, new_user
+from lms.lms.payment_fulfillment import (
+	BULK_INVOICING_PROGRESS_KEY,
+	fulfill_payment,
+	invoice_completed_payments,
+)
 
-class TestLMSPayment(UnitTestCase):
-	pass
+
+class TestLMSPayment(IntegrationTestCase):
+	def setUp(self):
+		self.course = new_course("Paid Fulfillment Course", {"paid_course": 1, "course_price": 100})
+		self.member = new_user("Buyer", "buyer@example.com").name
+
+	def new_payment(self, skip_fulfillment=False, **values):
+		payment = frappe.get_doc(
+			{
+				"doctype": "LMS Payment",
+				"member": self.member,
+				"payment_for_document_type": "LMS Course",
+				"payment_for_document": self.course.name,
+				"amount": 100,
+				"currency": "INR",
+				"billing_name": "Buyer",
+				**values,
+			}
+		)
+		payment.flags.ignore_mandatory = True
+		payment.flags.skip_fulfillment = skip_fulfillment
+		payment.insert(ignore_permissions=True)
+		return payment
+
+	def test_received_payment_is_fulfilled_once(self):
+		payment = self.new_payment()
+		self.assertFalse(frappe.db.exists("LMS Invoice", {"payment_reference": payment.name}))
+
+		payment.payment_received = 1
+		payment.save(ignore_permissions=True)
+		invoice = frappe.db.get_value("LMS Invoice", {"payment_reference": payment.name})
+
+		self.assertEqual(fulfill_payment(payment.name), invoice)
+		self.assertEqual(frappe.db.count("LMS Invoice", {"payment_reference": payment.name}), 1)
+		self.assertEqual(frappe.db.get_value("LMS Invoice", invoice, "docstatus"), 1)
+		self.assertEqual(
+			frappe.db.get_value(
+				"LMS Enrollment", {"member": self.member, "course": self.course.name}, "payment"
+			),
+			payment.name,
+		)
+
+	def test_saving_a_fulfilled_payment_does_not_refulfill(self):
+		payment = self.new_payment(payment_received=1)
+		invoice = frappe.db.get_value("LMS Invoice", {"payment_reference": payment.name})
+
+		payment.reload()
+		payment.billing_name = "Buyer Two"
+		payment.save(ignore_permissions=True)
+
+		self.assertEqual(
+			frappe.get_all("LMS Invoice", {"payment_reference": payment.name}, pluck="name"), [invoice]
+		)
+
+	def test_bulk_invoicing(self):
+		payments = [self.new_payment(payment_received=1, skip_fulfillment=True).name for i in range(3)]
+		frappe.cache().delete_value(BULK_INVOICING_PROGRESS_KEY)
+
+		progress = invoice_completed_payments()
+
+		self.assertTrue(progress.completed)
+		self.assertGreaterEqual(progress.processed, 3)
+		for payment in payments:
+			self.assertEqual(
+				frappe.db.count("LMS Invoice", {"payment_reference": payment, "docstatus": 1}), 1
+			)
+		self.assertIsNone(frappe.cache().get_value(BULK_INVOICING_PROGRESS_KEY))
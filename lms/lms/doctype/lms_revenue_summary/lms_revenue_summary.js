@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Frappe and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("LMS Revenue Summary", {
+// 	refresh(frm) {
+
+// 	},
+// });
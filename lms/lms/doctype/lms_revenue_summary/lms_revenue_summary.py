@@ -0,0 +1,121 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import get_first_day, now_datetime
+
+
+class LMSRevenueSummary(Document):
+	pass
+
+
+def update_revenue_summary(payment_name, sign=1):
+	"""Adds a paid payment to the revenue of its month, or removes it with
+	`sign=-1`. Payments count towards the month they were created in, once
+	their invoice is submitted."""
+	payment = frappe.db.get_value(
+		"LMS Payment",
+		payment_name,
+		["creation", "payment_for_document_type", "payment_for_document", "currency", "amount"],
+		as_dict=True,
+	)
+	if not payment:
+		return
+
+	month = get_first_day(payment.creation)
+	now = now_datetime()
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabLMS Revenue Summary`
+			(name, month, payment_for_document_type, payment_for_document, currency,
+			total_amount, payment_count, creation, modified, owner, modified_by)
+		VALUES
+			(%(name)s, %(month)s, %(document_type)s, %(document)s, %(currency)s,
+			%(amount)s, %(count)s, %(now)s, %(now)s, 'Administrator', 'Administrator')
+		ON DUPLICATE KEY UPDATE
+			total_amount = total_amount + VALUES(total_amount),
+			payment_count = payment_count + VALUES(payment_count),
+			modified = VALUES(modified)
+		""",
+		{
+			"name": get_summary_name(
+				month, payment.payment_for_document_type, payment.payment_for_document, payment.currency
+			),
+			"month": month,
+			"document_type": payment.payment_for_document_type,
+			"document": payment.payment_for_document,
+			"currency": payment.currency,
+			"amount": sign * (payment.amount or 0),
+			"count": sign,
+			"now": now,
+		},
+	)
+
+
+def rebuild_revenue_summary():
+	"""Recomputes the table from the payments that have a submitted, paid
+	invoice, in one GROUP BY query."""
+	rows = frappe.db.sql(
+		"""
+		SELECT
+			DATE_FORMAT(lp.creation, '%%Y-%%m-01') AS month,
+			lp.payment_for_document_type,
+			lp.payment_for_document,
+			lp.currency,
+			SUM(lp.amount) AS total_amount,
+			COUNT(*) AS payment_count
+		FROM `tabLMS Payment` lp
+		WHERE EXISTS (
+			SELECT 1 FROM `tabLMS Invoice` li
+			WHERE li.payment_reference = lp.name AND li.docstatus = 1 AND li.status = 'Paid'
+		)
+		GROUP BY month, lp.payment_for_document_type, lp.payment_for_document, lp.currency
+		""",
+		as_dict=True,
+	)
+
+	now = now_datetime()
+	frappe.db.delete("LMS Revenue Summary")
+	frappe.db.bulk_insert(
+		"LMS Revenue Summary",
+		[
+			"name",
+			"month",
+			"payment_for_document_type",
+			"payment_for_document",
+			"currency",
+			"total_amount",
+			"payment_count",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+		],
+		[
+			(
+				get_summary_name(
+					row.month, row.payment_for_document_type, row.payment_for_document, row.currency
+				),
+				row.month,
+				row.payment_for_document_type,
+				row.payment_for_document,
+				row.currency,
+				row.total_amount,
+				row.payment_count,
+				now,
+				now,
+				"Administrator",
+				"Administrator",
+			)
+			for row in rows
+		],
+	)
+	return len(rows)
+
+
+def get_summary_name(month, document_type, document, currency):
+	key = f"{month}|{document_type}|{document}|{currency}"
+	return hashlib.sha1(key.encode()).hexdigest()[:20]
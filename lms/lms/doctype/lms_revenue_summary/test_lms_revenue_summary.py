@@ -0,0 +1,51 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.lms.doctype.lms_course.test_lms_course import new_course, new_user
+from lms.lms.doctype.lms_revenue_summary.lms_revenue_summary import rebuild_revenue_summary
+from lms.lms.payment_fulfillment import fulfill_payment
+
+
+class IntegrationTestLMSRevenueSummary(IntegrationTestCase):
+	def setUp(self):
+		self.course = new_course("Revenue Course", {"paid_course": 1, "course_price": 40})
+		self.member = new_user("Payer", "payer@example.com").name
+
+	def get_revenue(self):
+		return frappe.db.get_value(
+			"LMS Revenue Summary",
+			{"payment_for_document": self.course.name, "currency": "INR"},
+			["total_amount", "payment_count"],
+			as_dict=True,
+		)
+
+	def new_received_payment(self, amount):
+		payment = frappe.get_doc(
+			{
+				"doctype": "LMS Payment",
+				"member": self.member,
+				"payment_for_document_type": "LMS Course",
+				"payment_for_document": self.course.name,
+				"amount": amount,
+				"currency": "INR",
+				"billing_name": "Payer",
+			}
+		)
+		payment.flags.ignore_mandatory = True
+		payment.insert(ignore_permissions=True)
+		return fulfill_payment(payment.name)
+
+	def test_summary_follows_invoices(self):
+		rebuild_revenue_summary()
+		self.new_received_payment(40)
+		invoice = self.new_received_payment(60)
+		self.assertEqual(self.get_revenue(), {"total_amount": 100, "payment_count": 2})
+
+		frappe.get_doc("LMS Invoice", invoice).cancel()
+		self.assertEqual(self.get_revenue(), {"total_amount": 40, "payment_count": 1})
+
+		rebuild_revenue_summary()
+		self.assertEqual(self.get_revenue(), {"total_amount": 40, "payment_count": 1})
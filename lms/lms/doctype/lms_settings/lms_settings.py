@@ -6,6 +6,8 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import get_url_to_list, validate_email_address, validate_url
 
+from lms.lms.webhook_verification import clear_webhook_secrets
+
 
 class LMSSettings(Document):
 	def validate(self):
@@ -13,6 +15,10 @@ class LMSSettings(Document):
 		self.validate_signup()
 		self.validate_contact_us_details()
 
+	def on_update(self):
+		# after commit, so no process can read the old secrets back meanwhile
+		frappe.db.after_commit.add(clear_webhook_secrets)
+
 	def validate_google_settings(self):
 		if self.send_calendar_invite_for_evaluations:
 			google_settings = frappe.get_single("Google Settings")
@@ -0,0 +1,16 @@
+// Copyright (c) 2026, Frappe and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("LMS Webhook Event", {
+	refresh(frm) {
+		if (["Failed", "Dead", "Processed"].includes(frm.doc.status)) {
+			frm.add_custom_button(__("Replay"), () => {
+				frappe.call({
+					method: "lms.lms.doctype.lms_webhook_event.lms_webhook_event.replay_webhook_event",
+					args: { event: frm.doc.name },
+					callback: () => frm.reload_doc(),
+				});
+			});
+		}
+	},
+});
@@ -0,0 +1,170 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import add_to_date, now_datetime
+
+MAX_WEBHOOK_ATTEMPTS = 5
+# events left in Processing longer than this are assumed to belong to a dead worker
+PROCESSING_TIMEOUT_MINUTES = 30
+
+
+class LMSWebhookEvent(Document):
+	pass
+
+
+def record_webhook_event(provider, event_id, event_type, payment_id, payload):
+	"""Stores a received webhook event and queues it for processing.
+
+	Returns False when an event with the same id was already received,
+	so retried deliveries from the gateway are acknowledged without
+	being processed again.
+	"""
+	event = frappe.get_doc(
+		{
+			"doctype": "LMS Webhook Event",
+			"provider": provider,
+			"event_id": event_id or hashlib.sha256(payload.encode()).hexdigest(),
+			"event_type": event_type,
+			"payment_id": payment_id,
+			"payload": payload,
+			"status": "Queued",
+		}
+	)
+	event.set_new_name()
+
+	try:
+		event.db_insert()
+	except (frappe.UniqueValidationError, frappe.DuplicateEntryError):
+		frappe.db.rollback()
+		return False
+
+	frappe.db.commit()
+	enqueue_payment_events(event.payment_id or event.name)
+	return True
+
+
+def enqueue_payment_events(payment_key):
+	frappe.enqueue(
+		process_payment_events,
+		queue="short",
+		job_id=f"lms_webhook_events::{payment_key}",
+		deduplicate=True,
+		payment_key=payment_key,
+	)
+
+
+def process_payment_events(payment_key):
+	"""Processes the pending events of one payment in the order they were
+	received. Processing stops at the first event that fails or is not due
+	for a retry yet, so a later event is never applied before an earlier one."""
+	while True:
+		events = get_pending_events(payment_key)
+		if not events:
+			return
+
+		for event in events:
+			if event.next_attempt_on and event.next_attempt_on > now_datetime():
+				return
+			if not process_webhook_event(event.name):
+				return
+
+
+def get_pending_events(payment_key):
+	return frappe.get_all(
+		"LMS Webhook Event",
+		filters={"status": ["in", ["Queued", "Failed"]]},
+		or_filters={"payment_id": payment_key, "name": payment_key},
+		fields=["name", "next_attempt_on"],
+		order_by="creation asc",
+	)
+
+
+def process_webhook_event(name):
+	from lms.lms.payment_webhooks import dispatch_webhook_event
+
+	event = frappe.get_doc("LMS Webhook Event", name)
+	event.db_set("status", "Processing", commit=True)
+
+	try:
+		result = dispatch_webhook_event(event.provider, json.loads(event.payload))
+		if not result.get("success") and not result.get("ignored"):
+			frappe.throw(result.get("error") or result.get("message") or _("Webhook processing failed"))
+
+	except Exception:
+		frappe.db.rollback()
+		attempts = event.attempts + 1
+		dead = attempts >= MAX_WEBHOOK_ATTEMPTS
+		event.db_set(
+			{
+				"status": "Dead" if dead else "Failed",
+				"attempts": attempts,
+				"next_attempt_on": None if dead else add_to_date(now_datetime(), minutes=2**attempts),
+				"error": frappe.get_traceback(),
+			},
+			commit=True,
+		)
+		return False
+
+	event.db_set(
+		{
+			"status": "Processed",
+			"attempts": event.attempts + 1,
+			"next_attempt_on": None,
+			"processed_on": now_datetime(),
+			"response": json.dumps(result, default=str, indent=1),
+			"error": None,
+		},
+		commit=True,
+	)
+	return True
+
+
+def retry_webhook_events():
+	"""Picks up failed events that are due for a retry, events that were
+	never picked up and events abandoned by a crashed worker."""
+	stale = add_to_date(now_datetime(), minutes=-PROCESSING_TIMEOUT_MINUTES)
+	frappe.db.set_value(
+		"LMS Webhook Event",
+		{"status": "Processing", "modified": ["<", stale]},
+		"status",
+		"Queued",
+	)
+
+	events = frappe.get_all(
+		"LMS Webhook Event",
+		filters={"status": ["in", ["Queued", "Failed"]]},
+		or_filters={"next_attempt_on": ["<=", now_datetime()], "status": "Queued"},
+		fields=["name", "payment_id"],
+	)
+	for payment_key in {event.payment_id or event.name for event in events}:
+		enqueue_payment_events(payment_key)
+
+
+@frappe.whitelist()
+def replay_webhook_event(event):
+	"""Queues an event to be processed again, including dead events and
+	events that were already processed."""
+	frappe.only_for("System Manager")
+	doc = frappe.get_doc("LMS Webhook Event", event)
+	doc.db_set({"status": "Queued", "attempts": 0, "next_attempt_on": None, "error": None})
+	enqueue_payment_events(doc.payment_id or doc.name)
+
+
+@frappe.whitelist()
+def replay_dead_webhook_events(provider=None):
+	frappe.only_for("System Manager")
+	filters = {"status": "Dead"}
+	if provider:
+		filters["provider"] = provider
+
+	events = frappe.get_all("LMS Webhook Event", filters=filters, pluck="name")
+	for event in events:
+		replay_webhook_event(event)
+
+	return len(events)
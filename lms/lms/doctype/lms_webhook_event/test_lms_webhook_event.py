@@ -0,0 +1,47 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from lms.lms.doctype.lms_webhook_event.lms_webhook_event import record_webhook_event
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestLMSWebhookEvent(UnitTestCase):
+	"""
+	Unit tests for LMSWebhookEvent.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestLMSWebhookEvent(IntegrationTestCase):
+	"""
+	Integration tests for LMSWebhookEvent.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	@patch("lms.lms.doctype.lms_webhook_event.lms_webhook_event.enqueue_payment_events")
+	def test_duplicate_delivery_is_ignored(self, enqueue):
+		payload = json.dumps({"payment_status": "completed", "payment_id": "pay_duplicate_test"})
+		event = {
+			"provider": "Custom",
+			"event_id": "evt_duplicate_test",
+			"event_type": "payment.completed",
+			"payment_id": "pay_duplicate_test",
+		}
+
+		self.assertTrue(record_webhook_event(payload=payload, **event))
+		self.assertFalse(record_webhook_event(payload=payload, **event))
+		self.assertEqual(frappe.db.count("LMS Webhook Event", {"event_id": "evt_duplicate_test"}), 1)
+		enqueue.assert_called_once_with("pay_duplicate_test")
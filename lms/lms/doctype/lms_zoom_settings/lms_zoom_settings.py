@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from lms.lms.zoom import clear_access_token
+
 
 class LMSZoomSettings(Document):
-	pass
+	def on_update(self):
+		clear_access_token(self.name)
+
+	def on_trash(self):
+		clear_access_token(self.name)
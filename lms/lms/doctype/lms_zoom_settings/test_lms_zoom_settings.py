@@ -1,9 +1,17 @@
 # Copyright (c) 2025, Frappe and Contributors
 # See license.txt
 
-# import frappe
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from lms.lms import zoom
+
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
 # Use these module variables to add/remove to/from that list
@@ -11,6 +19,56 @@ EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 
 
+class ZoomStub(BaseHTTPRequestHandler):
+	"""A tiny stand-in for the zoom oauth and meetings endpoints."""
+
+	token_requests = 0
+	revoke_next_token = False
+	meeting_requests = 0
+	meeting_statuses = []
+
+	def do_POST(self):
+		if self.path.startswith("/oauth/token"):
+			ZoomStub.token_requests += 1
+			self.respond(200, {"access_token": f"token-{ZoomStub.token_requests}", "expires_in": 3600})
+		elif self.path.endswith("/meetings"):
+			ZoomStub.meeting_requests += 1
+			status = ZoomStub.meeting_statuses.pop(0) if ZoomStub.meeting_statuses else 201
+			self.respond(status, {"id": ZoomStub.meeting_requests})
+		else:
+			self.do_GET()
+
+	def do_GET(self):
+		if ZoomStub.revoke_next_token:
+			ZoomStub.revoke_next_token = False
+			self.respond(401, {"message": "Invalid access token."})
+			return
+		if "/participants" in self.path:
+			page = parse_qs(urlparse(self.path).query).get("next_page_token", ["1"])[0]
+			self.respond(
+				200,
+				{
+					"participants": [{"user_email": f"page-{page}@example.com"}],
+					"next_page_token": "2" if page == "1" else "",
+				},
+			)
+			return
+		self.respond(200, {"authorization": self.headers.get("Authorization")})
+
+	def respond(self, status, data):
+		body = json.dumps(data).encode()
+		self.send_response(status)
+		if status == 429:
+			self.send_header("Retry-After", "0")
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
 class UnitTestLMSZoomSettings(UnitTestCase):
 	"""
 	Unit tests for LMSZoomSettings.
@@ -26,4 +84,72 @@ class IntegrationTestLMSZoomSettings(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ZoomStub)
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+		base_url = f"http://127.0.0.1:{cls.server.server_port}"
+		cls.conf = patch.dict(
+			frappe.conf, {"zoom_api_url": f"{base_url}/v2", "zoom_oauth_url": f"{base_url}/oauth/token"}
+		)
+		cls.conf.start()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.conf.stop()
+		cls.server.shutdown()
+		super().tearDownClass()
+
+	def setUp(self):
+		ZoomStub.token_requests = 0
+		ZoomStub.meeting_requests = 0
+		if not frappe.db.exists("LMS Zoom Settings", "Test Zoom Account"):
+			frappe.get_doc(
+				{
+					"doctype": "LMS Zoom Settings",
+					"account_name": "Test Zoom Account",
+					"enabled": 1,
+					"member": "Administrator",
+					"account_id": "account",
+					"client_id": "client",
+					"client_secret": "secret",
+				}
+			).insert()
+		zoom.clear_access_token("Test Zoom Account")
+
+	def test_access_token_is_cached(self):
+		first = zoom.get_access_token("Test Zoom Account")
+		second = zoom.get_access_token("Test Zoom Account")
+		self.assertEqual(first, second)
+		self.assertEqual(ZoomStub.token_requests, 1)
+
+	def test_token_refreshed_on_unauthorized(self):
+		ZoomStub.revoke_next_token = True
+		response = zoom.get("Test Zoom Account", "/users/me")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json()["authorization"], "Bearer token-2")
+		self.assertEqual(ZoomStub.token_requests, 2)
+
+	def test_meeting_creation_is_not_retried_on_server_error(self):
+		ZoomStub.meeting_statuses = [502]
+		response = zoom.post("Test Zoom Account", "/users/me/meetings", json={})
+		self.assertEqual(response.status_code, 502)
+		self.assertEqual(ZoomStub.meeting_requests, 1)
+
+	def test_meeting_creation_is_retried_on_rate_limit(self):
+		ZoomStub.meeting_statuses = [429]
+		response = zoom.post("Test Zoom Account", "/users/me/meetings", json={})
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(ZoomStub.meeting_requests, 2)
+
+	def test_all_pages_are_read_through_make_request(self):
+		ZoomStub.revoke_next_token = True
+		participants = zoom.get_all_pages(
+			"Test Zoom Account", "/past_meetings/abc/participants", "participants"
+		)
+		self.assertEqual(
+			[participant["user_email"] for participant in participants],
+			["page-1@example.com", "page-2@example.com"],
+		)
+		self.assertEqual(ZoomStub.token_requests, 2)
@@ -0,0 +1,158 @@
+"""
+Invoice numbers look like INV-2026-10-00042 and restart every month.
+
+There are two ways to hand them out, picked with the Gap-free Invoice
+Numbers setting in LMS Settings.
+
+Block allocation, the default, reads the database once per block. Each
+worker process reserves a block of BLOCK_SIZE numbers at a time by
+adding BLOCK_SIZE to the month's row in LMS Invoice Sequence, on a
+connection of its own that commits right away. It drops the numbers of
+the block already taken by invoices created in gap-free mode, and hands
+the rest out from memory. Workers only wait for each other while a block
+is reserved, and numbers are unique and increase within a worker, but
+they are not in creation order across workers. Numbers left in a block
+when a worker exits are never used, so there can be gaps.
+
+Gap-free allocation increments the month's row in LMS Invoice Sequence
+inside the caller's transaction. The row stays locked until the invoice
+is committed, and a rollback returns the number, so the numbers have no
+gaps and follow the commit order. Invoices of the same month are created
+one at a time.
+"""
+
+import threading
+
+import frappe
+from frappe.utils import getdate, now
+
+BLOCK_SIZE = 20
+
+_blocks = {}
+_lock = threading.Lock()
+
+
+def next_invoice_number(date=None):
+	"""Returns the next invoice number for the month of `date`."""
+	prefix = get_prefix(date)
+	if frappe.db.get_single_value("LMS Settings", "gap_free_invoice_numbers"):
+		number = allocate_gap_free(prefix)
+	else:
+		number = allocate_from_block(prefix)
+	return format_invoice_number(prefix, number)
+
+
+def get_prefix(date=None):
+	return getdate(date).strftime("INV-%Y-%m-")
+
+
+def format_invoice_number(prefix, number):
+	return f"{prefix}{number:05d}"
+
+
+def allocate_from_block(prefix):
+	key = (frappe.local.site, prefix)
+	with _lock:
+		block = _blocks.get(key)
+		while not block:
+			block = _blocks[key] = reserve_block(prefix)
+		return block.pop()
+
+
+def reserve_block(prefix):
+	"""Returns the numbers of a newly reserved block that no invoice uses
+	yet, last first."""
+	# the reservation is committed at once, whatever becomes of the caller's
+	# transaction, and the row is locked only for as long as it takes
+	db = connect_db()
+	try:
+		if not db.sql("select name from `tabLMS Invoice Sequence` where name = %s", prefix):
+			# start the month after the numbers already used
+			user = frappe.session.user
+			db.sql(
+				"""
+				insert ignore into `tabLMS Invoice Sequence`
+					(name, prefix, `current`, creation, modified, owner, modified_by)
+				values (%(prefix)s, %(prefix)s, %(current)s, %(now)s, %(now)s, %(user)s, %(user)s)
+				""",
+				{"prefix": prefix, "current": get_last_used_number(prefix), "now": now(), "user": user},
+			)
+		db.sql(
+			"update `tabLMS Invoice Sequence` set `current` = `current` + %s where name = %s",
+			(BLOCK_SIZE, prefix),
+		)
+		last = db.sql("select `current` from `tabLMS Invoice Sequence` where name = %s", prefix)[0][0]
+		db.commit()
+	finally:
+		db.close()
+
+	numbers = range(last - BLOCK_SIZE + 1, last + 1)
+	# skip numbers used by invoices created in gap-free mode
+	used = frappe.get_all(
+		"LMS Invoice",
+		{"name": ["in", [format_invoice_number(prefix, number) for number in numbers]]},
+		pluck="name",
+	)
+	return [number for number in reversed(numbers) if format_invoice_number(prefix, number) not in used]
+
+
+def connect_db():
+	"""Returns a new connection to the site's database, set up like the one
+	of frappe.connect."""
+	from frappe.database import get_db
+
+	conf = frappe.local.conf
+	return get_db(
+		socket=conf.db_socket,
+		host=conf.db_host,
+		port=conf.db_port,
+		user=conf.db_user or conf.db_name,
+		password=None,
+		cur_db_name=conf.db_name,
+	)
+
+
+def allocate_gap_free(prefix):
+	current = frappe.db.sql(
+		"select `current` from `tabLMS Invoice Sequence` where name = %s for update", prefix
+	)
+	if not current:
+		try:
+			frappe.get_doc(
+				{
+					"doctype": "LMS Invoice Sequence",
+					"name": prefix,
+					"prefix": prefix,
+					"current": get_last_used_number(prefix),
+				}
+			).db_insert()
+		except frappe.DuplicateEntryError:
+			# another transaction created the month's row first
+			pass
+		return allocate_gap_free(prefix)
+
+	number = current[0][0] + 1
+	# skip numbers handed out from blocks before the setting was turned on
+	while frappe.db.exists("LMS Invoice", format_invoice_number(prefix, number)):
+		number += 1
+
+	frappe.db.sql("update `tabLMS Invoice Sequence` set `current` = %s where name = %s", (number, prefix))
+	return number
+
+
+def get_last_used_number(prefix):
+	"""Returns the highest number used by an invoice of the month, ignoring
+	the suffix of amended invoices."""
+	last = frappe.db.sql(
+		"""
+		select max(cast(substring(name, %(start)s, 5) as unsigned))
+		from `tabLMS Invoice`
+		where name like %(pattern)s
+		""",
+		{"start": len(prefix) + 1, "pattern": f"{prefix}%"},
+	)
+	return (last and last[0][0]) or 0
+
+
+def clear_reserved_blocks():
+	_blocks.clear()
@@ -0,0 +1,215 @@
+"""
+The mailer module queues the same email for many recipients at once.
+
+The message is rendered once per distinct set of template arguments, so
+recipients that are greeted the same way share one rendering, and turned
+into a single MIME message per chunk of recipients through frappe's
+QueueBuilder, which adds the unsubscribe footer. Each chunk is written
+as one Email Queue row with its recipient rows bulk inserted, which
+frappe later sends to every recipient separately.
+
+Every recipient that has been queued is recorded in LMS Notification Log
+under a notification key, in the same transaction as the Email Queue
+rows. Running the same notification again only mails the recipients that
+were not queued before, so scheduled jobs can be retried or resumed
+safely.
+"""
+
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.email.doctype.email_queue.email_queue import QueueBuilder
+from frappe.email.email_body import get_email_from_template
+from frappe.utils import create_batch, now_datetime
+
+BULK_MAIL_CHUNK_SIZE = 500
+
+
+def send_bulk_mail(
+	notification,
+	recipients,
+	subject,
+	template=None,
+	args=None,
+	message=None,
+	header=None,
+	reference_doctype=None,
+	reference_name=None,
+	sender=None,
+	recipient_args=None,
+):
+	"""Queues one email for all recipients and returns the number of
+	recipients that were queued.
+
+	`notification` identifies this mailing together with the reference
+	document, e.g. "batch_start_reminder" for an LMS Batch.
+	`recipient_args` maps a recipient to the template arguments that are
+	their own, e.g. {"student_name": ...}, added to `args` for them.
+	"""
+	recipients = get_pending_recipients(notification, recipients, reference_doctype, reference_name)
+	if not recipients:
+		return 0
+
+	for own_args, group in group_recipients(recipients, recipient_args).items():
+		text_content = None
+		if template:
+			message, text_content = get_email_from_template(template, {**(args or {}), **dict(own_args)})
+
+		for chunk in create_batch(group, BULK_MAIL_CHUNK_SIZE):
+			email_queue = queue_mail(
+				chunk, subject, message, text_content, header, reference_doctype, reference_name, sender
+			)
+			log_notifications(notification, chunk, reference_doctype, reference_name, email_queue)
+			frappe.db.commit()
+
+	return len(recipients)
+
+
+def group_recipients(recipients, recipient_args=None):
+	"""Returns {own args: recipients}, so the message is rendered once for
+	all recipients with the same arguments."""
+	groups = {}
+	for recipient in recipients:
+		own_args = (recipient_args or {}).get(recipient) or {}
+		groups.setdefault(tuple(sorted(own_args.items())), []).append(recipient)
+	return groups
+
+
+def get_pending_recipients(notification, recipients, reference_doctype=None, reference_name=None):
+	"""Returns the enabled users from recipients that have not opted out of
+	these emails and have not already received this notification."""
+	recipients = list(dict.fromkeys(recipient for recipient in recipients if recipient))
+	if not recipients:
+		return []
+
+	enabled = set(frappe.get_all("User", {"name": ["in", recipients], "enabled": 1}, pluck="name"))
+	excluded = get_unsubscribed(recipients, reference_doctype, reference_name)
+	excluded.update(
+		frappe.get_all(
+			"LMS Notification Log",
+			{
+				"notification": notification,
+				"reference_doctype": reference_doctype,
+				"reference_name": reference_name,
+				"recipient": ["in", recipients],
+			},
+			pluck="recipient",
+		)
+	)
+
+	return [recipient for recipient in recipients if recipient in enabled and recipient not in excluded]
+
+
+def get_unsubscribed(recipients, reference_doctype=None, reference_name=None):
+	unsubscribed = frappe.get_all(
+		"Email Unsubscribe",
+		filters={"email": ["in", recipients]},
+		or_filters={"global_unsubscribe": 1, "reference_doctype": reference_doctype or ""},
+		fields=["email", "global_unsubscribe", "reference_name"],
+	)
+	return {
+		row.email
+		for row in unsubscribed
+		if row.global_unsubscribe or not row.reference_name or row.reference_name == reference_name
+	}
+
+
+def queue_mail(recipients, subject, message, text_content, header, reference_doctype, reference_name, sender):
+	# the builder adds the unsubscribe footer, the rows are written here in bulk
+	queue_data = QueueBuilder(
+		recipients=recipients,
+		sender=sender,
+		subject=subject,
+		message=message,
+		text_content=text_content,
+		header=header,
+		reference_doctype=reference_doctype,
+		reference_name=reference_name,
+		unsubscribe_method="/api/method/frappe.email.queue.unsubscribe",
+		unsubscribe_message=_("Unsubscribe"),
+	).as_dict(include_recipients=False)
+
+	# new_doc sets the defaults, like the Not Sent status, that db_insert doesn't
+	email_queue = frappe.new_doc("Email Queue")
+	email_queue.update(queue_data)
+	email_queue.db_insert()
+
+	now = now_datetime()
+	owner = frappe.session.user
+	frappe.db.bulk_insert(
+		"Email Queue Recipient",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"idx",
+			"recipient",
+			"status",
+		],
+		values=[
+			(
+				frappe.generate_hash(),
+				now,
+				now,
+				owner,
+				owner,
+				email_queue.name,
+				"Email Queue",
+				"recipients",
+				idx,
+				recipient,
+				"Not Sent",
+			)
+			for idx, recipient in enumerate(recipients, start=1)
+		],
+	)
+	return email_queue.name
+
+
+def log_notifications(notification, recipients, reference_doctype, reference_name, email_queue):
+	now = now_datetime()
+	owner = frappe.session.user
+	frappe.db.bulk_insert(
+		"LMS Notification Log",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"notification",
+			"recipient",
+			"reference_doctype",
+			"reference_name",
+			"email_queue",
+		],
+		values=[
+			(
+				get_log_name(notification, recipient, reference_doctype, reference_name),
+				now,
+				now,
+				owner,
+				owner,
+				notification,
+				recipient,
+				reference_doctype,
+				reference_name,
+				email_queue,
+			)
+			for recipient in recipients
+		],
+		ignore_duplicates=True,
+	)
+
+
+def get_log_name(notification, recipient, reference_doctype, reference_name):
+	"""The log name is derived from what was sent to whom, so a recipient can
+	only ever be logged once per notification."""
+	key = f"{notification}:{reference_doctype}:{reference_name}:{recipient}"
+	return hashlib.sha1(key.encode()).hexdigest()[:20]
@@ -11,22 +11,89 @@ Apps can provide a hook lms_markdown_macro_renderers, a
 dictionary mapping the macro name to the function that to render
 that macro. The function will get the argument passed to the macro
 as argument.
+
+Rendered html is cached by the hash of the markdown text and the
+language, since macros render translated strings. Macros whose output
+depends on the user or on other documents (DYNAMIC_MACROS) are left as
+placeholders in the cached html and rendered on every call. The
+placeholders carry a token made up for each compile, so a comment in
+the lesson can't pass for one.
 """
 
-import html as HTML
+import hashlib
 import re
-import xml.etree.ElementTree as etree
+import secrets
+import threading
+from html.parser import HTMLParser
 
 import frappe
 import markdown
-from bs4 import BeautifulSoup
 from markdown import Extension
 from markdown.inlinepatterns import InlineProcessor
 
+import lms
+
+# bump when the output of a cached macro renderer changes
+MACRO_VERSION = 2
+DYNAMIC_MACROS = ("Quiz", "Exercise")
+RENDER_CACHE_KEY = "lms:markdown"
+RENDER_CACHE_TTL = 7 * 24 * 60 * 60
+
+MACRO_PLACEHOLDER = "<!-- lms-macro-{token}-{index} -->"
+
+VOID_TAGS = {
+	"area",
+	"base",
+	"br",
+	"col",
+	"embed",
+	"hr",
+	"img",
+	"input",
+	"link",
+	"meta",
+	"source",
+	"track",
+	"wbr",
+}
+
+_local = threading.local()
+_registries = {}
+
 
 def markdown_to_html(text):
 	"""Renders markdown text into html."""
-	return markdown.markdown(text, extensions=["fenced_code", MacroExtension()])
+	text = text or ""
+	digest = hashlib.sha1(text.encode()).hexdigest()
+	key = f"{RENDER_CACHE_KEY}:{lms.__version__}:{MACRO_VERSION}:{frappe.local.lang}:{digest}"
+	page = frappe.cache().get_value(key)
+	if page is None:
+		page = compile_markdown(text)
+		frappe.cache().set_value(key, page, expires_in_sec=RENDER_CACHE_TTL)
+	return render_dynamic_macros(page)
+
+
+def compile_markdown(text):
+	"""Returns the html of the text, with placeholders for the dynamic
+	macros, the list of those macros and the token of their placeholders."""
+	md = get_markdown()
+	html = md.reset().convert(text)
+	return {"html": html, "macros": md.dynamic_macros[:], "token": md.macro_token}
+
+
+def render_dynamic_macros(page):
+	html = page["html"]
+	for index, macro in enumerate(page["macros"]):
+		placeholder = MACRO_PLACEHOLDER.format(token=page["token"], index=index)
+		html = html.replace(placeholder, render_macro_html(*macro))
+	return html
+
+
+def get_markdown():
+	"""Returns the Markdown instance of the current thread."""
+	if not hasattr(_local, "md"):
+		_local.md = markdown.Markdown(extensions=["fenced_code", MacroExtension()])
+	return _local.md
 
 
 def find_macros(text):
@@ -62,8 +129,14 @@ def _remove_quotes(value):
 
 
 def get_macro_registry():
-	d = frappe.get_hooks("lms_markdown_macro_renderers") or {}
-	return {name: frappe.get_attr(klass[0]) for name, klass in d.items()}
+	"""Returns the macro renderers of the site, resolved once per process."""
+	registry = _registries.get(frappe.local.site)
+	if registry is None:
+		d = frappe.get_hooks("lms_markdown_macro_renderers") or {}
+		registry = _registries[frappe.local.site] = {
+			name: frappe.get_attr(klass[0]) for name, klass in d.items()
+		}
+	return registry
 
 
 def render_macro(macro_name, macro_argument):
@@ -77,6 +150,10 @@ def render_macro(macro_name, macro_argument):
 		return f"<p>Unknown macro: {macro_name}</p>"
 
 
+def render_macro_html(macro_name, macro_argument):
+	return sanitize_html(str(render_macro(macro_name, macro_argument)), macro_name)
+
+
 MACRO_RE = r"{{ *(\w+)\(([^{}]*)\) *}}"
 
 
@@ -85,10 +162,15 @@ class MacroExtension(Extension):
 
 	def extendMarkdown(self, md):
 		self.md = md
-		pattern = MacroInlineProcessor(MACRO_RE)
-		pattern.md = md
+		self.reset()
+		md.registerExtension(self)
+		pattern = MacroInlineProcessor(MACRO_RE, md)
 		md.inlinePatterns.register(pattern, "macro", 75)
 
+	def reset(self):
+		self.md.dynamic_macros = []
+		self.md.macro_token = secrets.token_hex(8)
+
 
 class MacroInlineProcessor(InlineProcessor):
 	"""MacroInlineProcessor is class that is handles the logic
@@ -96,28 +178,76 @@ class MacroInlineProcessor(InlineProcessor):
 	"""
 
 	def handleMatch(self, m, data):
-		"""Handles each macro match and return rendered contents
-		for that macro as an etree node.
+		"""Handles each macro match and returns a placeholder for the
+		rendered contents, which markdown puts back as raw html.
 		"""
 		macro = m.group(1)
-		arg = m.group(2)
-		html = render_macro(macro, arg)
-		html = sanitize_html(str(html), macro)
-		e = etree.fromstring(html)
-		return e, m.start(0), m.end(0)
+		arg = _remove_quotes(m.group(2))
+		if macro in DYNAMIC_MACROS:
+			self.md.dynamic_macros.append((macro, arg))
+			html = MACRO_PLACEHOLDER.format(token=self.md.macro_token, index=len(self.md.dynamic_macros) - 1)
+		else:
+			html = render_macro_html(macro, arg)
+		return self.md.htmlStash.store(html), m.start(0), m.end(0)
 
 
 def sanitize_html(html, macro):
-	"""Sanitize the html using BeautifulSoup.
+	"""Closes the tags left open by the macro's html, drops the stray
+	closing tags and wraps it in a div.
 
-	The markdown processor request the correct markup and crashes on
-	any broken tags. This makes sures that all those things are fixed
-	before passing to the etree parser.
+	The html goes into the page as it is, so a broken tag would
+	otherwise break the markup of the rest of the lesson.
 	"""
-	soup = BeautifulSoup(html, features="lxml")
-	nodes = soup.body.children
+	balancer = TagBalancer()
+	balancer.feed(html)
+	balancer.close()
+
 	classname = ""
 	if macro == "YouTubeVideo":
 		classname = "lesson-video"
 
-	return "<div class='" + classname + "'>" + "\n".join(str(node) for node in nodes) + "</div>"
+	return "<div class='" + classname + "'>" + balancer.get_html() + "</div>"
+
+
+class TagBalancer(HTMLParser):
+	"""Rewrites html with every element closed, without building a tree."""
+
+	def __init__(self):
+		super().__init__(convert_charrefs=False)
+		self.out = []
+		self.open_tags = []
+
+	def get_html(self):
+		return "".join(self.out + [f"</{tag}>" for tag in reversed(self.open_tags)])
+
+	def handle_starttag(self, tag, attrs):
+		self.out.append(self.get_starttag_text())
+		if tag not in VOID_TAGS:
+			self.open_tags.append(tag)
+
+	def handle_startendtag(self, tag, attrs):
+		self.out.append(self.get_starttag_text())
+
+	def handle_endtag(self, tag):
+		if tag not in self.open_tags:
+			return
+		while self.open_tags:
+			open_tag = self.open_tags.pop()
+			self.out.append(f"</{open_tag}>")
+			if open_tag == tag:
+				break
+
+	def handle_data(self, data):
+		self.out.append(data)
+
+	def handle_entityref(self, name):
+		self.out.append(f"&{name};")
+
+	def handle_charref(self, name):
+		self.out.append(f"&#{name};")
+
+	def handle_comment(self, data):
+		self.out.append(f"<!--{data}-->")
+
+	def handle_decl(self, decl):
+		self.out.append(f"<!{decl}>")
@@ -0,0 +1,284 @@
+"""
+Fulfillment of received payments.
+
+A received LMS Payment is fulfilled by fulfill_payment, which in one
+transaction
+
+    1. marks the payment as received,
+    2. creates and submits its invoice, unless it already has one,
+    3. enrolls the member in the course or batch, or records the
+       certificate purchase.
+
+Each step writes directly to the database instead of saving documents
+that trigger the next step from their hooks, and each one is skipped when
+it was already done. Fulfilling a payment twice is therefore safe and
+costs only the reads. Nothing here commits; the caller owns the
+transaction, so a failure rolls back all three steps together.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import nowdate
+
+PAYMENT_FIELDS = [
+	"name",
+	"member",
+	"payment_received",
+	"payment_for_document_type",
+	"payment_for_document",
+	"payment_for_certificate",
+	"amount",
+	"currency",
+	"order_id",
+	"payment_id",
+	"billing_name",
+	"address",
+	"gstin",
+	"pan",
+	"source",
+]
+
+
+def fulfill_payment(payment_name):
+	"""Fulfills a received payment and returns the name of its invoice."""
+	payment = frappe.db.get_value("LMS Payment", payment_name, PAYMENT_FIELDS, as_dict=1, for_update=True)
+	if not payment:
+		frappe.throw(_("Payment {0} does not exist").format(payment_name), frappe.DoesNotExistError)
+
+	if not payment.payment_received:
+		frappe.db.set_value("LMS Payment", payment.name, "payment_received", 1)
+		payment.payment_received = 1
+
+	invoice = get_or_create_invoice(payment)
+	enroll_member(payment)
+	return invoice
+
+
+def get_or_create_invoice(payment, title=None):
+	"""Returns the submitted invoice of the payment, submitting a draft or
+	creating a new one if needed."""
+	existing = frappe.db.get_value(
+		"LMS Invoice",
+		{"payment_reference": payment.name, "docstatus": ["<", 2]},
+		["name", "docstatus"],
+		as_dict=1,
+	)
+	if existing and existing.docstatus == 1:
+		return existing.name
+
+	if existing:
+		invoice = frappe.get_doc("LMS Invoice", existing.name)
+	else:
+		invoice = frappe.get_doc(get_invoice_values(payment, title))
+		invoice.flags.ignore_permissions = True
+		invoice.insert()
+
+	invoice.status = "Paid"
+	invoice.flags.in_fulfillment = True
+	invoice.flags.ignore_permissions = True
+	invoice.submit()
+	return invoice.name
+
+
+def get_invoice_values(payment, title=None):
+	"""Returns the fields of a new invoice for the payment. `title` is the
+	title of the course or batch, looked up when not given."""
+	document_type, document = payment.payment_for_document_type, payment.payment_for_document
+	if title is None:
+		title = frappe.db.get_value(document_type, document, "title") if document else None
+
+	if payment.payment_for_certificate:
+		payment_for = _("Certificate: {0}").format(title or document)
+	elif document_type == "LMS Batch":
+		payment_for = _("Batch Enrollment: {0}").format(title or document)
+	else:
+		payment_for = _("Course Enrollment: {0}").format(title or document)
+
+	return {
+		"doctype": "LMS Invoice",
+		"customer": payment.member,
+		"payment_reference": payment.name,
+		"course": document if document_type == "LMS Course" else None,
+		"payment_for": payment_for,
+		"amount": payment.amount,
+		"invoice_date": nowdate(),
+		"status": "Paid",
+		"order_id": payment.order_id,
+		"payment_id": payment.payment_id,
+		"currency": payment.currency,
+		"billing_name": payment.billing_name,
+		"address": payment.address,
+		"gstin": payment.gstin,
+		"pan": payment.pan,
+	}
+
+
+def enroll_member(payment):
+	"""Gives the member what they paid for, unless they already have it."""
+	document_type, document = payment.payment_for_document_type, payment.payment_for_document
+	if not (payment.member and document):
+		return
+
+	if payment.payment_for_certificate:
+		frappe.db.set_value(
+			"LMS Enrollment",
+			{"member": payment.member, "course": document},
+			{"purchased_certificate": 1, "payment": payment.name},
+		)
+	elif document_type == "LMS Course":
+		enroll_in_course(payment)
+	elif document_type == "LMS Batch":
+		enroll_in_batch(payment)
+
+
+def enroll_in_course(payment):
+	enrollment = frappe.db.get_value(
+		"LMS Enrollment",
+		{"member": payment.member, "course": payment.payment_for_document},
+		["name", "payment"],
+		as_dict=1,
+	)
+	if enrollment:
+		if enrollment.payment != payment.name:
+			frappe.db.set_value("LMS Enrollment", enrollment.name, "payment", payment.name)
+		return
+
+	frappe.get_doc(
+		{
+			"doctype": "LMS Enrollment",
+			"member": payment.member,
+			"course": payment.payment_for_document,
+			"payment": payment.name,
+		}
+	).insert(ignore_permissions=True)
+
+
+def enroll_in_batch(payment):
+	batch = payment.payment_for_document
+	if frappe.db.exists("LMS Batch Enrollment", {"batch": batch, "member": payment.member}):
+		return
+
+	# a member who has paid is enrolled even if the batch filled up after checkout
+	frappe.get_doc(
+		{
+			"doctype": "LMS Batch Enrollment",
+			"member": payment.member,
+			"batch": batch,
+			"payment": payment.name,
+			"source": payment.source,
+		}
+	).insert(ignore_permissions=True)
+
+
+BULK_INVOICING_CHUNK_SIZE = 200
+BULK_INVOICING_PROGRESS_KEY = "lms:bulk_invoicing_progress"
+
+
+def enqueue_bulk_invoicing(user=None):
+	frappe.enqueue(
+		invoice_completed_payments,
+		queue="long",
+		job_id="lms_bulk_invoicing",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		user=user,
+	)
+
+
+def invoice_completed_payments(user=None):
+	"""Fulfills received payments that don't have an invoice yet.
+
+	Payments are processed in chunks ordered by name with one commit per
+	chunk. The last committed name is kept in the cache, so a job that is
+	restarted after a crash continues after it. Payments that fail are
+	logged and skipped until the next run. Progress is published to `user`
+	with the `lms_bulk_invoicing_progress` realtime event.
+	"""
+	cache = frappe.cache()
+	progress = frappe._dict(cache.get_value(BULK_INVOICING_PROGRESS_KEY) or {})
+	if not progress:
+		progress = frappe._dict(after="", processed=0, failed=0, total=count_payments_without_invoice())
+
+	while True:
+		payments = get_payments_without_invoice(progress.after, BULK_INVOICING_CHUNK_SIZE)
+		if not payments:
+			break
+
+		titles = get_document_titles(payments)
+		for payment in payments:
+			frappe.db.savepoint("bulk_invoicing")
+			try:
+				title = titles.get((payment.payment_for_document_type, payment.payment_for_document), "")
+				get_or_create_invoice(payment, title)
+				enroll_member(payment)
+				progress.processed += 1
+			except Exception:
+				frappe.db.rollback(save_point="bulk_invoicing")
+				frappe.log_error(title=f"Bulk invoicing failed for payment {payment.name}")
+				progress.failed += 1
+
+		progress.after = payments[-1].name
+		frappe.db.commit()
+		cache.set_value(BULK_INVOICING_PROGRESS_KEY, progress)
+		publish_bulk_invoicing_progress(progress, user)
+
+	cache.delete_value(BULK_INVOICING_PROGRESS_KEY)
+	progress.completed = True
+	publish_bulk_invoicing_progress(progress, user)
+	return progress
+
+
+def get_payments_without_invoice(after, limit):
+	fields = ", ".join(f"lp.`{field}`" for field in PAYMENT_FIELDS)
+	return frappe.db.sql(
+		f"""
+		SELECT {fields}
+		FROM `tabLMS Payment` lp
+		WHERE lp.payment_received = 1
+			AND lp.name > %(after)s
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabLMS Invoice` li
+				WHERE li.payment_reference = lp.name AND li.docstatus = 1
+			)
+		ORDER BY lp.name
+		LIMIT %(limit)s
+		""",
+		{"after": after, "limit": limit},
+		as_dict=True,
+	)
+
+
+def count_payments_without_invoice():
+	return frappe.db.sql(
+		"""
+		SELECT COUNT(*)
+		FROM `tabLMS Payment` lp
+		WHERE lp.payment_received = 1
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabLMS Invoice` li
+				WHERE li.payment_reference = lp.name AND li.docstatus = 1
+			)
+		"""
+	)[0][0]
+
+
+def get_document_titles(payments):
+	"""Returns {(doctype, name): title} for the courses and batches the
+	payments are for, with one query per doctype."""
+	names = {}
+	for payment in payments:
+		if payment.payment_for_document:
+			names.setdefault(payment.payment_for_document_type, set()).add(payment.payment_for_document)
+
+	titles = {}
+	for doctype, documents in names.items():
+		if doctype not in ("LMS Course", "LMS Batch"):
+			continue
+		for row in frappe.get_all(doctype, {"name": ["in", list(documents)]}, ["name", "title"]):
+			titles[(doctype, row.name)] = row.title
+	return titles
+
+
+def publish_bulk_invoicing_progress(progress, user):
+	if user:
+		frappe.publish_realtime("lms_bulk_invoicing_progress", progress, user=user)
@@ -9,7 +9,18 @@ frappe.query_reports["Course Progress Summary"] = {
 			label: __("Course"),
 			fieldtype: "Link",
 			options: "LMS Course",
-			reqd: 1,
+		},
+		{
+			fieldname: "page",
+			label: __("Page"),
+			fieldtype: "Int",
+			default: 1,
+		},
+		{
+			fieldname: "page_length",
+			label: __("Page Length"),
+			fieldtype: "Int",
+			default: 500,
 		},
 	],
 };
@@ -5,42 +5,94 @@ import frappe
 from frappe import _
 from frappe.utils import cint
 
+DEFAULT_PAGE_LENGTH = 500
+# how long the report for all courses is cached, in seconds
+SNAPSHOT_TTL = 600
+
 
 def execute(filters=None):
-	columns, data = [], []
+	filters = frappe._dict(filters or {})
+	if filters.course:
+		return get_report(filters)
+
+	# the report for all courses is the expensive one, so it is cached
+	key = f"lms:course_progress_summary:{get_page(filters)}:{get_page_length(filters)}"
+	report = frappe.cache().get_value(key)
+	if not report:
+		report = get_report(filters)
+		frappe.cache().set_value(key, report, expires_in_sec=SNAPSHOT_TTL)
+	return report
+
+
+def get_report(filters):
 	columns = get_columns()
 	data = get_data(filters)
-	charts = get_charts(data)
-	return columns, data, [], charts
+	buckets = get_progress_buckets(filters)
+	charts = get_charts(buckets)
+	return columns, data, get_message(filters, buckets), charts
 
 
 def get_data(filters=None):
-	summary = []
-	query_filter = {}
-	if filters:
-		query_filter = {"course": filters.course}
-
-	memberships = frappe.get_all(
-		"LMS Enrollment",
-		query_filter,
-		["name", "course", "member", "member_name", "progress"],
-		order_by="course",
+	filters = frappe._dict(filters or {})
+	page_length = get_page_length(filters)
+	return frappe.db.sql(
+		f"""
+		SELECT
+			e.course,
+			c.title AS course_name,
+			e.member,
+			e.member_name,
+			FLOOR(e.progress) AS progress
+		FROM `tabLMS Enrollment` e
+		LEFT JOIN `tabLMS Course` c ON c.name = e.course
+		{get_conditions(filters)}
+		ORDER BY e.course, e.name
+		LIMIT %(limit)s OFFSET %(offset)s
+		""",
+		{
+			"course": filters.course,
+			"limit": page_length,
+			"offset": (get_page(filters) - 1) * page_length,
+		},
+		as_dict=True,
 	)
 
-	for membership in memberships:
-		summary.append(
-			frappe._dict(
-				{
-					"course": membership.name,
-					"course_name": frappe.db.get_value("LMS Course", membership.course, "title"),
-					"member": membership.member,
-					"member_name": membership.member_name,
-					"progress": cint(membership.progress),
-				}
-			)
-		)
 
-	return summary
+def get_progress_buckets(filters):
+	"""Counts the enrollments in each progress range, over all pages."""
+	return frappe.db.sql(
+		f"""
+		SELECT
+			COUNT(*) AS total,
+			SUM(CASE WHEN FLOOR(e.progress) <= 10 THEN 1 ELSE 0 END) AS less_than_eleven,
+			SUM(CASE WHEN FLOOR(e.progress) BETWEEN 11 AND 40 THEN 1 ELSE 0 END) AS less_than_forty_one,
+			SUM(CASE WHEN FLOOR(e.progress) BETWEEN 41 AND 70 THEN 1 ELSE 0 END) AS less_than_seventy_one,
+			SUM(CASE WHEN FLOOR(e.progress) BETWEEN 71 AND 99 THEN 1 ELSE 0 END) AS less_than_hundred,
+			SUM(CASE WHEN FLOOR(e.progress) >= 100 THEN 1 ELSE 0 END) AS completed
+		FROM `tabLMS Enrollment` e
+		{get_conditions(filters)}
+		""",
+		{"course": filters.course},
+		as_dict=True,
+	)[0]
+
+
+def get_conditions(filters):
+	return "WHERE e.course = %(course)s" if filters.course else ""
+
+
+def get_page(filters):
+	return max(cint(filters.page), 1)
+
+
+def get_page_length(filters):
+	return max(cint(filters.page_length) or DEFAULT_PAGE_LENGTH, 1)
+
+
+def get_message(filters, buckets):
+	page_length = get_page_length(filters)
+	pages = max((cint(buckets.total) + page_length - 1) // page_length, 1)
+	return _("Page {0} of {1}, {2} enrollments").format(get_page(filters), pages, cint(buckets.total))
 
 
 def get_columns():
@@ -80,28 +132,10 @@ def get_columns():
 	]
 
 
-def get_charts(data):
-	if not data:
+def get_charts(buckets):
+	if not cint(buckets.total):
 		return None
 
-	completed = 0
-	less_than_hundred = 0
-	less_than_seventy_one = 0
-	less_than_forty_one = 0
-	less_than_eleven = 0
-
-	for row in data:
-		if row.progress == 100:
-			completed += 1
-		elif row.progress < 100 and row.progress > 70:
-			less_than_hundred += 1
-		elif row.progress < 71 and row.progress > 40:
-			less_than_seventy_one += 1
-		elif row.progress < 41 and row.progress > 10:
-			less_than_forty_one += 1
-		elif row.progress < 11:
-			less_than_eleven += 1
-
 	charts = {
 		"data": {
 			"labels": ["0-10", "11-40", "41-70", "71-99", "100"],
@@ -109,11 +143,11 @@ def get_charts(data):
 				{
 					"name": "Progress (%)",
 					"values": [
-						less_than_eleven,
-						less_than_forty_one,
-						less_than_seventy_one,
-						less_than_hundred,
-						completed,
+						cint(buckets.less_than_eleven),
+						cint(buckets.less_than_forty_one),
+						cint(buckets.less_than_seventy_one),
+						cint(buckets.less_than_hundred),
+						cint(buckets.completed),
 					],
 				}
 			],
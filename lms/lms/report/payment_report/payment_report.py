@@ -1,5 +1,5 @@
 import frappe
-from frappe.utils import flt, getdate
+from frappe.utils import flt, get_first_day, getdate
 from collections import defaultdict
 
 def execute(filters=None):
@@ -7,94 +7,89 @@ def execute(filters=None):
     columns = [
         {"label": "Course", "fieldname": "course", "fieldtype": "Data", "width": 250},
         {"label": "Month", "fieldname": "month", "fieldtype": "Data", "width": 120},
-        {"label": "Total Payments", "fieldname": "total_payments", "fieldtype": "Currency", "width": 120},
+        {"label": "Currency", "fieldname": "currency", "fieldtype": "Link", "options": "Currency", "width": 100},
+        {"label": "Total Payments", "fieldname": "total_payments", "fieldtype": "Currency", "options": "currency", "width": 120},
         {"label": "Number of Payments", "fieldname": "num_payments", "fieldtype": "Int", "width": 120},
     ]
 
-    data = []
-    summary_dict = defaultdict(lambda: {"total": 0, "count": 0})
-    monthly_total = defaultdict(float)  # Sum of all payments per month
-    total_revenue = 0
-    total_payments_count = 0
-    total_courses = set()
-
     filters = filters or {}
+    data = get_data(filters)
 
-    # Payment filters
-    payment_filters = {}
-    if filters.get("course"):
-        payment_filters["payment_for_document"] = filters["course"]
-    if filters.get("from_date"):
-        payment_filters["creation"] = [">=", filters["from_date"]]
-    if filters.get("to_date"):
-        if "creation" in payment_filters:
-            payment_filters["creation"].append(["<=", filters["to_date"]])
-        else:
-            payment_filters["creation"] = ["<=", filters["to_date"]]
+    # Summary
+    summary = {
+        "Total Revenue": {"type": "Currency", "value": sum(flt(row.total_payments) for row in data)},
+        "Total Payments": {"type": "Int", "value": sum(row.num_payments for row in data)},
+        "Total Courses": {"type": "Int", "value": len({row.course for row in data})},
+    }
 
-    # Fetch payments
-    payments = frappe.get_all(
-        "LMS Payment",
-        fields=["payment_for_document", "amount", "creation"],
-        filters=payment_filters,
-        order_by="creation asc"
-    )
+    return columns, data, {"chart": get_chart(data), "summary": summary}
 
-    # Aggregate
-    for p in payments:
-        month = getdate(p.creation).strftime("%Y-%m")
-        course = p.payment_for_document
-        total_courses.add(course)
-        key = (course, month)
-        summary_dict[key]["total"] += flt(p.amount)
-        summary_dict[key]["count"] += 1
-        monthly_total[month] += flt(p.amount)  # total payments per month
-        total_revenue += flt(p.amount)
-        total_payments_count += 1
 
-    # Table data
-    for (course, month), vals in summary_dict.items():
-        data.append({
-            "course": course,
-            "month": month,
-            "total_payments": vals["total"],
-            "num_payments": vals["count"]
-        })
+def get_data(filters):
+    """Revenue per course and month, read from LMS Revenue Summary.
+
+    The summary is kept per month, so the date filters select the months
+    they fall in.
+    """
+    conditions = ["1=1"]
+    values = {}
+    if filters.get("course"):
+        conditions.append("payment_for_document = %(course)s")
+        values["course"] = filters["course"]
+    if filters.get("from_date"):
+        conditions.append("month >= %(from_date)s")
+        values["from_date"] = get_first_day(filters["from_date"])
+    if filters.get("to_date"):
+        conditions.append("month <= %(to_date)s")
+        values["to_date"] = getdate(filters["to_date"])
 
-    data.sort(key=lambda x: x["month"], reverse=True)
+    return frappe.db.sql(f"""
+        SELECT
+            payment_for_document AS course,
+            DATE_FORMAT(month, '%%Y-%%m') AS month,
+            currency,
+            SUM(total_amount) AS total_payments,
+            SUM(payment_count) AS num_payments
+        FROM `tabLMS Revenue Summary`
+        WHERE {" AND ".join(conditions)}
+        GROUP BY payment_for_document, month, currency
+        HAVING num_payments > 0
+        ORDER BY month DESC, course
+    """, values, as_dict=True)
 
-    # Summary
-    summary = {
-        "Total Revenue": {"type": "Currency", "value": total_revenue},
-        "Total Payments": {"type": "Int", "value": total_payments_count},
-        "Total Courses": {"type": "Int", "value": len(total_courses)},
-    }
 
-    # Chart
-    months = sorted(list({k[1] for k in summary_dict.keys()}))
-    courses = sorted(list({k[0] for k in summary_dict.keys()}))
-    datasets = []
+def get_chart(data):
+    course_totals = defaultdict(float)
+    monthly_total = defaultdict(float)  # Sum of all payments per month
+    for row in data:
+        course_totals[(row.course, row.month)] += flt(row.total_payments)
+        monthly_total[row.month] += flt(row.total_payments)
 
+    months = sorted(monthly_total)
+    courses = sorted({course for course, month in course_totals})
     colors = ["#3498db", "#2ecc71", "#e74c3c", "#f39c12", "#9b59b6", "#1abc9c"]
 
     # Add course datasets
-    for i, course in enumerate(courses):
-        values = [flt(summary_dict.get((course, month), {}).get("total", 0)) for month in months]
-        datasets.append({
+    datasets = [
+        {
             "name": course,
-            "values": values,
+            "values": [course_totals.get((course, month), 0) for month in months],
             "color": colors[i % len(colors)]
-        })
+        }
+        for i, course in enumerate(courses)
+    ]
+
+    if not datasets:
+        return {}
 
     # Add total payments dataset (sum of all courses per month)
-    total_values = [flt(monthly_total.get(month, 0)) for month in months]
     datasets.append({
         "name": "Total Payments",
-        "values": total_values,
+        "values": [monthly_total[month] for month in months],
         "color": "#34495e"  # Dark gray
     })
 
-    chart = {
+    return {
         "data": {
             "labels": months,
             "datasets": datasets
@@ -103,6 +98,4 @@ def execute(filters=None):
         "stacked": False,  # Set True if you want a stacked bar
         "height": 300,
         "title": "Course Revenue and Total Payments by Month"
-    } if datasets else {}
-
-    return columns, data, {"chart": chart, "summary": summary}
+    }
@@ -3,11 +3,39 @@
 
 frappe.query_reports["Prepared Report Analytics"] = {
 	filters: [
-		// {
-		// 	"fieldname": "my_filter",
-		// 	"label": __("My Filter"),
-		// 	"fieldtype": "Data",
-		// 	"reqd": 1,
-		// },
+		{
+			fieldname: "course",
+			label: __("Course"),
+			fieldtype: "Link",
+			options: "LMS Course",
+		},
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+		},
 	],
+
+	onload(report) {
+		report.page.add_inner_button(__("Refresh"), () => refresh_analytics(false));
+		report.page.add_inner_button(__("Recompute All"), () => refresh_analytics(true));
+	},
 };
+
+function refresh_analytics(full) {
+	frappe.call({
+		method: "lms.lms.doctype.lms_course_analytics.lms_course_analytics.enqueue_refresh",
+		args: { full: full },
+		callback() {
+			frappe.show_alert({
+				message: __("Analytics are being refreshed in the background"),
+				indicator: "blue",
+			});
+		},
+	});
+}
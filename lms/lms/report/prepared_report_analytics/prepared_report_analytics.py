@@ -1,21 +1,24 @@
 # Copyright (c) 2025, Frappe and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe import _
+from frappe.utils import get_first_day, getdate
 
 
 def execute(filters: dict | None = None):
 	"""Return columns and data for the report.
 
-	This is the main entry point for the report. It accepts the filters as a
-	dictionary and should return columns and data. It is called by the framework
-	every time the report is refreshed or a filter is updated.
+	The numbers are computed in the background by
+	lms.lms.doctype.lms_course_analytics.lms_course_analytics.refresh_course_analytics
+	and only read here, so the report opens instantly however much data
+	there is.
 	"""
+	filters = frappe._dict(filters or {})
 	columns = get_columns()
-	data = get_data()
+	data = get_data(filters)
 
-	return columns, data
+	return columns, data, get_message()
 
 
 def get_columns() -> list[dict]:
@@ -25,24 +28,59 @@ def get_columns() -> list[dict]:
 	"""
 	return [
 		{
-			"label": _("Column 1"),
-			"fieldname": "column_1",
-			"fieldtype": "Data",
-		},
-		{
-			"label": _("Column 2"),
-			"fieldname": "column_2",
-			"fieldtype": "Int",
+			"label": _("Course"),
+			"fieldname": "course",
+			"fieldtype": "Link",
+			"options": "LMS Course",
+			"width": 220,
 		},
+		{"label": _("Month"), "fieldname": "month", "fieldtype": "Data", "width": 100},
+		{"label": _("Enrollments"), "fieldname": "enrollments", "fieldtype": "Int", "width": 120},
+		{"label": _("Completions"), "fieldname": "completions", "fieldtype": "Int", "width": 120},
+		{"label": _("Quiz Submissions"), "fieldname": "quiz_submissions", "fieldtype": "Int", "width": 140},
+		{"label": _("Quiz Pass Rate"), "fieldname": "quiz_pass_rate", "fieldtype": "Percent", "width": 130},
+		{"label": _("Revenue"), "fieldname": "revenue", "fieldtype": "Currency", "width": 120},
+		{"label": _("Active Learners"), "fieldname": "active_learners", "fieldtype": "Int", "width": 130},
 	]
 
 
-def get_data() -> list[list]:
+def get_data(filters) -> list[dict]:
 	"""Return data for the report.
 
-	The report data is a list of rows, with each row being a list of cell values.
+	The report data is a list of rows, one per course and month.
 	"""
-	return [
-		["Row 1", 1],
-		["Row 2", 2],
-	]
+	conditions = {}
+	if filters.course:
+		conditions["course"] = filters.course
+	if filters.from_date and filters.to_date:
+		conditions["month"] = ["between", [get_first_day(filters.from_date), getdate(filters.to_date)]]
+	elif filters.from_date:
+		conditions["month"] = [">=", get_first_day(filters.from_date)]
+	elif filters.to_date:
+		conditions["month"] = ["<=", getdate(filters.to_date)]
+
+	data = frappe.get_all(
+		"LMS Course Analytics",
+		filters=conditions,
+		fields=[
+			"course",
+			"month",
+			"enrollments",
+			"completions",
+			"quiz_submissions",
+			"quiz_pass_rate",
+			"revenue",
+			"active_learners",
+		],
+		order_by="month desc, course asc",
+	)
+	for row in data:
+		row.month = row.month.strftime("%Y-%m")
+	return data
+
+
+def get_message():
+	refreshed_on = frappe.db.sql("select max(modified) from `tabLMS Course Analytics`")[0][0]
+	if not refreshed_on:
+		return _("The analytics have not been computed yet. Use Refresh to compute them.")
+	return _("Last refreshed on {0}").format(frappe.utils.format_datetime(refreshed_on))
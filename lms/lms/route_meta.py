@@ -0,0 +1,335 @@
+"""
+SEO meta tags of the /lms single page app.
+
+The meta of a route is built from the route table below, the Website
+Meta Tags of the route and the defaults in LMS Settings, and cached per
+language and what it depends on: the matched route and its parameters,
+or the path itself for static routes and paths with Website Meta Tags.
+Every lesson of a course shares the course's entry, and unknown paths,
+including routes to documents that don't exist, share the default one. Documents shown on their own page keep their meta,
+with the description already stripped of HTML, in a redis hash that is
+written whenever the document is saved.
+
+Saving one of these documents, LMS Settings, Website Settings or a
+Website Route Meta clears the cached routes.
+"""
+
+import re
+
+import frappe
+from bs4 import BeautifulSoup
+from frappe import _
+
+ROUTE_META_KEY = "lms:route_meta"
+DOCUMENT_META_KEY = "lms:document_meta"
+ROUTE_META_TTL = 24 * 60 * 60
+
+
+def get_static_routes():
+	return {
+		"courses": {
+			"title": _("Course List"),
+			"keywords": "All Courses, Courses, Learn",
+			"link": "/courses",
+		},
+		"batches": {
+			"title": _("Batches"),
+			"keywords": "All Batches, Batches, Learn",
+			"link": "/batches",
+		},
+		"job-openings": {
+			"title": _("Job Openings"),
+			"keywords": "Job Openings, Jobs, Vacancies",
+			"link": "/job-openings",
+		},
+		"statistics": {
+			"title": _("Statistics"),
+			"keywords": "Enrollment Count, Completion, Signups",
+			"link": "/statistics",
+		},
+		"quizzes": {
+			"title": _("Quizzes"),
+			"keywords": "Quizzes, interactive quizzes, online quizzes",
+			"link": "/quizzes",
+		},
+		"assignments": {
+			"title": _("Assignments"),
+			"keywords": "Assignments, interactive assignments, online assignments",
+			"link": "/assignments",
+		},
+		"programs": {
+			"title": _("Programs"),
+			"keywords": "All Programs, Programs, Learn",
+			"link": "/programs",
+		},
+		"certified-participants": {
+			"title": _("Certified Participants"),
+			"keywords": "All Certified Participants, Certified Participants, Learn, Certification",
+			"link": "/certified-participants",
+		},
+	}
+
+
+# (route, pattern) in the order they are tried, joined into one regular
+# expression below. The route's group names the function that builds its
+# meta, the inner groups are passed to it.
+ROUTE_PATTERNS = [
+	("new_course", r"courses/.*new/edit.*"),
+	("course", r"courses/(?P<course>[^/]+).*"),
+	("batch_details", r"batches/details/(?P<batch_details>[^/]+).*"),
+	("new_batch", r"batches/.*new/edit.*"),
+	("batch", r"batches/(?P<batch>[^/]+).*"),
+	("job_opening", r"job-openings/(?P<job_opening>[^/]+).*"),
+	("user", r"user/(?P<username>[^/]+).*"),
+	("badge", r"badges/(?P<badge>[^/]+)/(?P<email>.+)"),
+	("quiz", r"quizzes/(?P<quiz>[^/]+)"),
+	("assignment", r"assignments/(?P<assignment>[^/]+)"),
+]
+
+ROUTES = re.compile("|".join(f"(?P<route_{route}>{pattern})" for route, pattern in ROUTE_PATTERNS))
+
+# doctype: (name field, meta fields) of the documents with a page of their own
+DOCUMENTS = {
+	"LMS Course": ("name", ["title", "image", "description", "tags"]),
+	"LMS Batch": ("name", ["title", "meta_image", "batch_details", "category", "medium"]),
+	"Job Opportunity": ("name", ["job_title", "company_logo", "description"]),
+	"User": ("username", ["full_name", "user_image", "bio"]),
+	"LMS Badge": ("name", ["title", "image", "description"]),
+	"LMS Quiz": ("name", ["title"]),
+	"LMS Assignment": ("name", ["title"]),
+}
+
+
+def get_meta(app_path):
+	"""Returns the meta tags of the /lms route `app_path`."""
+	app_path = (app_path or "").strip("/")
+	route_key = get_route_key(app_path)
+	meta = frappe.cache().get_value(f"{ROUTE_META_KEY}:{frappe.local.lang}:{route_key}")
+	if meta is None:
+		route_meta = get_route_meta(app_path) if app_path else {}
+		if not route_meta and not route_key.startswith("path:"):
+			# routes to documents that don't exist share the default entry, so
+			# made-up names don't get entries of their own
+			app_path, route_key = "", "default"
+		meta = build_meta(app_path, route_meta)
+		frappe.cache().set_value(
+			f"{ROUTE_META_KEY}:{frappe.local.lang}:{route_key}", meta, expires_in_sec=ROUTE_META_TTL
+		)
+	return frappe._dict(meta)
+
+
+def get_route_key(app_path):
+	"""Returns the part of the cache key that identifies the meta of
+	`app_path`, which is the same for paths that get the same meta."""
+	if app_path in get_static_routes() or app_path in get_tagged_paths():
+		return f"path:{app_path}"
+
+	match = ROUTES.fullmatch(app_path)
+	if not match:
+		return "default"
+	params = sorted(
+		(name, value)
+		for name, value in match.groupdict().items()
+		if value is not None and not name.startswith("route_")
+	)
+	return ":".join([match.lastgroup, *(f"{name}={value}" for name, value in params)])
+
+
+def get_tagged_paths():
+	"""Returns the routes that have Website Meta Tags of their own."""
+
+	def generator():
+		return set(frappe.get_all("Website Meta Tag", {"parenttype": "Website Route Meta"}, pluck="parent"))
+
+	return frappe.cache().get_value(f"{ROUTE_META_KEY}:tagged_paths", generator)
+
+
+def build_meta(app_path, route_meta):
+	meta = frappe._dict(route_meta)
+	defaults = get_default_meta()
+
+	for row in frappe.get_all("Website Meta Tag", {"parent": app_path}, ["key", "value"]):
+		if row.key in ("title", "image", "link"):
+			meta[row.key] = row.value
+		elif row.key in ("description", "keywords"):
+			meta[row.key] = f"{meta.get(row.key, '')} {row.value}"
+
+	meta.title = meta.get("title") or defaults.title
+	meta.description = meta.get("description") or defaults.description
+	meta.image = meta.get("image") or defaults.meta_image or defaults.favicon
+	meta.keywords = f"{meta.get('keywords')}, {defaults.keywords}"
+	return meta
+
+
+def get_default_meta():
+	"""Returns the site wide title, favicon and meta tags."""
+
+	def get_defaults():
+		return frappe._dict(
+			title=frappe.db.get_single_value("Website Settings", "app_name") or "Frappe Learning",
+			favicon=frappe.db.get_single_value("Website Settings", "favicon")
+			or "/assets/lms/frontend/favicon.png",
+			banner_image=frappe.db.get_single_value("Website Settings", "banner_image"),
+			description=frappe.db.get_single_value("LMS Settings", "meta_description"),
+			meta_image=frappe.db.get_single_value("LMS Settings", "meta_image"),
+			keywords=frappe.db.get_single_value("LMS Settings", "meta_keywords"),
+		)
+
+	return frappe._dict(frappe.cache().get_value(f"{ROUTE_META_KEY}:defaults", get_defaults))
+
+
+def get_route_meta(app_path):
+	static = get_static_routes().get(app_path)
+	if static:
+		return static
+
+	match = ROUTES.fullmatch(app_path)
+	if not match:
+		return {}
+	return ROUTE_BUILDERS[match.lastgroup[len("route_") :]](**match.groupdict()) or {}
+
+
+def get_new_course_meta(**kwargs):
+	return {
+		"title": _("New Course"),
+		"image": get_default_meta().banner_image,
+		"keywords": "New Course, Create Course",
+		"link": "/lms/courses/new/edit",
+	}
+
+
+def get_course_meta(course, **kwargs):
+	doc = get_document_meta("LMS Course", course)
+	return doc and {
+		"title": doc.title,
+		"image": doc.image,
+		"description": doc.description,
+		"keywords": doc.tags,
+		"link": f"/courses/{course}",
+	}
+
+
+def get_batch_meta(batch=None, batch_details=None, **kwargs):
+	name = batch_details or batch
+	doc = get_document_meta("LMS Batch", name)
+	return doc and {
+		"title": doc.title,
+		"image": doc.meta_image,
+		"description": doc.batch_details,
+		"keywords": f"{doc.category} {doc.medium}",
+		"link": f"/batches/details/{name}" if batch_details else f"/batches/{name}",
+	}
+
+
+def get_new_batch_meta(**kwargs):
+	return {
+		"title": _("New Batch"),
+		"keywords": "New Batch, Create Batch",
+		"link": "/lms/batches/new/edit",
+	}
+
+
+def get_job_opening_meta(job_opening, **kwargs):
+	doc = get_document_meta("Job Opportunity", job_opening)
+	return doc and {
+		"title": doc.job_title,
+		"image": doc.company_logo,
+		"description": doc.description,
+		"keywords": "Job Openings, Jobs, Vacancies",
+		"link": f"/job-openings/{job_opening}",
+	}
+
+
+def get_user_meta(username, **kwargs):
+	doc = get_document_meta("User", username)
+	return doc and {
+		"title": doc.full_name,
+		"image": doc.user_image,
+		"description": doc.bio,
+		"keywords": f"{doc.full_name}, {doc.bio}",
+		"link": f"/user/{username}",
+	}
+
+
+def get_badge_meta(badge, email, **kwargs):
+	doc = get_document_meta("LMS Badge", badge)
+	return doc and {
+		"title": doc.title,
+		"image": doc.image,
+		"description": doc.description,
+		"keywords": f"{doc.title}, {doc.description}",
+		"link": f"/badges/{badge}/{email}",
+	}
+
+
+def get_quiz_meta(quiz, **kwargs):
+	doc = get_document_meta("LMS Quiz", quiz)
+	return doc and {"title": doc.title, "keywords": doc.title, "link": f"/quizzes/{quiz}"}
+
+
+def get_assignment_meta(assignment, **kwargs):
+	doc = get_document_meta("LMS Assignment", assignment)
+	return doc and {"title": doc.title, "keywords": doc.title, "link": f"/assignments/{assignment}"}
+
+
+ROUTE_BUILDERS = {
+	"new_course": get_new_course_meta,
+	"course": get_course_meta,
+	"batch_details": get_batch_meta,
+	"new_batch": get_new_batch_meta,
+	"batch": get_batch_meta,
+	"job_opening": get_job_opening_meta,
+	"user": get_user_meta,
+	"badge": get_badge_meta,
+	"quiz": get_quiz_meta,
+	"assignment": get_assignment_meta,
+}
+
+
+def get_document_meta(doctype, name):
+	"""Returns the meta fields of a document, with HTML turned into plain
+	text, or None when it doesn't exist. Only documents that exist are
+	cached, so made-up names don't fill the hash."""
+	meta = frappe.cache().hget(DOCUMENT_META_KEY, f"{doctype}:{name}")
+	if meta is None:
+		name_field, fields = DOCUMENTS[doctype]
+		doc = frappe.db.get_value(doctype, {name_field: name}, fields, as_dict=True)
+		if not doc:
+			return None
+		meta = make_document_meta(doctype, doc)
+		frappe.cache().hset(DOCUMENT_META_KEY, f"{doctype}:{name}", meta)
+	return frappe._dict(meta)
+
+
+def make_document_meta(doctype, doc):
+	meta = {field: doc.get(field) for field in DOCUMENTS[doctype][1]}
+	for field in ("description", "batch_details", "bio"):
+		if meta.get(field):
+			meta[field] = BeautifulSoup(meta[field], "html.parser").get_text()
+	return meta
+
+
+def update_document_meta(doc, method=None):
+	"""Stores the meta of a saved document and clears the cached routes."""
+	name = doc.get(DOCUMENTS[doc.doctype][0])
+	if name:
+		frappe.cache().hset(DOCUMENT_META_KEY, f"{doc.doctype}:{name}", make_document_meta(doc.doctype, doc))
+
+	previous = doc.get_doc_before_save()
+	if doc.doctype == "User" and previous and previous.username != name:
+		remove_document_meta(doc.doctype, previous.username)
+	clear_route_meta()
+
+
+def clear_document_meta(doc, method=None):
+	remove_document_meta(doc.doctype, doc.get(DOCUMENTS[doc.doctype][0]))
+	clear_route_meta()
+
+
+def remove_document_meta(doctype, name):
+	if name:
+		frappe.cache().hdel(DOCUMENT_META_KEY, f"{doctype}:{name}")
+
+
+def clear_route_meta(doc=None, method=None):
+	frappe.cache().delete_keys(ROUTE_META_KEY)
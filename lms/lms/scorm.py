@@ -0,0 +1,394 @@
+"""
+Files of extracted SCORM packages.
+
+Packages are extracted to public/scorm/<course>/<chapter title> and their
+files are requested from there by the package's own pages, often by a
+path that doesn't match the layout of the zip. Every package has an index
+of its files, mapping each file name to its path in the package, which
+is built when the package is extracted and stored with the chapter. It
+is used to find the files that aren't where they were asked for.
+
+Packages are extracted in a background job (ingest_package), one member
+at a time and in chunks, into a staging folder that replaces the old one
+when everything went well and the package is still the chapter's. Members that would land outside the folder,
+too many files, too large or too compressed packages are refused. The
+same pass builds the file index, finds the manifest and scans scripts
+and pages for suspicious code. Progress is published to the user who
+uploaded the package.
+
+Files are sent with their ETag and Last-Modified date and byte ranges are
+supported. When nginx is set up to pass X-Use-X-Accel-Redirect, as for
+private files, it sends the files itself. Otherwise, with use_x_sendfile
+set in the site config, the X-Sendfile header is used.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import xml.etree.ElementTree as ET
+import zipfile
+from urllib.parse import quote
+
+import frappe
+from frappe import _
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Response
+
+SCORM_INDEX_KEY = "lms:scorm_file_index"
+SCORM_INDEX_TTL = 24 * 60 * 60
+SCORM_MAX_AGE = 60 * 60
+SCORM_PROGRESS_EVENT = "lms_scorm_ingest_progress"
+
+MAX_PACKAGE_SIZE = 2 * 1024 * 1024 * 1024
+MAX_PACKAGE_FILES = 20000
+MAX_COMPRESSION_RATIO = 200
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+SCANNED_EXTENSIONS = (".html", ".htm", ".js", ".xml")
+# a match may start in one chunk and end in the next, so each chunk is
+# scanned with the tail of the previous one
+SCAN_OVERLAP = 4096
+SUSPICIOUS_PATTERNS = {
+	"inline_event_handler": r'on(?:click|load|mouseover|error|submit|focus|blur|change|keyup|keydown|keypress|resize)=".*?"',
+	"external_script": r"<script[^>]*?src=[\"']http",
+	"eval": r"eval\(",
+	"function_constructor": r"Function\(",
+	"base64": r"(?:btoa|atob)\(",
+	"xml_entity": r"<!ENTITY",
+	"xml_stylesheet": r"<\?xml-stylesheet .*?>",
+}
+SUSPICIOUS_CODE = re.compile(
+	"|".join(f"(?P<{name}>{pattern})" for name, pattern in SUSPICIOUS_PATTERNS.items())
+)
+
+# types missing from the mimetypes database of some systems
+SCORM_MIMETYPES = {
+	".js": "text/javascript",
+	".mjs": "text/javascript",
+	".json": "application/json",
+	".css": "text/css",
+	".svg": "image/svg+xml",
+	".woff": "font/woff",
+	".woff2": "font/woff2",
+	".ttf": "font/ttf",
+	".otf": "font/otf",
+	".mp4": "video/mp4",
+	".webm": "video/webm",
+	".mp3": "audio/mpeg",
+	".vtt": "text/vtt",
+	".wasm": "application/wasm",
+	".xml": "application/xml",
+	".xsd": "application/xml",
+}
+
+
+def build_file_index(package_path):
+	"""Returns {file name: path in the package} of the files in a package
+	folder. When names repeat, the file closest to the top is kept."""
+	index = {}
+	for root, _dirs, files in os.walk(package_path):
+		for file in files:
+			if file not in index:
+				index[file] = os.path.relpath(os.path.join(root, file), package_path)
+	return index
+
+
+def get_file_index(package):
+	"""Returns the file index of a package, given as the path of its folder
+	under public, e.g. /scorm/course/chapter. Paths that aren't the package
+	of a chapter get an empty index, which isn't cached."""
+	key = f"{SCORM_INDEX_KEY}:{package}"
+	index = frappe.cache().get_value(key)
+	if index is None:
+		chapter = frappe.db.get_value(
+			"Course Chapter", {"scorm_package_path": package}, ["name", "scorm_file_index"], as_dict=True
+		)
+		if not chapter:
+			return {}
+
+		index = frappe.parse_json(chapter.scorm_file_index) or build_file_index(
+			# packages extracted before the index was stored with the chapter
+			frappe.get_site_path("public", package.lstrip("/"))
+		)
+		frappe.cache().set_value(key, index, expires_in_sec=SCORM_INDEX_TTL)
+	return index
+
+
+def clear_file_index(package):
+	if package:
+		frappe.cache().delete_value(f"{SCORM_INDEX_KEY}:{package}")
+
+
+def resolve_file(path):
+	"""Returns the absolute path of the file to send for a request path
+	like /scorm/course/chapter/..., or None."""
+	root = os.path.realpath(frappe.get_site_path("public", "scorm"))
+	full_path = os.path.realpath(os.path.join(frappe.get_site_path("public"), path.lstrip("/")))
+	if not full_path.startswith(root + os.sep):
+		return None
+
+	if not os.path.splitext(full_path)[1] and os.path.isfile(f"{full_path}.html"):
+		return f"{full_path}.html"
+	if os.path.isfile(full_path):
+		return full_path
+	if os.path.isdir(full_path):
+		index_path = os.path.join(full_path, "index.html")
+		return index_path if os.path.isfile(index_path) else None
+
+	package = "/" + "/".join(path.strip("/").split("/")[:3])
+	relative_path = get_file_index(package).get(os.path.basename(full_path))
+	if relative_path:
+		file_path = os.path.realpath(
+			os.path.join(frappe.get_site_path("public"), package.lstrip("/"), relative_path)
+		)
+		if file_path.startswith(root + os.sep) and os.path.isfile(file_path):
+			return file_path
+
+
+def get_mimetype(path):
+	extension = os.path.splitext(path)[1].lower()
+	return SCORM_MIMETYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def send_scorm_file(path):
+	"""Returns the response sending the file at `path`."""
+	mimetype = get_mimetype(path)
+	request = frappe.local.request
+
+	if request.headers.get("X-Use-X-Accel-Redirect"):
+		relative_path = os.path.relpath(path, os.path.realpath(frappe.get_site_path()))
+		response = Response(mimetype=mimetype)
+		response.headers["X-Accel-Redirect"] = quote(f"/protected/{relative_path}")
+		return response
+
+	response = send_file(
+		path,
+		request.environ,
+		mimetype=mimetype,
+		conditional=True,
+		etag=True,
+		max_age=SCORM_MAX_AGE,
+		use_x_sendfile=bool(frappe.conf.use_x_sendfile),
+	)
+	response.headers["Cache-Control"] = f"private, max-age={SCORM_MAX_AGE}"
+	return response
+
+
+def enqueue_ingest(chapter, package, title):
+	"""Queues the extraction of the package uploaded for a chapter.
+
+	The job reads the chapter's package when it starts, so only a job for
+	the same package and title is deduplicated. A job for a package that
+	was replaced meanwhile leaves the chapter alone."""
+	version = hashlib.sha1(f"{package}:{title}".encode()).hexdigest()[:10]
+	frappe.db.set_value("Course Chapter", chapter, "scorm_ingest_status", "Queued")
+	frappe.enqueue(
+		ingest_package,
+		queue="long",
+		job_id=f"lms_scorm_ingest:{chapter}:{version}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		chapter=chapter,
+		user=frappe.session.user,
+	)
+
+
+def ingest_package(chapter, user=None):
+	"""Extracts the current package of a chapter into a staging folder and,
+	if it is still the chapter's package, swaps it in and stores its paths
+	and file index on the chapter."""
+	current = get_ingest_target(chapter)
+	if not current:
+		return
+
+	extract_path = frappe.get_site_path("public", "scorm", current.course, current.title)
+	staging_path = f"{extract_path}.{frappe.generate_hash(length=8)}.extracting"
+	frappe.db.set_value("Course Chapter", chapter, "scorm_ingest_status", "Extracting")
+	frappe.db.commit()
+
+	def progress(done, total):
+		publish_ingest_progress(chapter, user, "Extracting", done=done, total=total)
+
+	try:
+		zip_path = frappe.get_doc("File", current.scorm_package).get_full_path()
+		result = extract_package(
+			zip_path,
+			staging_path,
+			progress,
+			reject_suspicious=frappe.conf.lms_reject_suspicious_scorm_packages,
+		)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(title=_("SCORM package extraction failed"))
+		if get_ingest_target(chapter, for_update=True) == current:
+			frappe.db.set_value("Course Chapter", chapter, "scorm_ingest_status", "Failed")
+			publish_ingest_progress(chapter, user, "Failed", error=str(e))
+		frappe.db.commit()
+		return
+
+	try:
+		# the lock on the chapter keeps jobs of an older and a newer package
+		# from swapping their folders in out of order
+		if get_ingest_target(chapter, for_update=True) != current:
+			frappe.db.rollback()
+			return
+
+		shutil.rmtree(extract_path, ignore_errors=True)
+		os.rename(staging_path, extract_path)
+	finally:
+		shutil.rmtree(staging_path, ignore_errors=True)
+
+	package_path = extract_path.split("public")[1]
+	frappe.db.set_value(
+		"Course Chapter",
+		chapter,
+		{
+			"scorm_package_path": package_path,
+			"manifest_file": result.manifest_file and os.path.join(package_path, result.manifest_file),
+			"launch_file": result.launch_file and os.path.join(package_path, result.launch_file),
+			"scorm_file_index": json.dumps(result.file_index),
+			"scorm_ingest_status": "Ready",
+		},
+	)
+	clear_file_index(package_path)
+	frappe.db.commit()
+	publish_ingest_progress(chapter, user, "Ready", findings=result.findings)
+
+
+def get_ingest_target(chapter, for_update=False):
+	"""Returns the course, title and package of a SCORM chapter."""
+	target = frappe.db.get_value(
+		"Course Chapter",
+		{"name": chapter, "is_scorm_package": 1},
+		["course", "title", "scorm_package"],
+		as_dict=True,
+		for_update=for_update,
+	)
+	if target and target.scorm_package:
+		return target
+
+
+def extract_package(zip_path, extract_path, progress=None, reject_suspicious=False):
+	"""Extracts a zip file member by member into `extract_path` and returns
+	the package's manifest and launch file, relative to `extract_path`, its
+	file index and the suspicious code found in it, as {file: [pattern]}.
+
+	If the package is refused, nothing is left at `extract_path`. With
+	`reject_suspicious`, a package with suspicious code is refused."""
+	shutil.rmtree(extract_path, ignore_errors=True)
+	root = os.path.realpath(extract_path)
+
+	result = frappe._dict(manifest_file=None, launch_file=None, file_index={}, findings={})
+	try:
+		with zipfile.ZipFile(zip_path) as package:
+			members = [member for member in package.infolist() if not member.is_dir()]
+			validate_members(members)
+
+			for done, member in enumerate(members, 1):
+				target = os.path.realpath(os.path.join(root, member.filename))
+				if not target.startswith(root + os.sep):
+					frappe.throw(_("Invalid file path {0} in the package").format(member.filename))
+
+				findings = extract_member(package, member, target)
+				if findings:
+					result.findings[member.filename] = findings
+				add_to_index(result, os.path.relpath(target, root))
+
+				if progress and (done == len(members) or done % 50 == 0):
+					progress(done, len(members))
+
+		if result.findings and reject_suspicious:
+			frappe.throw(
+				_("Suspicious code found in {0}").format(", ".join(sorted(result.findings))),
+				title=_("Package Rejected"),
+			)
+
+		if result.manifest_file:
+			result.launch_file = get_launch_file(root, result.manifest_file)
+	except Exception:
+		shutil.rmtree(extract_path, ignore_errors=True)
+		raise
+
+	return result
+
+
+def validate_members(members):
+	if len(members) > MAX_PACKAGE_FILES:
+		frappe.throw(_("The package has more than {0} files").format(MAX_PACKAGE_FILES))
+
+	if sum(member.file_size for member in members) > MAX_PACKAGE_SIZE:
+		frappe.throw(
+			_("The extracted package would be larger than {0}").format(
+				frappe.utils.sizeof_fmt(MAX_PACKAGE_SIZE)
+			)
+		)
+
+	for member in members:
+		if member.compress_size and member.file_size / member.compress_size > MAX_COMPRESSION_RATIO:
+			frappe.throw(_("{0} is compressed too much to be extracted safely").format(member.filename))
+
+
+def extract_member(package, member, target):
+	"""Writes one member to `target` in chunks and returns the names of the
+	suspicious patterns found in it."""
+	scan = member.filename.lower().endswith(SCANNED_EXTENSIONS)
+	findings = set()
+	tail = ""
+	written = 0
+
+	os.makedirs(os.path.dirname(target), exist_ok=True)
+	with package.open(member) as source, open(target, "wb") as out:
+		while chunk := source.read(EXTRACT_CHUNK_SIZE):
+			written += len(chunk)
+			if written > member.file_size:
+				frappe.throw(_("{0} is larger than the package says").format(member.filename))
+			out.write(chunk)
+
+			if scan:
+				text = tail + chunk.decode("utf-8", errors="ignore")
+				findings.update(match.lastgroup for match in SUSPICIOUS_CODE.finditer(text))
+				tail = text[-SCAN_OVERLAP:]
+
+	return sorted(findings)
+
+
+def add_to_index(result, relative_path):
+	"""Adds a file to the index and picks it as the manifest, keeping the
+	file closest to the top when names repeat."""
+	name = os.path.basename(relative_path)
+	current = result.file_index.get(name)
+	if not current or relative_path.count(os.sep) < current.count(os.sep):
+		result.file_index[name] = relative_path
+		if name == "imsmanifest.xml":
+			result.manifest_file = relative_path
+
+
+def get_launch_file(root, manifest_file):
+	"""Returns the path of the first SCO of the manifest, relative to the
+	package folder `root`."""
+	manifest_folder = os.path.dirname(os.path.join(root, manifest_file))
+	for _event, element in ET.iterparse(os.path.join(root, manifest_file)):
+		if local_name(element.tag) != "resource" or not element.get("href"):
+			continue
+		scorm_type = next(
+			(value for key, value in element.attrib.items() if local_name(key).lower() == "scormtype"),
+			None,
+		)
+		if scorm_type == "sco":
+			return os.path.relpath(os.path.join(manifest_folder, element.get("href")), root)
+
+
+def local_name(tag):
+	return tag.rsplit("}", 1)[-1]
+
+
+def publish_ingest_progress(chapter, user, status, **kwargs):
+	frappe.publish_realtime(
+		SCORM_PROGRESS_EVENT,
+		{"chapter": chapter, "status": status, **kwargs},
+		user=user,
+		after_commit=False,
+	)
@@ -0,0 +1,197 @@
+"""
+Runtime data of SCORM packages.
+
+The player sends the CMI values a package sets as changes since its last
+commit. They are buffered in redis per attempt, that is per member and
+lesson, and written to the member's LMS Course Progress every
+FLUSH_INTERVAL seconds, when the package terminates, or when the lesson
+status changes. Buffers left behind by closed players are written by the
+scheduler. Flushes of an attempt hold a lock on the member's enrollment
+from taking the buffer until they are committed, so that they are
+written in the order they took their changes.
+
+The course progress of the enrollment is only recomputed when the lesson
+becomes complete.
+"""
+
+import json
+
+import frappe
+from frappe import _
+
+from lms.lms.doctype.course_lesson.course_lesson import update_enrollment_progress
+
+BUFFER_KEY = "lms:scorm_runtime"
+DIRTY_KEY = "lms:scorm_runtime_dirty"
+FLUSHED_KEY = "lms:scorm_runtime_flushed"
+FLUSH_INTERVAL = 60
+
+# keys whose change is written right away
+STATUS_KEYS = ("cmi.core.lesson_status", "cmi.completion_status", "cmi.success_status")
+# (key, value) that complete the lesson
+COMPLETE_VALUES = (("cmi.core.lesson_status", "passed"), ("cmi.success_status", "passed"))
+
+
+@frappe.whitelist()
+def get_runtime_data(chapter):
+	"""Returns the status of the member's attempt at a SCORM chapter and its
+	CMI values, including the ones not written yet."""
+	course, lesson = get_chapter_lesson(chapter)
+	progress = (
+		frappe.db.get_value(
+			"LMS Course Progress",
+			{"lesson": lesson, "member": frappe.session.user},
+			["status", "scorm_content", "scorm_cmi"],
+			as_dict=True,
+		)
+		or frappe._dict()
+	)
+
+	cmi = frappe.parse_json(progress.scorm_cmi) or {}
+	if progress.scorm_content and "cmi.suspend_data" not in cmi:
+		# attempts saved before the CMI values were kept
+		cmi["cmi.suspend_data"] = progress.scorm_content
+	cmi.update(get_buffer(get_attempt_key(frappe.session.user, course, lesson)))
+	return {"status": progress.status, "cmi": cmi}
+
+
+@frappe.whitelist()
+def commit(chapter, changes, terminate=False):
+	"""Buffers the CMI values changed since the last commit, and writes the
+	attempt when it is due. Returns the lesson status."""
+	course, lesson = get_chapter_lesson(chapter)
+	if not frappe.db.exists("LMS Enrollment", {"course": course, "member": frappe.session.user}):
+		# moderators and instructors can open a package without an enrollment
+		return
+
+	changes = frappe.parse_json(changes) or {}
+	attempt = get_attempt_key(frappe.session.user, course, lesson)
+	cache = frappe.cache()
+
+	if changes:
+		pipeline = cache.pipeline()
+		pipeline.hset(
+			cache.make_key(f"{BUFFER_KEY}:{attempt}"),
+			mapping={key: json.dumps(value) for key, value in changes.items()},
+		)
+		pipeline.sadd(cache.make_key(DIRTY_KEY), attempt)
+		pipeline.execute()
+
+	# the key of the last flush expires when the next one is due
+	if (
+		frappe.parse_json(terminate)
+		or any(key in changes for key in STATUS_KEYS)
+		or not cache.get_value(f"{FLUSHED_KEY}:{attempt}")
+	):
+		return flush_attempt(attempt)
+
+
+def flush_dirty_attempts():
+	"""Writes the buffers of all attempts with unwritten changes."""
+	cache = frappe.cache()
+	for attempt in cache.smembers(DIRTY_KEY):
+		attempt = frappe.safe_decode(attempt)
+		try:
+			flush_attempt(attempt)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(title=_("Could not save SCORM progress of {0}").format(attempt))
+
+
+def flush_attempt(attempt):
+	"""Writes the buffered CMI values of an attempt to its course progress
+	and returns the lesson status."""
+	member, course, lesson = parse_attempt_key(attempt)
+	membership = frappe.db.get_value(
+		"LMS Enrollment", {"course": course, "member": member}, "name", for_update=True
+	)
+	cache = frappe.cache()
+	buffer_key = cache.make_key(f"{BUFFER_KEY}:{attempt}")
+
+	# take the buffer, so that changes arriving meanwhile go to the next flush
+	pipeline = cache.pipeline()
+	pipeline.hgetall(buffer_key)
+	pipeline.delete(buffer_key)
+	pipeline.srem(cache.make_key(DIRTY_KEY), attempt)
+	changes = {frappe.safe_decode(key): json.loads(value) for key, value in pipeline.execute()[0].items()}
+	cache.set_value(f"{FLUSHED_KEY}:{attempt}", 1, expires_in_sec=FLUSH_INTERVAL)
+	if not membership:
+		return
+
+	try:
+		return save_changes(membership, member, course, lesson, changes)
+	except Exception:
+		# put the changes back, under any that arrived since
+		if changes:
+			pipeline = cache.pipeline()
+			for key, value in changes.items():
+				pipeline.hsetnx(buffer_key, key, json.dumps(value))
+			pipeline.sadd(cache.make_key(DIRTY_KEY), attempt)
+			pipeline.execute()
+		raise
+
+
+def save_changes(membership, member, course, lesson, changes):
+	progress = frappe.db.get_value(
+		"LMS Course Progress",
+		{"lesson": lesson, "member": member},
+		["name", "status", "scorm_cmi"],
+		as_dict=True,
+	)
+	if progress and progress.status == "Complete":
+		return progress.status
+	if not changes:
+		return progress and progress.status
+
+	cmi = (frappe.parse_json(progress.scorm_cmi) if progress else None) or {}
+	cmi.update(changes)
+	is_complete = any(cmi.get(key) == value for key, value in COMPLETE_VALUES)
+	status = "Complete" if is_complete else "Partially Complete"
+	values = {
+		"status": status,
+		"scorm_cmi": json.dumps(cmi),
+		"scorm_content": "" if status == "Complete" else cmi.get("cmi.suspend_data", ""),
+	}
+
+	if not progress:
+		frappe.get_doc(
+			{"doctype": "LMS Course Progress", "lesson": lesson, "member": member, **values}
+		).insert(ignore_permissions=True)
+		frappe.db.set_value("LMS Enrollment", membership, "current_lesson", lesson)
+	elif status != progress.status:
+		doc = frappe.get_doc("LMS Course Progress", progress.name)
+		doc.update(values)
+		doc.save(ignore_permissions=True)
+	else:
+		frappe.db.set_value("LMS Course Progress", progress.name, values, update_modified=False)
+
+	if status == "Complete":
+		update_enrollment_progress(membership, course, lesson, member)
+
+	return status
+
+
+def get_chapter_lesson(chapter):
+	course = frappe.db.get_value("Course Chapter", chapter, "course")
+	lesson = frappe.db.get_value(
+		"Lesson Reference", {"parent": chapter, "parenttype": "Course Chapter"}, "lesson", order_by="idx"
+	)
+	if not course or not lesson:
+		frappe.throw(_("Invalid SCORM chapter"))
+	return course, lesson
+
+
+def get_attempt_key(member, course, lesson):
+	return json.dumps([member, course, lesson])
+
+
+def parse_attempt_key(attempt):
+	return json.loads(attempt)
+
+
+def get_buffer(attempt):
+	cache = frappe.cache()
+	# through a pipeline, as the cache's own hgetall expects pickled values
+	values = cache.pipeline().hgetall(cache.make_key(f"{BUFFER_KEY}:{attempt}")).execute()[0]
+	return {frappe.safe_decode(key): json.loads(value) for key, value in values.items()}
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from .invoice_numbering import BLOCK_SIZE, clear_reserved_blocks, get_prefix, reserve_block
+
+THREADS = 8
+INVOICES_PER_THREAD = 25
+# a month of its own, so the numbers don't depend on other invoices
+INVOICE_DATE = "2001-01-15"
+
+
+def create_invoices(site, count):
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		names = []
+		for _ in range(count):
+			invoice = frappe.get_doc(
+				{
+					"doctype": "LMS Invoice",
+					"customer": "Administrator",
+					"amount": 10,
+					"payment_for": "Concurrency test",
+					"invoice_date": INVOICE_DATE,
+				}
+			)
+			invoice.flags.ignore_mandatory = True
+			invoice.flags.ignore_links = True
+			invoice.insert(ignore_permissions=True)
+			frappe.db.commit()
+			names.append(invoice.name)
+		return names
+	finally:
+		frappe.destroy()
+
+
+class TestInvoiceNumbering(IntegrationTestCase):
+	def setUp(self):
+		self.prefix = get_prefix(INVOICE_DATE)
+		self.cleanup()
+
+	def tearDown(self):
+		frappe.db.set_single_value("LMS Settings", "gap_free_invoice_numbers", 0)
+		self.cleanup()
+
+	def cleanup(self):
+		frappe.db.delete("LMS Invoice", {"name": ["like", f"{self.prefix}%"]})
+		frappe.db.delete("LMS Invoice Sequence", {"name": self.prefix})
+		clear_reserved_blocks()
+		frappe.db.commit()
+
+	def hammer(self):
+		with ThreadPoolExecutor(max_workers=THREADS) as executor:
+			results = list(
+				executor.map(create_invoices, [frappe.local.site] * THREADS, [INVOICES_PER_THREAD] * THREADS)
+			)
+		return results, [int(name.rsplit("-", 1)[1]) for names in results for name in names]
+
+	def test_block_allocation_is_unique_and_monotonic_per_worker(self):
+		results, numbers = self.hammer()
+
+		self.assertEqual(len(set(numbers)), THREADS * INVOICES_PER_THREAD)
+		for names in results:
+			self.assertEqual(names, sorted(names))
+
+	def test_blocks_survive_clearing_the_cache(self):
+		first = reserve_block(self.prefix)
+		frappe.clear_cache()
+		second = reserve_block(self.prefix)
+
+		self.assertEqual(len(set(first) | set(second)), 2 * BLOCK_SIZE)
+
+	def test_gap_free_allocation(self):
+		frappe.db.set_single_value("LMS Settings", "gap_free_invoice_numbers", 1)
+		frappe.db.commit()
+
+		results, numbers = self.hammer()
+
+		self.assertEqual(sorted(numbers), list(range(1, THREADS * INVOICES_PER_THREAD + 1)))
+		self.assertEqual(
+			frappe.db.get_value("LMS Invoice Sequence", self.prefix, "current"), THREADS * INVOICES_PER_THREAD
+		)
@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.lms.doctype.lms_course.test_lms_course import new_user
+
+from .mailer import send_bulk_mail
+
+NOTIFICATION = "test_bulk_mail"
+
+
+@patch.object(frappe.db, "commit")
+class TestMailer(IntegrationTestCase):
+	def setUp(self):
+		self.users = [
+			new_user(f"Mail Recipient {i}", f"mail.recipient{i}@example.com").name for i in range(3)
+		]
+
+	def send(self, recipients, **kwargs):
+		return send_bulk_mail(NOTIFICATION, recipients, subject="Test", message="<p>Test</p>", **kwargs)
+
+	def get_queues(self):
+		return set(
+			frappe.get_all("LMS Notification Log", {"notification": NOTIFICATION}, pluck="email_queue")
+		)
+
+	def test_recipients_are_mailed_once(self, commit):
+		self.assertEqual(self.send(self.users[:2]), 2)
+		self.assertEqual(self.send(self.users + self.users), 1)
+		self.assertEqual(self.send(self.users), 0)
+		self.assertEqual(frappe.db.count("LMS Notification Log", {"notification": NOTIFICATION}), 3)
+
+	def test_opted_out_and_disabled_users_are_skipped(self, commit):
+		frappe.get_doc(
+			{"doctype": "Email Unsubscribe", "email": self.users[0], "global_unsubscribe": 1}
+		).insert(ignore_permissions=True)
+		frappe.db.set_value("User", self.users[1], "enabled", 0)
+
+		self.assertEqual(self.send(self.users), 1)
+		self.assertEqual(
+			frappe.get_all("LMS Notification Log", {"notification": NOTIFICATION}, pluck="recipient"),
+			[self.users[2]],
+		)
+
+	@patch("lms.lms.mailer.BULK_MAIL_CHUNK_SIZE", 2)
+	def test_recipients_are_queued_in_chunks(self, commit):
+		self.send(self.users)
+		queues = self.get_queues()
+
+		self.assertEqual(len(queues), 2)
+		self.assertEqual(frappe.db.count("Email Queue Recipient", {"parent": ["in", list(queues)]}), 3)
+		self.assertTrue(
+			all(frappe.db.get_value("Email Queue", queue, "status") == "Not Sent" for queue in queues)
+		)
+		self.assertTrue(
+			all(frappe.db.get_value("Email Queue", queue, "add_unsubscribe_link") for queue in queues)
+		)
+
+	def test_message_is_rendered_once_per_distinct_args(self, commit):
+		self.send(
+			self.users,
+			template="live_class_reminder",
+			args={"title": "Test Class", "date": "2026-01-01", "time": "10:00:00", "batch_name": "test"},
+			recipient_args={
+				self.users[0]: {"student_name": "Ada"},
+				self.users[1]: {"student_name": "Ada"},
+				self.users[2]: {"student_name": "Grace"},
+			},
+		)
+		self.assertEqual(len(self.get_queues()), 2)
@@ -0,0 +1,16 @@
+from unittest.mock import patch
+
+from frappe.tests import IntegrationTestCase
+
+from .md import compile_markdown, render_dynamic_macros
+
+
+class TestMarkdown(IntegrationTestCase):
+	@patch("lms.lms.md.render_macro_html", return_value="<div>quiz</div>")
+	def test_lesson_comments_are_not_taken_for_macro_placeholders(self, render_macro_html):
+		page = compile_markdown('{{ Quiz("test-quiz") }}\n\n<!-- lms-macro-3 -->\n\n<!-- lms-macro-0 -->')
+		html = render_dynamic_macros(page)
+
+		self.assertEqual(html.count("<div>quiz</div>"), 1)
+		self.assertIn("<!-- lms-macro-3 -->", html)
+		self.assertIn("<!-- lms-macro-0 -->", html)
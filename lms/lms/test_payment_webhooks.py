@@ -0,0 +1,114 @@
+import json
+import unittest
+
+from .payment_webhooks import get_event_details
+
+STRIPE_PAYMENT_INTENT = {
+	"id": "evt_3Nabc",
+	"type": "payment_intent.succeeded",
+	"data": {
+		"object": {
+			"id": "pi_3Nabc",
+			"amount": 250000,
+			"amount_received": 250000,
+			"currency": "inr",
+			"metadata": {"course_id": "python-basics", "user_email": "student@example.com"},
+		}
+	},
+}
+
+STRIPE_CHECKOUT_SESSION = {
+	"id": "evt_1Ndef",
+	"type": "checkout.session.completed",
+	"data": {
+		"object": {
+			"id": "cs_test_a1",
+			"payment_intent": "pi_3Ndef",
+			"amount_total": 1500,
+			"currency": "jpy",
+			"customer_details": {"email": "student@example.com"},
+			"metadata": {"course": "python-basics", "order_id": "ORD-1"},
+		}
+	},
+}
+
+RAZORPAY_PAYMENT_CAPTURED = {
+	"entity": "event",
+	"event": "payment.captured",
+	"payload": {
+		"payment": {
+			"entity": {
+				"id": "pay_29QQoUBi66xm2f",
+				"order_id": "order_9A33XWu170gUtm",
+				"amount": 50000,
+				"currency": "INR",
+				"email": "student@example.com",
+				"notes": [],
+			}
+		}
+	},
+}
+
+PAYPAL_CAPTURE_COMPLETED = {
+	"id": "WH-58D329510W468432D-8HN650336L201105X",
+	"event_type": "PAYMENT.CAPTURE.COMPLETED",
+	"resource": {
+		"id": "42311647XV020574X",
+		"amount": {"currency_code": "USD", "value": "49.99"},
+		"custom_id": json.dumps({"course": "python-basics", "email": "student@example.com"}),
+		"supplementary_data": {"related_ids": {"order_id": "5O190127TN364715T"}},
+	},
+}
+
+CUSTOM_PAYMENT = {
+	"payment_status": "completed",
+	"payment_id": "custom-1",
+	"course_id": "python-basics",
+	"user_email": "student@example.com",
+	"amount": 10,
+}
+
+
+class TestPaymentWebhookAdapters(unittest.TestCase):
+	def test_stripe_payment_intent(self):
+		event = get_event_details("Stripe", STRIPE_PAYMENT_INTENT)
+		self.assertEqual(event.event_id, "evt_3Nabc")
+		self.assertEqual(event.payment_id, "pi_3Nabc")
+		self.assertEqual(event.amount, 2500)
+		self.assertEqual(event.currency, "INR")
+		self.assertEqual(event.email, "student@example.com")
+		self.assertEqual(event.course, "python-basics")
+
+	def test_stripe_checkout_zero_decimal_currency(self):
+		event = get_event_details("Stripe", STRIPE_CHECKOUT_SESSION)
+		self.assertEqual(event.payment_id, "pi_3Ndef")
+		self.assertEqual(event.order_id, "ORD-1")
+		self.assertEqual(event.amount, 1500)
+		self.assertEqual(event.email, "student@example.com")
+
+	def test_stripe_unhandled_event(self):
+		self.assertIsNone(get_event_details("Stripe", {"type": "customer.created"}))
+
+	def test_razorpay(self):
+		event = get_event_details("Razorpay", RAZORPAY_PAYMENT_CAPTURED, {"X-Razorpay-Event-Id": "E1"})
+		self.assertEqual(event.event_id, "E1")
+		self.assertEqual(event.payment_id, "pay_29QQoUBi66xm2f")
+		self.assertEqual(event.order_id, "order_9A33XWu170gUtm")
+		self.assertEqual(event.amount, 500)
+		self.assertIsNone(event.course)
+
+	def test_paypal(self):
+		event = get_event_details("PayPal", PAYPAL_CAPTURE_COMPLETED)
+		self.assertEqual(event.payment_id, "42311647XV020574X")
+		self.assertEqual(event.order_id, "5O190127TN364715T")
+		self.assertEqual(event.amount, 49.99)
+		self.assertEqual(event.course, "python-basics")
+
+	def test_custom(self):
+		event = get_event_details("Custom", CUSTOM_PAYMENT)
+		self.assertEqual(event.payment_id, "custom-1")
+		self.assertEqual(event.order_id, "custom-1")
+		self.assertEqual(event.currency, "INR")
+
+	def test_unknown_provider(self):
+		self.assertIsNone(get_event_details("Square", CUSTOM_PAYMENT))
@@ -0,0 +1,51 @@
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.lms.doctype.lms_course.test_lms_course import new_course
+
+from .route_meta import ROUTE_META_KEY, get_meta, get_route_key
+
+
+class TestRouteMeta(IntegrationTestCase):
+	def setUp(self):
+		self.course = new_course("Route Meta Course")
+		self.course.db_set("description", "<p>Learn <b>everything</b></p>")
+		self.course.reload()
+		self.course.save()
+
+	def test_document_route(self):
+		meta = get_meta(f"courses/{self.course.name}/learn/1-1")
+
+		self.assertEqual(meta.title, "Route Meta Course")
+		self.assertEqual(meta.description, "Learn everything")
+		self.assertEqual(meta.link, f"/courses/{self.course.name}")
+
+	def test_meta_is_updated_on_save(self):
+		get_meta(f"courses/{self.course.name}")
+
+		self.course.title = "Renamed Route Meta Course"
+		self.course.save()
+
+		self.assertEqual(get_meta(f"courses/{self.course.name}").title, "Renamed Route Meta Course")
+
+	def test_static_and_unknown_routes(self):
+		self.assertEqual(get_meta("courses").link, "/courses")
+		self.assertEqual(get_meta("courses/new/edit").link, "/lms/courses/new/edit")
+		self.assertIsNone(get_meta("no-such-page").get("link"))
+
+	def test_paths_with_the_same_meta_share_a_cache_key(self):
+		self.assertEqual(
+			get_route_key(f"courses/{self.course.name}/learn/1-1"),
+			get_route_key(f"courses/{self.course.name}/learn/2-3"),
+		)
+		self.assertEqual(get_route_key("no-such-page"), get_route_key("another/made-up/path"))
+		self.assertNotEqual(get_route_key("courses"), get_route_key(f"courses/{self.course.name}"))
+
+	def test_made_up_documents_get_the_default_entry(self):
+		path = "courses/no-such-course/learn/1-1"
+		meta = get_meta(path)
+
+		self.assertEqual(meta, get_meta("no-such-page"))
+		self.assertIsNone(
+			frappe.cache().get_value(f"{ROUTE_META_KEY}:{frappe.local.lang}:{get_route_key(path)}")
+		)
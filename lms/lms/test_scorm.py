@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.lms.doctype.lms_course.test_lms_course import new_course
+
+from . import scorm
+from .scorm import (
+	build_file_index,
+	clear_file_index,
+	extract_package,
+	get_file_index,
+	get_mimetype,
+	resolve_file,
+)
+
+PACKAGE = "/scorm/test-course/Test Package"
+
+
+class TestSCORMFiles(IntegrationTestCase):
+	def setUp(self):
+		self.package_path = frappe.get_site_path("public", PACKAGE.lstrip("/"))
+		for path in ["index.html", "scripts/api.js", "assets/img/logo.png"]:
+			os.makedirs(os.path.dirname(os.path.join(self.package_path, path)), exist_ok=True)
+			with open(os.path.join(self.package_path, path), "w") as f:
+				f.write(path)
+		frappe.get_doc(
+			{
+				"doctype": "Course Chapter",
+				"course": new_course("SCORM Course").name,
+				"title": "Test Package",
+				"is_scorm_package": 1,
+				"scorm_package_path": PACKAGE,
+			}
+		).insert()
+		clear_file_index(PACKAGE)
+
+	def tearDown(self):
+		shutil.rmtree(self.package_path, ignore_errors=True)
+		clear_file_index(PACKAGE)
+
+	def test_file_index(self):
+		index = build_file_index(self.package_path)
+
+		self.assertEqual(index["api.js"], os.path.join("scripts", "api.js"))
+		self.assertEqual(index["logo.png"], os.path.join("assets", "img", "logo.png"))
+
+	def test_resolve_file(self):
+		self.assertEqual(
+			resolve_file(PACKAGE), os.path.realpath(os.path.join(self.package_path, "index.html"))
+		)
+		self.assertEqual(
+			resolve_file(f"{PACKAGE}/lib/api.js"),
+			os.path.realpath(os.path.join(self.package_path, "scripts", "api.js")),
+		)
+		self.assertIsNone(resolve_file(f"{PACKAGE}/missing.js"))
+		self.assertIsNone(resolve_file("/scorm/../../site_config.json"))
+
+	def test_unknown_packages_get_no_index(self):
+		self.assertEqual(get_file_index("/scorm/test-course/Made Up"), {})
+		self.assertIsNone(frappe.cache().get_value("lms:scorm_file_index:/scorm/test-course/Made Up"))
+		self.assertIsNone(resolve_file("/scorm/test-course/Made Up/api.js"))
+
+	def test_mimetype(self):
+		self.assertEqual(get_mimetype("api.js"), "text/javascript")
+		self.assertEqual(get_mimetype("font.woff2"), "font/woff2")
+
+
+MANIFEST = """<?xml version="1.0"?>
+<manifest xmlns="http://www.imsglobal.org/xsd/imscp_v1p1" xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_v1p3">
+	<resources>
+		<resource identifier="shared" href="shared/style.css" adlcp:scormType="asset" />
+		<resource identifier="sco" href="content/index.html" adlcp:scormType="sco" />
+	</resources>
+</manifest>"""
+
+
+class TestSCORMExtraction(IntegrationTestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.extract_path = os.path.join(self.folder, "package")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder, ignore_errors=True)
+
+	def make_zip(self, files, compression=zipfile.ZIP_STORED):
+		zip_path = os.path.join(self.folder, "package.zip")
+		with zipfile.ZipFile(zip_path, "w", compression) as package:
+			for name, content in files.items():
+				package.writestr(name, content)
+		return zip_path
+
+	def test_extract_package(self):
+		progress = []
+		result = extract_package(
+			self.make_zip(
+				{
+					"course/imsmanifest.xml": MANIFEST,
+					"course/content/index.html": '<button onclick="start()">Start</button>',
+					"course/shared/style.css": "body {}",
+				}
+			),
+			self.extract_path,
+			lambda done, total: progress.append((done, total)),
+		)
+
+		self.assertEqual(result.manifest_file, os.path.join("course", "imsmanifest.xml"))
+		self.assertEqual(result.launch_file, os.path.join("course", "content", "index.html"))
+		self.assertEqual(result.file_index["style.css"], os.path.join("course", "shared", "style.css"))
+		self.assertEqual(result.findings, {"course/content/index.html": ["inline_event_handler"]})
+		self.assertEqual(progress, [(3, 3)])
+		self.assertTrue(os.path.isfile(os.path.join(self.extract_path, "course", "shared", "style.css")))
+
+	def test_launch_file_without_sco(self):
+		manifest = MANIFEST.replace('adlcp:scormType="sco"', 'adlcp:scormType="asset"')
+		result = extract_package(self.make_zip({"imsmanifest.xml": manifest}), self.extract_path)
+
+		self.assertEqual(result.manifest_file, "imsmanifest.xml")
+		self.assertIsNone(result.launch_file)
+
+	def test_reject_suspicious_code(self):
+		zip_path = self.make_zip({"index.html": "<script>eval(code)</script>"})
+
+		self.assertEqual(extract_package(zip_path, self.extract_path).findings, {"index.html": ["eval"]})
+		self.assertRaises(
+			frappe.ValidationError, extract_package, zip_path, self.extract_path, reject_suspicious=True
+		)
+		self.assertFalse(os.path.exists(self.extract_path))
+
+	def test_zip_slip(self):
+		zip_path = self.make_zip({"index.html": "", "../escaped.js": "alert(1)"})
+
+		self.assertRaises(frappe.ValidationError, extract_package, zip_path, self.extract_path)
+		self.assertFalse(os.path.exists(os.path.join(self.folder, "escaped.js")))
+		self.assertFalse(os.path.exists(self.extract_path))
+
+	def test_too_many_files(self):
+		zip_path = self.make_zip({f"{i}.html": "" for i in range(3)})
+
+		with patch.object(scorm, "MAX_PACKAGE_FILES", 2):
+			self.assertRaises(frappe.ValidationError, extract_package, zip_path, self.extract_path)
+		self.assertFalse(os.path.exists(self.extract_path))
+
+	def test_too_large(self):
+		zip_path = self.make_zip({"a.js": "a" * 600, "b.js": "b" * 600})
+
+		with patch.object(scorm, "MAX_PACKAGE_SIZE", 1000):
+			self.assertRaises(frappe.ValidationError, extract_package, zip_path, self.extract_path)
+		self.assertFalse(os.path.exists(self.extract_path))
+
+	def test_compressed_too_much(self):
+		zip_path = self.make_zip({"bomb.js": "a" * 100000}, zipfile.ZIP_DEFLATED)
+
+		self.assertRaises(frappe.ValidationError, extract_package, zip_path, self.extract_path)
+		self.assertFalse(os.path.exists(self.extract_path))
+
+	def test_larger_than_declared(self):
+		zip_path = os.path.join(self.folder, "package.zip")
+		with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as package:
+			package.writestr("index.html", "a" * 5000 + "b" * 5000)
+			# the central directory, which is written on close, understates the size
+			package.filelist[0].file_size = 100
+
+		# zipfile stops at the declared size and fails the CRC check, before
+		# extract_member sees more than the package says
+		self.assertRaises(
+			(frappe.ValidationError, zipfile.BadZipFile), extract_package, zip_path, self.extract_path
+		)
+		self.assertFalse(os.path.exists(self.extract_path))
@@ -0,0 +1,134 @@
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.lms.api import add_lesson
+from lms.lms.doctype.lms_course.test_lms_course import new_course, new_user
+
+from . import scorm_runtime
+from .scorm_runtime import (
+	BUFFER_KEY,
+	DIRTY_KEY,
+	FLUSHED_KEY,
+	commit,
+	flush_attempt,
+	flush_dirty_attempts,
+	get_attempt_key,
+	get_buffer,
+	get_runtime_data,
+)
+
+
+@patch.object(frappe.db, "commit")
+class TestSCORMRuntime(IntegrationTestCase):
+	def setUp(self):
+		self.course = new_course("SCORM Runtime Course").name
+		self.chapter = (
+			frappe.get_doc(
+				{
+					"doctype": "Course Chapter",
+					"course": self.course,
+					"title": "SCORM Runtime Package",
+					"is_scorm_package": 1,
+				}
+			)
+			.insert()
+			.name
+		)
+		add_lesson("SCORM Runtime Package", self.chapter, self.course, 1)
+		self.lesson = frappe.db.get_value("Course Lesson", {"chapter": self.chapter})
+
+		self.member = new_user("Learner", "scorm.learner@example.com").name
+		self.enrollment = frappe.get_doc(
+			{"doctype": "LMS Enrollment", "course": self.course, "member": self.member}
+		).insert(ignore_permissions=True)
+		self.attempt = get_attempt_key(self.member, self.course, self.lesson)
+		self.clear_attempt()
+		frappe.set_user(self.member)
+
+	def tearDown(self):
+		frappe.set_user("Administrator")
+		self.clear_attempt()
+
+	def clear_attempt(self):
+		cache = frappe.cache()
+		cache.delete_value(f"{FLUSHED_KEY}:{self.attempt}")
+		pipeline = cache.pipeline()
+		pipeline.delete(cache.make_key(f"{BUFFER_KEY}:{self.attempt}"))
+		pipeline.srem(cache.make_key(DIRTY_KEY), self.attempt)
+		pipeline.execute()
+
+	def get_saved_cmi(self):
+		cmi = frappe.db.get_value(
+			"LMS Course Progress", {"lesson": self.lesson, "member": self.member}, "scorm_cmi"
+		)
+		return frappe.parse_json(cmi) or {}
+
+	def is_dirty(self):
+		cache = frappe.cache()
+		return bool(cache.sismember(cache.make_key(DIRTY_KEY), self.attempt))
+
+	def test_changes_are_buffered_until_flushed(self, _commit):
+		self.assertEqual(commit(self.chapter, json.dumps({"cmi.suspend_data": "a"})), "Partially Complete")
+		self.assertEqual(self.get_saved_cmi(), {"cmi.suspend_data": "a"})
+
+		# the next flush isn't due yet
+		self.assertIsNone(commit(self.chapter, json.dumps({"cmi.suspend_data": "b", "cmi.location": "2"})))
+		self.assertEqual(self.get_saved_cmi(), {"cmi.suspend_data": "a"})
+		self.assertEqual(get_runtime_data(self.chapter)["cmi"]["cmi.suspend_data"], "b")
+		self.assertTrue(self.is_dirty())
+
+		flush_dirty_attempts()
+
+		self.assertEqual(self.get_saved_cmi(), {"cmi.suspend_data": "b", "cmi.location": "2"})
+		self.assertEqual(get_buffer(self.attempt), {})
+		self.assertFalse(self.is_dirty())
+
+	def test_terminate_flushes(self, _commit):
+		commit(self.chapter, json.dumps({"cmi.suspend_data": "a"}))
+		commit(self.chapter, json.dumps({"cmi.suspend_data": "b"}), terminate=True)
+
+		self.assertEqual(self.get_saved_cmi(), {"cmi.suspend_data": "b"})
+
+	def test_failed_flush_puts_changes_back(self, _commit):
+		commit(self.chapter, json.dumps({"cmi.suspend_data": "a"}))
+		commit(self.chapter, json.dumps({"cmi.suspend_data": "b", "cmi.location": "2"}))
+
+		def fail(*args):
+			# a change that arrives while the flush is running
+			cache = frappe.cache()
+			cache.pipeline().hset(
+				cache.make_key(f"{BUFFER_KEY}:{self.attempt}"), "cmi.suspend_data", json.dumps("c")
+			).execute()
+			raise frappe.ValidationError
+
+		with patch.object(scorm_runtime, "save_changes", side_effect=fail):
+			self.assertRaises(frappe.ValidationError, flush_attempt, self.attempt)
+
+		self.assertEqual(get_buffer(self.attempt), {"cmi.suspend_data": "c", "cmi.location": "2"})
+		self.assertTrue(self.is_dirty())
+		self.assertEqual(self.get_saved_cmi(), {"cmi.suspend_data": "a"})
+
+	def test_passing_completes_the_lesson(self, _commit):
+		commit(self.chapter, json.dumps({"cmi.suspend_data": "a"}))
+
+		status = commit(self.chapter, json.dumps({"cmi.core.lesson_status": "passed"}))
+
+		self.assertEqual(status, "Complete")
+		progress = frappe.db.get_value(
+			"LMS Course Progress",
+			{"lesson": self.lesson, "member": self.member},
+			["status", "scorm_content"],
+			as_dict=True,
+		)
+		self.assertEqual(progress.status, "Complete")
+		self.assertEqual(progress.scorm_content, "")
+		self.assertEqual(frappe.db.get_value("LMS Enrollment", self.enrollment.name, "progress"), 100)
+
+		# a complete lesson isn't written again
+		self.assertEqual(
+			commit(self.chapter, json.dumps({"cmi.core.lesson_status": "incomplete"})), "Complete"
+		)
+		self.assertEqual(self.get_saved_cmi()["cmi.core.lesson_status"], "passed")
@@ -0,0 +1,26 @@
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.lms.doctype.lms_course.test_lms_course import new_user
+
+from .user_cards import get_user_cards
+
+
+class TestUserCards(IntegrationTestCase):
+	def setUp(self):
+		self.user = new_user("Card Holder", "card.holder@example.com")
+
+	def test_cards_are_resolved_in_bulk(self):
+		cards = get_user_cards([self.user.name, "Administrator", self.user.name, "missing@example.com", None])
+
+		self.assertEqual(list(cards), [self.user.name, "Administrator"])
+		self.assertEqual(cards[self.user.name].full_name, self.user.full_name)
+
+	def test_cached_card_is_cleared_on_save(self):
+		get_user_cards([self.user.name])
+
+		self.user.reload()
+		self.user.first_name = "Renamed"
+		self.user.save(ignore_permissions=True)
+
+		self.assertEqual(get_user_cards([self.user.name])[self.user.name].first_name, "Renamed")
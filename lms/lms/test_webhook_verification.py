@@ -0,0 +1,73 @@
+import hashlib
+import hmac
+import time
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from . import webhook_verification
+from .webhook_verification import (
+	get_provider,
+	get_secret_version,
+	verify_custom,
+	verify_razorpay,
+	verify_stripe,
+	verify_webhook,
+)
+
+SECRET = "whsec_test"
+BODY = b'{"id": "evt_1", "type": "payment_intent.succeeded"}'
+
+
+def sign(payload):
+	return hmac.new(SECRET.encode(), payload, hashlib.sha256).hexdigest()
+
+
+class TestWebhookVerification(unittest.TestCase):
+	def test_stripe(self):
+		timestamp = str(int(time.time()))
+		signature = sign(timestamp.encode() + b"." + BODY)
+		headers = {"Stripe-Signature": f"t={timestamp},v1={signature}"}
+
+		self.assertTrue(verify_stripe(BODY, headers, SECRET))
+		self.assertFalse(verify_stripe(BODY + b" ", headers, SECRET))
+		self.assertFalse(verify_stripe(BODY, {"Stripe-Signature": f"t={timestamp},v1=abc"}, SECRET))
+
+	def test_stripe_rejects_old_timestamps(self):
+		timestamp = str(int(time.time()) - 3600)
+		signature = sign(timestamp.encode() + b"." + BODY)
+		self.assertFalse(verify_stripe(BODY, {"Stripe-Signature": f"t={timestamp},v1={signature}"}, SECRET))
+
+	def test_hmac_providers(self):
+		self.assertTrue(verify_razorpay(BODY, {"X-Razorpay-Signature": sign(BODY)}, SECRET))
+		self.assertFalse(verify_razorpay(BODY, {"X-Razorpay-Signature": "0" * 64}, SECRET))
+		self.assertTrue(verify_custom(BODY, {"X-LMS-Signature": sign(BODY)}, SECRET))
+		self.assertFalse(verify_custom(BODY, {}, SECRET))
+
+	def test_provider_from_headers(self):
+		self.assertEqual(get_provider({"Stripe-Signature": "t=1,v1=a"}), "Stripe")
+		self.assertEqual(get_provider({"X-Razorpay-Signature": "a"}), "Razorpay")
+		self.assertIsNone(get_provider({"Content-Type": "application/json"}))
+
+	def test_rejection_is_fast(self):
+		body = b"x" * 20_000
+		headers = {"Stripe-Signature": f"t={int(time.time())},v1={'0' * 64}"}
+		secret = (SECRET, time.monotonic() + 300, get_secret_version())
+
+		with (
+			patch.dict(webhook_verification._secrets, {(frappe.local.site, "stripe_webhook_secret"): secret}),
+			patch.object(frappe, "cache", wraps=frappe.cache) as cache,
+		):
+			# the best of a few rounds, so a busy machine doesn't fail the test
+			averages = []
+			for _ in range(5):
+				start = time.perf_counter()
+				for _ in range(200):
+					self.assertIsNone(get_provider({}))
+					self.assertFalse(verify_webhook("Stripe", body, headers))
+				averages.append((time.perf_counter() - start) / 200)
+
+		self.assertLess(min(averages), 0.001)
+		# the secret and its version come from process memory
+		self.assertEqual(cache.call_count, 0)
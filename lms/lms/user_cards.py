@@ -0,0 +1,125 @@
+"""
+Compact user profiles ("cards") for listing authors, members and
+instructors next to the records they belong to.
+
+get_user_cards resolves any number of users at once. Cards are looked up
+in a small per-process LRU first, then in redis, where each card is kept
+for CARD_TTL seconds under a key of its own, and whatever is still
+missing is fetched from User in a single query, so a list costs the
+same number of queries however many rows it has.
+
+Saving or deleting a user removes their card from redis and bumps a
+version number, once right away and again after the transaction is
+committed, so a card read from the old row meanwhile doesn't stay.
+Every process compares the version with the one its LRU was filled
+under and starts over when it changed.
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import frappe
+
+CARD_FIELDS = ["name", "username", "full_name", "user_image", "first_name"]
+CACHE_KEY = "lms:user_card"
+VERSION_KEY = "lms:user_card_version"
+LRU_SIZE = 2048
+CARD_TTL = 24 * 60 * 60
+
+_lru = OrderedDict()
+_lru_versions = {}
+_lock = threading.Lock()
+
+
+def get_user_cards(users):
+	"""Returns {user: card} for the given users. Users that don't exist are
+	left out."""
+	users = list(dict.fromkeys(filter(None, users)))
+	if not users:
+		return {}
+
+	site = frappe.local.site
+	cards = {}
+	version = get_version()
+	with _lock:
+		if _lru_versions.get(site) != version:
+			for key in [key for key in _lru if key[0] == site]:
+				del _lru[key]
+			_lru_versions[site] = version
+
+		for user in users:
+			card = _lru.get((site, user))
+			if card:
+				_lru.move_to_end((site, user))
+				cards[user] = card
+
+	missing = [user for user in users if user not in cards]
+	if missing:
+		fetched = get_cached_cards(missing)
+		not_cached = [user for user in missing if user not in fetched]
+		if not_cached:
+			queried = query_cards(not_cached)
+			set_cached_cards(queried)
+			fetched.update(queried)
+
+		with _lock:
+			for user, card in fetched.items():
+				_lru[(site, user)] = card
+			while len(_lru) > LRU_SIZE:
+				_lru.popitem(last=False)
+		cards.update(fetched)
+
+	return {user: frappe._dict(cards[user]) for user in users if user in cards}
+
+
+def get_user_card(user):
+	return get_user_cards([user]).get(user)
+
+
+def query_cards(users):
+	rows = frappe.get_all("User", {"name": ["in", users]}, CARD_FIELDS)
+	return {row.name: dict(row) for row in rows}
+
+
+def get_cached_cards(users):
+	cache = frappe.cache()
+	values = cache.mget([get_card_key(user) for user in users])
+	return {user: pickle.loads(value) for user, value in zip(users, values, strict=True) if value}
+
+
+def set_cached_cards(cards):
+	if not cards:
+		return
+	cache = frappe.cache()
+	# the pipeline talks to redis directly, without the wrapper's pickling
+	pipeline = cache.pipeline()
+	for user, card in cards.items():
+		pipeline.set(get_card_key(user), pickle.dumps(card), ex=CARD_TTL)
+	pipeline.execute()
+
+
+def get_card_key(user):
+	return frappe.cache().make_key(f"{CACHE_KEY}:{user}")
+
+
+def get_version():
+	cache = frappe.cache()
+	return int(cache.get(cache.make_key(VERSION_KEY)) or 0)
+
+
+def clear_user_card(doc, method=None):
+	"""Drops the card of a saved or deleted user everywhere."""
+	remove_card(doc.name)
+	frappe.db.after_commit.add(partial(remove_card, doc.name))
+
+
+def remove_card(user):
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	pipeline.delete(get_card_key(user))
+	pipeline.incr(cache.make_key(VERSION_KEY))
+	pipeline.execute()
+	with _lock:
+		_lru.pop((frappe.local.site, user), None)
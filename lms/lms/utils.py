@@ -30,6 +30,8 @@ from frappe.utils import (
 from frappe.utils.dateutils import get_period
 
 from lms.lms.md import find_macros, markdown_to_html
+from lms.lms.payment_fulfillment import fulfill_payment
+from lms.lms.user_cards import get_user_cards
 
 RE_SLUG_NOTALLOWED = re.compile("[^a-z0-9]+")
 
@@ -209,24 +211,13 @@ def get_tags(course):
 
 
 def get_instructors(doctype, docname):
-	instructor_details = []
 	instructors = frappe.get_all(
 		"Course Instructor",
 		{"parent": docname, "parenttype": doctype},
 		order_by="idx",
 		pluck="instructor",
 	)
-
-	for instructor in instructors:
-		instructor_details.append(
-			frappe.db.get_value(
-				"User",
-				instructor,
-				["name", "username", "full_name", "user_image", "first_name"],
-				as_dict=True,
-			)
-		)
-	return instructor_details
+	return list(get_user_cards(instructors).values())
 
 
 def get_students(course, batch=None):
@@ -259,11 +250,10 @@ def get_reviews(course):
 		"DocField", {"parent": "LMS Course Review", "fieldtype": "Rating"}, ["options"]
 	)
 	out_of_ratings = (len(out_of_ratings) and out_of_ratings[0].options) or 5
+	owners = get_user_cards([review.owner for review in reviews])
 	for review in reviews:
 		review.rating = review.rating * out_of_ratings
-		review.owner_details = frappe.db.get_value(
-			"User", review.owner, ["name", "username", "full_name", "user_image"], as_dict=True
-		)
+		review.owner_details = owners.get(review.owner)
 		review.creation = pretty_date(review.creation)
 
 	return reviews
@@ -374,14 +364,22 @@ def is_cohort_staff(course, user_email):
 
 def get_mentors(course):
 	"""Returns the list of all mentors for this course."""
-	course_mentors = []
-	mentors = frappe.get_all("LMS Course Mentor Mapping", {"course": course}, ["mentor"])
-	for mentor in mentors:
-		member = frappe.db.get_value("User", mentor.mentor, ["name", "username", "full_name", "user_image"])
-		member.batch_count = frappe.db.count(
-			"LMS Enrollment", {"member": member.name, "member_type": "Mentor"}
+	mentors = frappe.get_all("LMS Course Mentor Mapping", {"course": course}, pluck="mentor")
+	course_mentors = list(get_user_cards(mentors).values())
+	if not course_mentors:
+		return course_mentors
+
+	batch_counts = dict(
+		frappe.get_all(
+			"LMS Enrollment",
+			{"member": ["in", [mentor.name for mentor in course_mentors]], "member_type": "Mentor"},
+			["member", "count(name) as batch_count"],
+			group_by="member",
+			as_list=True,
 		)
-		course_mentors.append(member)
+	)
+	for mentor in course_mentors:
+		mentor.batch_count = batch_counts.get(mentor.name, 0)
 	return course_mentors
 
 
@@ -406,17 +404,8 @@ def get_course_progress(course, member=None):
 
 
 def get_initial_members(course):
-	members = frappe.get_all("LMS Enrollment", {"course": course}, ["member"], limit=3)
-
-	member_details = []
-	for member in members:
-		member_details.append(
-			frappe.db.get_value(
-				"User", member.member, ["name", "username", "full_name", "user_image"], as_dict=True
-			)
-		)
-
-	return member_details
+	members = frappe.get_all("LMS Enrollment", {"course": course}, pluck="member", limit=3)
+	return list(get_user_cards(members).values())
 
 
 def is_instructor(course):
@@ -889,9 +878,21 @@ def get_upcoming_evals(courses=None, batch=None):
 		order_by="date",
 	)
 
+	course_titles = dict(
+		frappe.get_all(
+			"LMS Course",
+			{"name": ["in", list({evals.course for evals in upcoming_evals})]},
+			["name", "title"],
+			as_list=True,
+		)
+		if upcoming_evals
+		else []
+	)
+	evaluators = get_user_cards([evals.evaluator for evals in upcoming_evals])
 	for evals in upcoming_evals:
-		evals.course_title = frappe.db.get_value("LMS Course", evals.course, "title")
-		evals.evaluator_name = frappe.db.get_value("User", evals.evaluator, "full_name")
+		evals.course_title = course_titles.get(evals.course)
+		evaluator = evaluators.get(evals.evaluator)
+		evals.evaluator_name = evaluator and evaluator.full_name
 	return upcoming_evals
 
 
@@ -1716,8 +1717,9 @@ def get_discussion_topics(doctype, docname, single_thread):
 		order_by="creation desc",
 	)
 
+	users = get_user_cards([topic.owner for topic in topics])
 	for topic in topics:
-		topic.user = frappe.db.get_value("User", topic.owner, ["full_name", "user_image"], as_dict=True)
+		topic.user = users.get(topic.owner)
 
 	return topics
 
@@ -1746,8 +1748,9 @@ def get_discussion_replies(topic):
 		order_by="creation",
 	)
 
+	users = get_user_cards([reply.owner for reply in replies])
 	for reply in replies:
-		reply.user = frappe.db.get_value("User", reply.owner, ["full_name", "user_image"], as_dict=True)
+		reply.user = users.get(reply.owner)
 
 	return replies
 
@@ -1876,34 +1879,14 @@ def update_payment_record(doctype, docname):
 				"order_id": data.get("order_id"),
 			},
 		)
-		payment_for_certificate = frappe.db.get_value("LMS Payment", data.payment, "payment_for_certificate")
-
+		frappe.db.savepoint("fulfill_payment")
 		try:
-			if payment_for_certificate:
-				update_certificate_purchase(docname, data.payment)
-			elif doctype == "LMS Course":
-				enroll_in_course(docname, data.payment)
-			else:
-				enroll_in_batch(docname, data.payment)
+			fulfill_payment(data.payment)
 		except Exception as e:
+			frappe.db.rollback(save_point="fulfill_payment")
 			frappe.log_error(frappe.get_traceback(), _("Enrollment Failed, {0}").format(e))
 
 
-def enroll_in_course(course, payment_name):
-	if not frappe.db.exists("LMS Enrollment", {"member": frappe.session.user, "course": course}):
-		enrollment = frappe.new_doc("LMS Enrollment")
-		payment = frappe.db.get_value("LMS Payment", payment_name, ["name", "source"], as_dict=True)
-
-		enrollment.update(
-			{
-				"member": frappe.session.user,
-				"course": course,
-				"payment": payment.name,
-			}
-		)
-		enrollment.save(ignore_permissions=True)
-
-
 @frappe.whitelist()
 def enroll_in_batch(batch, payment_name=None):
 	if not frappe.db.exists("LMS Batch Enrollment", {"batch": batch, "member": frappe.session.user}):
@@ -1931,17 +1914,6 @@ def enroll_in_batch(batch, payment_name=None):
 		new_student.save()
 
 
-def update_certificate_purchase(course, payment_name):
-	frappe.db.set_value(
-		"LMS Enrollment",
-		{"member": frappe.session.user, "course": course},
-		{
-			"purchased_certificate": 1,
-			"payment": payment_name,
-		},
-	)
-
-
 @frappe.whitelist()
 def get_programs():
 	enrolled_programs = frappe.get_all(
@@ -0,0 +1,190 @@
+"""
+The webhook_verification module authenticates payment webhooks before
+their body is parsed.
+
+Every provider has a verifier registered in VERIFIERS along with the
+header that carries its signature. The provider is picked from the
+headers alone, so a request without a known signature header is rejected
+without reading secrets, parsing JSON or touching the database.
+
+    >>> provider = get_provider(headers)
+    >>> verify_webhook(provider, body, headers)
+    True
+
+Verifiers get the raw body bytes and compare signatures in constant time.
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+import zlib
+from urllib.parse import urlparse
+
+import frappe
+import requests
+
+STRIPE_TOLERANCE = 300
+SECRET_CACHE_TTL = 300
+SECRET_VERSION_KEY = "lms:webhook_secret_version"
+SECRET_VERSION_CHECK_INTERVAL = 5
+
+_secrets = {}
+# site: (version, time of the next check)
+_versions = {}
+
+
+def verify_stripe(body, headers, secret):
+	"""Checks the Stripe-Signature header, which looks like
+	`t=1492774577,v1=5257a869...`, against an HMAC of `{t}.{body}`."""
+	signature = headers.get("Stripe-Signature") or ""
+	timestamp = None
+	signatures = []
+	for item in signature.split(","):
+		key, _, value = item.partition("=")
+		if key == "t":
+			timestamp = value
+		elif key == "v1":
+			signatures.append(value)
+
+	if not timestamp or not signatures or not timestamp.isdigit():
+		return False
+	if abs(time.time() - int(timestamp)) > STRIPE_TOLERANCE:
+		return False
+
+	expected = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+	return any(hmac.compare_digest(expected, value) for value in signatures)
+
+
+def verify_razorpay(body, headers, secret):
+	signature = headers.get("X-Razorpay-Signature") or ""
+	expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+	return hmac.compare_digest(expected, signature)
+
+
+def verify_custom(body, headers, secret):
+	signature = headers.get("X-LMS-Signature") or ""
+	expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+	return hmac.compare_digest(expected, signature)
+
+
+def verify_paypal(body, headers, webhook_id):
+	"""Verifies the PayPal transmission signature offline with the public
+	certificate PayPal points to, as described in their webhook docs."""
+	from cryptography import x509
+	from cryptography.exceptions import InvalidSignature
+	from cryptography.hazmat.primitives import hashes
+	from cryptography.hazmat.primitives.asymmetric import padding
+
+	transmission_id = headers.get("Paypal-Transmission-Id")
+	transmission_time = headers.get("Paypal-Transmission-Time")
+	signature = headers.get("Paypal-Transmission-Sig")
+	cert_url = headers.get("Paypal-Cert-Url")
+	if not (transmission_id and transmission_time and signature and cert_url):
+		return False
+
+	url = urlparse(cert_url)
+	if url.scheme != "https" or not (url.hostname or "").endswith(".paypal.com"):
+		return False
+
+	message = f"{transmission_id}|{transmission_time}|{webhook_id}|{zlib.crc32(body)}"
+	certificate = x509.load_pem_x509_certificate(get_paypal_certificate(cert_url))
+	try:
+		certificate.public_key().verify(
+			base64.b64decode(signature), message.encode(), padding.PKCS1v15(), hashes.SHA256()
+		)
+	except (InvalidSignature, ValueError):
+		return False
+	return True
+
+
+def get_paypal_certificate(cert_url):
+	def fetch():
+		response = requests.get(cert_url, timeout=10)
+		response.raise_for_status()
+		return response.text
+
+	return frappe.cache().get_value(f"lms:paypal_cert:{cert_url}", generator=fetch).encode()
+
+
+# provider: (signature header, verifier, LMS Settings field holding the secret)
+VERIFIERS = {
+	"Stripe": ("Stripe-Signature", verify_stripe, "stripe_webhook_secret"),
+	"Razorpay": ("X-Razorpay-Signature", verify_razorpay, "razorpay_webhook_secret"),
+	"PayPal": ("Paypal-Transmission-Sig", verify_paypal, "paypal_webhook_id"),
+	"Custom": ("X-LMS-Signature", verify_custom, "custom_webhook_secret"),
+}
+
+
+def get_provider(headers):
+	"""Returns the provider whose signature header is present, if any."""
+	for provider, (header, _verifier, _field) in VERIFIERS.items():
+		if headers.get(header):
+			return provider
+
+
+def verify_webhook(provider, body, headers):
+	"""Returns True if the body was signed by the provider.
+
+	Fails closed: a provider without a configured secret is rejected unless
+	`lms_allow_unverified_webhooks` is set in site config.
+	"""
+	if provider not in VERIFIERS:
+		return False
+
+	_header, verifier, field = VERIFIERS[provider]
+	secret = get_webhook_secret(field)
+	if not secret:
+		return bool(frappe.conf.get("lms_allow_unverified_webhooks"))
+
+	try:
+		return verifier(body, headers, secret)
+	except Exception:
+		frappe.log_error(title=f"{provider} webhook verification failed")
+		return False
+
+
+def get_webhook_secret(field):
+	"""Secrets are kept decrypted in process memory for a few minutes so
+	verifying a webhook doesn't need a database read and a decryption.
+
+	Changing LMS Settings bumps a version number in redis, and a secret
+	cached under an older version is read again. The version is read at
+	most every few seconds, so rejecting a webhook doesn't wait for
+	redis, and every process picks up a rotated secret within seconds."""
+	key = (frappe.local.site, field)
+	version = get_secret_version()
+	cached = _secrets.get(key)
+	if cached and cached[1] > time.monotonic() and cached[2] == version:
+		return cached[0]
+
+	if frappe.get_meta("LMS Settings").get_field(field).fieldtype == "Password":
+		secret = frappe.utils.password.get_decrypted_password(
+			"LMS Settings", "LMS Settings", field, raise_exception=False
+		)
+	else:
+		secret = frappe.db.get_single_value("LMS Settings", field)
+
+	_secrets[key] = (secret, time.monotonic() + SECRET_CACHE_TTL, version)
+	return secret
+
+
+def get_secret_version():
+	site = frappe.local.site
+	cached = _versions.get(site)
+	if cached and cached[1] > time.monotonic():
+		return cached[0]
+
+	cache = frappe.cache()
+	version = int(cache.get(cache.make_key(SECRET_VERSION_KEY)) or 0)
+	_versions[site] = (version, time.monotonic() + SECRET_VERSION_CHECK_INTERVAL)
+	return version
+
+
+def clear_webhook_secrets():
+	"""Makes every process read the secrets again."""
+	cache = frappe.cache()
+	cache.incr(cache.make_key(SECRET_VERSION_KEY))
+	_versions.pop(frappe.local.site, None)
+	for key in [key for key in _secrets if key[0] == frappe.local.site]:
+		del _secrets[key]
@@ -0,0 +1,215 @@
+"""
+The zoom module is the single entry point for talking to the Zoom API.
+
+Access tokens are cached per LMS Zoom Settings account until shortly
+before they expire, and every request goes through one keep-alive
+session per process that retries transient failures of idempotent
+requests with backoff.
+
+The base urls can be pointed at a local stub from site config:
+
+    "zoom_api_url": "http://127.0.0.1:8765/v2",
+    "zoom_oauth_url": "http://127.0.0.1:8765/oauth/token"
+"""
+
+import base64
+import threading
+import time
+
+import frappe
+import requests
+from frappe import _
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+ZOOM_API_URL = "https://api.zoom.us/v2"
+ZOOM_OAUTH_URL = "https://zoom.us/oauth/token"
+
+# refresh the token this many seconds before zoom expires it
+TOKEN_EXPIRY_MARGIN = 300
+REQUEST_TIMEOUT = 30
+RATE_LIMIT_WAIT_LIMIT = 60
+IDEMPOTENT_METHODS = ["GET", "HEAD", "PUT", "DELETE", "OPTIONS"]
+
+_session = None
+_token_lock = threading.Lock()
+
+
+def get_api_url():
+	return (frappe.conf.get("zoom_api_url") or ZOOM_API_URL).rstrip("/")
+
+
+def get_oauth_url():
+	return frappe.conf.get("zoom_oauth_url") or ZOOM_OAUTH_URL
+
+
+def get_session():
+	"""Returns the process wide session used for all zoom calls.
+
+	Connections are kept alive between calls and failed requests are
+	retried with exponential backoff, honouring Retry-After on 429s.
+	Requests that create or change something in zoom are not retried
+	here, as a 5xx doesn't tell whether zoom carried them out. They are
+	only repeated on a 429, see make_request.
+	"""
+	global _session
+	if _session is None:
+		retry = Retry(
+			total=3,
+			backoff_factor=0.5,
+			status_forcelist=[429, 500, 502, 503, 504],
+			allowed_methods=IDEMPOTENT_METHODS,
+			respect_retry_after_header=True,
+			raise_on_status=False,
+		)
+		session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+		session.mount("https://", adapter)
+		session.mount("http://", adapter)
+		_session = session
+
+	return _session
+
+
+def get_token_cache_key(zoom_account):
+	return f"lms:zoom_access_token:{zoom_account}"
+
+
+def get_access_token(zoom_account):
+	"""Returns a valid access token for the zoom account, fetching a new
+	one only when the cached token is missing or about to expire."""
+	key = get_token_cache_key(zoom_account)
+	token = frappe.cache().get_value(key)
+	if token:
+		return token
+
+	# threads syncing attendance may all find the token missing after a 401
+	with _token_lock:
+		return frappe.cache().get_value(key) or fetch_access_token(zoom_account)
+
+
+def fetch_access_token(zoom_account):
+	zoom = frappe.get_doc("LMS Zoom Settings", zoom_account)
+	if not zoom.enabled:
+		frappe.throw(_("Please enable the zoom account to use this feature."))
+
+	credentials = zoom.client_id + ":" + zoom.get_password(fieldname="client_secret", raise_exception=False)
+	headers = {"Authorization": "Basic " + base64.b64encode(bytes(credentials, encoding="utf8")).decode()}
+	response = get_session().post(
+		get_oauth_url(),
+		params={"grant_type": "account_credentials", "account_id": zoom.account_id},
+		headers=headers,
+		timeout=REQUEST_TIMEOUT,
+	)
+
+	if response.status_code != 200:
+		frappe.throw(_("Could not authenticate with Zoom. {0}").format(response.text))
+
+	data = response.json()
+	token = data["access_token"]
+	expires_in = data.get("expires_in", 3600) - TOKEN_EXPIRY_MARGIN
+	if expires_in > 0:
+		frappe.cache().set_value(get_token_cache_key(zoom_account), token, expires_in_sec=expires_in)
+
+	return token
+
+
+def clear_access_token(zoom_account):
+	frappe.cache().delete_value(get_token_cache_key(zoom_account))
+
+
+def get_rate_limit_key(zoom_account):
+	return f"lms:zoom_rate_limited_until:{zoom_account}"
+
+
+def wait_for_rate_limit(zoom_account):
+	"""Sleeps until the rate limit window reported by zoom for this
+	account is over. Throws if the wait would be unreasonably long."""
+	until = frappe.cache().get_value(get_rate_limit_key(zoom_account))
+	if not until:
+		return
+
+	wait = until - time.time()
+	if wait <= 0:
+		return
+	if wait > RATE_LIMIT_WAIT_LIMIT:
+		frappe.throw(_("Zoom rate limit reached. Please try again later."))
+	time.sleep(wait)
+
+
+def record_rate_limit(zoom_account, response):
+	if response.status_code != 429 and response.headers.get("X-RateLimit-Remaining") != "0":
+		return
+
+	retry_after = response.headers.get("Retry-After")
+	try:
+		wait = float(retry_after) if retry_after else 1
+	except ValueError:
+		wait = 1
+
+	frappe.cache().set_value(
+		get_rate_limit_key(zoom_account), time.time() + wait, expires_in_sec=max(int(wait) + 1, 1)
+	)
+
+
+def make_request(zoom_account, method, path, **kwargs):
+	"""Makes an authenticated request to the zoom api and returns the response.
+
+	A 401 usually means the cached token was revoked, so the token is
+	refreshed once and the request retried. A request the session doesn't
+	retry is repeated once on a 429, after the rate limit window, since
+	zoom rejected it without carrying it out.
+	"""
+	url = get_api_url() + path
+	kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+	extra_headers = kwargs.pop("headers", None) or {}
+
+	for attempt in range(2):
+		wait_for_rate_limit(zoom_account)
+		headers = {
+			"Authorization": "Bearer " + get_access_token(zoom_account),
+			"content-type": "application/json",
+			**extra_headers,
+		}
+		response = get_session().request(method, url, headers=headers, **kwargs)
+		record_rate_limit(zoom_account, response)
+
+		if attempt == 0 and response.status_code == 401:
+			clear_access_token(zoom_account)
+			continue
+		if attempt == 0 and response.status_code == 429 and method.upper() not in IDEMPOTENT_METHODS:
+			continue
+		break
+
+	return response
+
+
+def get(zoom_account, path, **kwargs):
+	return make_request(zoom_account, "GET", path, **kwargs)
+
+
+def post(zoom_account, path, **kwargs):
+	return make_request(zoom_account, "POST", path, **kwargs)
+
+
+def get_all_pages(zoom_account, path, key, page_size=300):
+	"""Follows next_page_token until every page of a list endpoint has
+	been read and returns the combined `key` records.
+
+	Every page goes through make_request. When called from a worker
+	thread, run it in a copy of the caller's context so frappe.local is
+	available there.
+	"""
+	params = {"page_size": page_size}
+	records = []
+
+	while True:
+		response = make_request(zoom_account, "GET", path, params=dict(params))
+		response.raise_for_status()
+		data = response.json()
+		records.extend(data.get(key) or [])
+
+		next_page_token = data.get("next_page_token")
+		if not next_page_token:
+			return records
+		params["next_page_token"] = next_page_token
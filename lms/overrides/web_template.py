@@ -3,7 +3,7 @@ import json
 import frappe
 from frappe.website.doctype.web_template.web_template import WebTemplate
 
-from lms.widgets import Widgets
+from lms.widgets import WIDGETS
 
 
 class CustomWebTemplate(WebTemplate):
@@ -12,6 +12,6 @@ class CustomWebTemplate(WebTemplate):
 			values = {}
 		values = frappe.parse_json(values)
 		values.update({"values": values})
-		values.update({"widgets": Widgets()})
+		values.update({"widgets": WIDGETS})
 		template = self.get_template(self.standard)
 		return frappe.render_template(template, values)
@@ -1,15 +1,23 @@
 """Custom page renderers for LMS app.
 
-Handles rendering of profile pages.
+Handles rendering of profile pages, SCORM packages and the cached public
+pages.
 """
 
-import mimetypes
-import os
+import hashlib
 
 import frappe
 from frappe.website.page_renderers.base_renderer import BaseRenderer
+from frappe.website.page_renderers.template_page import TemplatePage
 from werkzeug.wrappers import Response
-from werkzeug.wsgi import wrap_file
+
+from lms.lms.scorm import resolve_file, send_scorm_file
+from lms.www.lms import get_shell_context
+
+# public landing pages whose HTML is cached for guests
+GUEST_CACHED_PAGES = ("home", "course_list", "courses", "team_training")
+GUEST_PAGE_CACHE_TTL = 300
+GUEST_PAGE_CACHE_KEY = "lms:guest_page"
 
 
 class SCORMRenderer(BaseRenderer):
@@ -17,40 +25,64 @@ class SCORMRenderer(BaseRenderer):
 		return "scorm/" in self.path
 
 	def render(self):
-		path = os.path.join(frappe.local.site_path, "public", self.path.lstrip("/"))
-
-		extension = os.path.splitext(path)[1]
-		if not extension:
-			path = f"{path}.html"
-
-		# check if path exists and is actually a file and not a folder
-		if os.path.exists(path) and os.path.isfile(path):
-			f = open(path, "rb")
-			response = Response(wrap_file(frappe.local.request.environ, f), direct_passthrough=True)
-			response.mimetype = mimetypes.guess_type(path)[0]
-			return response
+		path = resolve_file(self.path)
+		if path:
+			return send_scorm_file(path)
+
+
+class GuestPageRenderer(BaseRenderer):
+	"""Serves the public landing pages to guests from the cache.
+
+	The rendered HTML is cached per page, category and language for a few
+	minutes and cleared when a course, review or category changes. Browsers
+	revalidate with the ETag and get a 304 while the page is unchanged.
+	"""
+
+	def can_render(self):
+		return (
+			frappe.session.user == "Guest"
+			and frappe.request.method in ("GET", "HEAD")
+			and self.path.strip("/") in GUEST_CACHED_PAGES
+		)
+
+	def render(self):
+		category = get_page_category(self.path.strip("/"))
+		if category is None:
+			return TemplatePage(self.path, self.http_status_code).render()
+
+		key = ":".join([GUEST_PAGE_CACHE_KEY, self.path.strip("/"), category, frappe.local.lang])
+		page = frappe.cache().get_value(key)
+		if not page:
+			response = TemplatePage(self.path, self.http_status_code).render()
+			if response.status_code != 200:
+				return response
+
+			html = response.get_data()
+			page = {"html": html, "etag": hashlib.md5(html).hexdigest()}
+			frappe.cache().set_value(key, page, expires_in_sec=GUEST_PAGE_CACHE_TTL)
+
+		if frappe.request.if_none_match.contains(page["etag"]):
+			response = Response(status=304)
 		else:
-			path = path.replace(".html", "")
-			if os.path.exists(path) and os.path.isdir(path):
-				index_path = os.path.join(path, "index.html")
-				if os.path.exists(index_path):
-					f = open(index_path, "rb")
-					response = Response(wrap_file(frappe.local.request.environ, f), direct_passthrough=True)
-					response.mimetype = mimetypes.guess_type(index_path)[0]
-					return response
-			elif not os.path.exists(path):
-				chapter_folder = "/".join(self.path.split("/")[:3])
-				chapter_folder_path = os.path.realpath(frappe.get_site_path("public", chapter_folder))
-				file = path.split("/")[-1]
-				correct_file_path = None
-
-				for root, _dirs, files in os.walk(chapter_folder_path):
-					if file in files:
-						correct_file_path = os.path.join(root, file)
-						break
-
-				if correct_file_path:
-					f = open(correct_file_path, "rb")
-					response = Response(wrap_file(frappe.local.request.environ, f), direct_passthrough=True)
-					response.mimetype = mimetypes.guess_type(correct_file_path)[0]
-					return response
+			response = Response(page["html"], mimetype="text/html")
+		response.set_etag(page["etag"])
+		response.headers["Cache-Control"] = "no-cache"
+		return response
+
+
+def get_page_category(page):
+	"""Returns the category a cached page is shown for, "" for all, or None
+	for a category that doesn't exist, so that made-up categories don't
+	fill the cache. Only the courses page is filtered by category."""
+	slug = frappe.form_dict.category
+	if page != "courses" or not slug:
+		return ""
+
+	# the page looks the category up by its name in title case
+	category = slug.replace("_", " ").title()
+	if category in {row.category for row in get_shell_context().categories}:
+		return category
+
+
+def clear_guest_page_cache(doc=None, method=None):
+	frappe.cache().delete_keys(GUEST_PAGE_CACHE_KEY)
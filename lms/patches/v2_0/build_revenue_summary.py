@@ -0,0 +1,5 @@
+from lms.lms.doctype.lms_revenue_summary.lms_revenue_summary import rebuild_revenue_summary
+
+
+def execute():
+	rebuild_revenue_summary()
@@ -0,0 +1,29 @@
+import frappe
+
+
+def execute():
+	"""Make payment ids unique before the unique index is added.
+
+	Empty ids are cleared, and repeated ids on later payments get the
+	payment name appended so the original value is still visible."""
+	frappe.db.sql("UPDATE `tabLMS Payment` SET payment_id = NULL WHERE payment_id = ''")
+
+	duplicates = frappe.db.sql(
+		"""
+		SELECT payment_id
+		FROM `tabLMS Payment`
+		WHERE payment_id IS NOT NULL
+		GROUP BY payment_id
+		HAVING COUNT(*) > 1
+		""",
+		pluck=True,
+	)
+
+	for payment_id in duplicates:
+		payments = frappe.get_all(
+			"LMS Payment", {"payment_id": payment_id}, pluck="name", order_by="creation asc"
+		)
+		for payment in payments[1:]:
+			frappe.db.set_value(
+				"LMS Payment", payment, "payment_id", f"{payment_id}-{payment}", update_modified=False
+			)
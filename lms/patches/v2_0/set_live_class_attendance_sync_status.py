@@ -0,0 +1,11 @@
+import frappe
+
+
+def execute():
+	frappe.db.sql(
+		"""
+		UPDATE `tabLMS Live Class`
+		SET attendance_sync_status = 'Synced'
+		WHERE attendees > 0
+		"""
+	)
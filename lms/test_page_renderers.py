@@ -0,0 +1,30 @@
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from lms.www.lms import clear_shell_context
+
+from .page_renderers import get_page_category
+
+
+class TestGuestPageRenderer(IntegrationTestCase):
+	def setUp(self):
+		frappe.get_doc({"doctype": "LMS Category", "category": "Page Cache Category"}).insert()
+		clear_shell_context()
+
+	def tearDown(self):
+		frappe.local.form_dict = frappe._dict()
+		clear_shell_context()
+
+	def get_category(self, page, category):
+		frappe.local.form_dict = frappe._dict(category=category)
+		return get_page_category(page)
+
+	def test_known_category(self):
+		self.assertEqual(self.get_category("courses", "page_cache_category"), "Page Cache Category")
+
+	def test_unknown_category_is_not_cached(self):
+		self.assertIsNone(self.get_category("courses", "no_such_category"))
+
+	def test_category_of_other_pages_is_ignored(self):
+		self.assertEqual(self.get_category("home", "no_such_category"), "")
+		self.assertEqual(self.get_category("courses", None), "")
@@ -1,10 +1,15 @@
 # Copyright (c) 2021, FOSS United and Contributors
 # See license.txt
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 import frappe
+from werkzeug.wrappers import Response
 
-from .widgets import Widget, Widgets
+from . import widgets as widgets_module
+from .widgets import Widget, Widgets, add_server_timing, clear_widget_cache, get_template, is_modified
 
 
 class TestWidgets(unittest.TestCase):
@@ -12,7 +17,70 @@ class TestWidgets(unittest.TestCase):
 		widgets = Widgets()
 		assert widgets.Foo.name == "Foo"
 		assert widgets.Bar.name == "Bar"
+		assert widgets.Foo is widgets.Foo
 
 	def _test_Widget(self):
 		hello = Widget("HelloWorld")
 		assert hello(name="Test") == "Hello, Test"
+
+
+class TestWidgetTemplates(unittest.TestCase):
+	def setUp(self):
+		clear_widget_cache()
+		self.new_request()
+
+	def tearDown(self):
+		clear_widget_cache()
+		self.new_request()
+
+	def new_request(self):
+		frappe.local.lms_widget_templates = {}
+		frappe.local.lms_widget_timings = {}
+
+	def test_compiled_once(self):
+		with patch.object(widgets_module, "compile_widget", wraps=widgets_module.compile_widget) as compile:
+			template = get_template("HelloWorld")
+			self.assertIs(get_template("HelloWorld"), template)
+
+			self.new_request()
+			self.assertIsNot(get_template("HelloWorld"), template)
+
+		self.assertEqual(compile.call_count, 1)
+
+	def test_reloaded_in_developer_mode(self):
+		get_template("HelloWorld")
+
+		with (
+			patch.object(widgets_module, "compile_widget", wraps=widgets_module.compile_widget) as compile,
+			patch.object(widgets_module, "is_modified", return_value=True),
+		):
+			with patch.dict(frappe.conf, {"developer_mode": 0}):
+				self.new_request()
+				get_template("HelloWorld")
+			self.assertEqual(compile.call_count, 0)
+
+			with patch.dict(frappe.conf, {"developer_mode": 1}):
+				self.new_request()
+				get_template("HelloWorld")
+			self.assertEqual(compile.call_count, 1)
+
+	def test_is_modified(self):
+		with tempfile.NamedTemporaryFile(suffix=".html") as f:
+			mtime = os.path.getmtime(f.name)
+			self.assertFalse(is_modified((f.name, mtime, None)))
+
+			os.utime(f.name, (mtime + 10, mtime + 10))
+			self.assertTrue(is_modified((f.name, mtime, None)))
+
+	def test_server_timing(self):
+		frappe.local.lms_widget_timings = {"HelloWorld": (2, 0.005)}
+
+		with patch.dict(frappe.conf, {"developer_mode": 0, "lms_widget_server_timing": 0}):
+			response = Response()
+			add_server_timing(response, None)
+			self.assertNotIn("Server-Timing", response.headers)
+
+		with patch.dict(frappe.conf, {"developer_mode": 0, "lms_widget_server_timing": 1}):
+			response = Response()
+			add_server_timing(response, None)
+			self.assertEqual(response.headers["Server-Timing"], 'widget-HelloWorld;dur=5.00;desc="2"')
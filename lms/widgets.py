@@ -8,8 +8,13 @@ them will be a lot easier.
 The widgets will be provided
 """
 
+import os
+import threading
+import time
+
 import frappe
 from frappe.utils.jinja import get_jenv
+from jinja2 import TemplateNotFound
 
 # search path for widgets.
 # When {{widgets.SomeWidget()}} is called, it looks for
@@ -18,20 +23,96 @@ MODULES = [
 	"lms",
 ]
 
+# widget name: (filename, mtime, compiled code), shared by the requests of
+# the process. The jinja environment is created per request, so the code is
+# bound to the current one (see get_template).
+_compiled = {}
+_lock = threading.Lock()
+
 
 def update_website_context(context):
 	"""Adds widgets to the context.
 
 	Called from hooks.
 	"""
-	context.widgets = Widgets()
+	context.widgets = WIDGETS
+
+
+def add_server_timing(response, request):
+	"""Reports the render time of each widget used by the request in the
+	Server-Timing header, in developer mode or with lms_widget_server_timing
+	set in the site config.
+
+	Called from hooks, after the request.
+	"""
+	if not (frappe.conf.developer_mode or frappe.conf.lms_widget_server_timing):
+		return
+	timings = getattr(frappe.local, "lms_widget_timings", None)
+	if not timings or response is None:
+		return
+	response.headers.add(
+		"Server-Timing",
+		", ".join(
+			f'widget-{name};dur={duration * 1000:.2f};desc="{count}"'
+			for name, (count, duration) in sorted(timings.items(), key=lambda item: -item[1][1])
+		),
+	)
+
+
+def get_widget_timings():
+	"""Returns {widget: (renders, seconds)} of the current request. The time
+	of a widget includes the widgets it renders."""
+	return dict(getattr(frappe.local, "lms_widget_timings", None) or {})
+
+
+def get_template(name):
+	"""Returns the template of a widget, compiled once per process and
+	recompiled in developer mode when the file changes."""
+	templates = getattr(frappe.local, "lms_widget_templates", None)
+	if templates is None:
+		templates = frappe.local.lms_widget_templates = {}
+	if name in templates:
+		return templates[name]
+
+	env = get_jenv()
+	compiled = _compiled.get(name)
+	if compiled is None or (frappe.conf.developer_mode and is_modified(compiled)):
+		compiled = compile_widget(env, name)
+		with _lock:
+			_compiled[name] = compiled
+
+	templates[name] = env.template_class.from_code(env, compiled[2], env.make_globals(None))
+	return templates[name]
+
+
+def compile_widget(env, name):
+	# the widget could be in any of the modules
+	for path in [f"{module}/widgets/{name}.html" for module in MODULES]:
+		try:
+			source, filename, _uptodate = env.loader.get_source(env, path)
+		except TemplateNotFound:
+			continue
+		mtime = os.path.getmtime(filename) if filename else None
+		return filename, mtime, env.compile(source, path, filename)
+
+	raise TemplateNotFound(name)
+
+
+def is_modified(compiled):
+	filename, mtime = compiled[0], compiled[1]
+	return bool(filename) and (not os.path.exists(filename) or os.path.getmtime(filename) != mtime)
+
+
+def clear_widget_cache():
+	_compiled.clear()
 
 
 class Widgets:
 	"""The widget collection.
 
 	This is just a placeholder object and returns the appropriate
-	widget when accessed using attribute.
+	widget when accessed using attribute. Widgets are created once and
+	then kept as attributes.
 
 	    >>> widgets = Widgets()
 	    >>> widgets.HelloWorld(name="World!")
@@ -41,7 +122,9 @@ class Widgets:
 	def __getattr__(self, name):
 		widget_globals = {"widgets": self}
 		if not name.startswith("__"):
-			return Widget(name, widget_globals)
+			widget = Widget(name, widget_globals)
+			self.__dict__[name] = widget
+			return widget
 		else:
 			raise AttributeError(name)
 
@@ -57,7 +140,7 @@ class Widget:
 	    '<div>Hello, World!</div>'
 	"""
 
-	def __init__(self, name, widget_globals):
+	def __init__(self, name, widget_globals=None):
 		if not widget_globals:
 			widget_globals = {}
 
@@ -65,8 +148,16 @@ class Widget:
 		self.name = name
 
 	def __call__(self, **kwargs):
-		# the widget could be in any of the modules
-		paths = [f"{module}/widgets/{self.name}.html" for module in MODULES]
-		env = get_jenv()
+		start = time.perf_counter()
 		kwargs.update(self.widget_globals)
-		return env.get_or_select_template(paths).render(kwargs)
+		try:
+			return get_template(self.name).render(kwargs)
+		finally:
+			timings = getattr(frappe.local, "lms_widget_timings", None)
+			if timings is None:
+				timings = frappe.local.lms_widget_timings = {}
+			count, duration = timings.get(self.name, (0, 0))
+			timings[self.name] = (count + 1, duration + time.perf_counter() - start)
+
+
+WIDGETS = Widgets()
@@ -1,5 +1,8 @@
 import frappe
 
+from lms.lms.user_cards import get_user_cards
+
+
 def get_user_initials(full_name):
     """Generate initials from full name"""
     if not full_name or full_name == "Student":
@@ -33,6 +36,9 @@ def _scale_rating_to_5(raw):
 
 
 def get_context(context):
+    # Guest requests are cached by lms.page_renderers.GuestPageRenderer
+    context.no_cache = 1
+
     # --- Categories ---
     try:
         categories = frappe.get_all("LMS Category", fields=["name", "category"])
@@ -61,51 +67,29 @@ def get_context(context):
             limit_page_length=3
         )
 
+        course_names = [course.name for course in courses]
+        ratings = get_review_stats(course_names)
+        latest_reviews = get_latest_reviews(course_names, 2)
+        user_names = get_full_names(
+            [course.owner for course in courses]
+            + [r.owner for reviews in latest_reviews.values() for r in reviews]
+        )
+
         for course in courses:
             # instructor
-            instructor_name = frappe.db.get_value("User", course.owner, "full_name")
-            course.instructor_name = instructor_name or "Expert Instructor"
+            course.instructor_name = user_names.get(course.owner) or "Expert Instructor"
             course.instructor_initials = get_user_initials(course.instructor_name)
 
             # reviews for course
-            course_reviews = frappe.get_all(
-                "LMS Course Review",
-                fields=["rating", "review", "creation", "owner"],
-                filters={"course": course.name},
-                order_by="creation desc",
-                limit_page_length=50
-            )
-
-            if course_reviews:
-                scaled_values = []
-                for r in course_reviews:
-                    try:
-                        # scale rating
-                        scaled = _scale_rating_to_5(r['rating'])
-                        r['rating'] = scaled
-                        scaled_values.append(scaled)
-
-                        # fetch reviewer info dynamically
-                        reviewer_name = frappe.db.get_value("User", r['owner'], "full_name")
-                        reviewer_name = reviewer_name or "Student"
-                        r['reviewer_name'] = reviewer_name
-                        r['reviewer_initials'] = get_user_initials(reviewer_name)
-                    except Exception:
-                        continue
-
-                if scaled_values:
-                    avg = sum(scaled_values) / len(scaled_values)
-                    course.rating = round(avg, 1)
-                    course.review_count = len(scaled_values)
-                else:
-                    course.rating = 0.0
-                    course.review_count = 0
-
-                course.latest_reviews = course_reviews[:2]
-            else:
-                course.rating = 0.0
-                course.review_count = 0
-                course.latest_reviews = []
+            stats = ratings.get(course.name)
+            course.rating = _scale_rating_to_5(stats.rating) if stats else 0.0
+            course.review_count = stats.review_count if stats else 0
+
+            course.latest_reviews = latest_reviews.get(course.name, [])
+            for r in course.latest_reviews:
+                r['rating'] = _scale_rating_to_5(r['rating'])
+                r['reviewer_name'] = user_names.get(r['owner']) or "Student"
+                r['reviewer_initials'] = get_user_initials(r['reviewer_name'])
 
             course.duration = "30 hours"
             course.badge = {"text": "Popular", "color": "blue"}
@@ -120,7 +104,7 @@ def get_context(context):
 
     # --- Testimonials ---
     try:
-        reviews = frappe.get_all(
+        testimonials = frappe.get_all(
             "LMS Course Review",
             fields=["name", "rating", "review", "course", "owner"],
             order_by="creation desc",
@@ -128,25 +112,22 @@ def get_context(context):
             ignore_permissions=True
         )
 
-        testimonials = []
-        for r in reviews:
-            # scale rating
-            r['rating'] = _scale_rating_to_5(r['rating'])
-
-            # fetch reviewer dynamically
-            reviewer_name = frappe.db.get_value("User", r['owner'], "full_name") or "Student"
-            r['user_name'] = reviewer_name
-            r['user_initials'] = get_user_initials(reviewer_name)
-
-            # fetch course title
-            r['course_title'] = frappe.db.get_value("LMS Course", r['course'], "title") or "Our Course"
-
-            testimonials.append(r)
+        user_names = get_full_names([r.owner for r in testimonials])
+        course_titles = dict(frappe.get_all(
+            "LMS Course",
+            filters={"name": ["in", list({r.course for r in testimonials})]},
+            fields=["name", "title"],
+            as_list=True,
+        )) if testimonials else {}
 
         # assign colors for UI
         color_classes = ["blue", "green", "purple", "orange", "teal", "pink"]
-        for i, t in enumerate(testimonials):
-            t['color_class'] = color_classes[i % len(color_classes)]
+        for i, r in enumerate(testimonials):
+            r['rating'] = _scale_rating_to_5(r['rating'])
+            r['user_name'] = user_names.get(r['owner']) or "Student"
+            r['user_initials'] = get_user_initials(r['user_name'])
+            r['course_title'] = course_titles.get(r['course']) or "Our Course"
+            r['color_class'] = color_classes[i % len(color_classes)]
 
         context.testimonials = testimonials
 
@@ -155,3 +136,43 @@ def get_context(context):
         context.testimonials = []
 
     return context
+
+
+def get_full_names(users):
+    """Returns {user: full_name} for the given users"""
+    return {user: card.full_name for user, card in get_user_cards(users).items()}
+
+
+def get_review_stats(courses):
+    """Returns {course: row} with the average raw rating and the review count"""
+    if not courses:
+        return {}
+    stats = frappe.db.sql("""
+        SELECT course, AVG(rating) AS rating, COUNT(*) AS review_count
+        FROM `tabLMS Course Review`
+        WHERE course IN %(courses)s
+        GROUP BY course
+    """, {"courses": courses}, as_dict=True)
+    return {row.course: row for row in stats}
+
+
+def get_latest_reviews(courses, limit):
+    """Returns {course: [reviews]} with the latest `limit` reviews of each course"""
+    if not courses:
+        return {}
+    reviews = frappe.db.sql("""
+        SELECT course, rating, review, creation, owner
+        FROM (
+            SELECT course, rating, review, creation, owner,
+                ROW_NUMBER() OVER (PARTITION BY course ORDER BY creation DESC) AS review_rank
+            FROM `tabLMS Course Review`
+            WHERE course IN %(courses)s
+        ) latest
+        WHERE review_rank <= %(limit)s
+        ORDER BY creation DESC
+    """, {"courses": courses, "limit": limit}, as_dict=True)
+
+    by_course = {}
+    for review in reviews:
+        by_course.setdefault(review.course, []).append(review)
+    return by_course
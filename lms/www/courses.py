@@ -1,6 +1,9 @@
 import frappe
 
 def get_context(context):
+    # Guest requests are cached by lms.page_renderers.GuestPageRenderer
+    context.no_cache = 1
+
     category_slug = frappe.form_dict.get("category")
     filters = {"featured": 1}
 
@@ -11,14 +14,14 @@ def get_context(context):
     # --- CATEGORY FILTER ---
     if category_slug:
         category_name = category_slug.replace("_", " ").title()
-        category_doc = frappe.get_all(
+        category = frappe.db.get_value(
             "LMS Category",
-            filters={"category": category_name},
-            fields=["name", "short_intruduction"]  # fetch short_intruduction from category
+            {"category": category_name},
+            ["name", "category", "short_intruduction"],  # fetch short_intruduction from category
+            as_dict=True,
         )
 
-        if category_doc:
-            category = frappe.get_doc("LMS Category", category_doc[0].name)
+        if category:
             filters["category"] = category.name
             context.selected_category = category.category
             context.category_short_intro = category.short_intruduction or ""
@@ -50,12 +53,12 @@ def get_context(context):
     )
 
     # --- GET CURRENCY SYMBOL FOR EACH COURSE ---
+    currencies = list({course.currency for course in courses if course.currency})
+    symbols = dict(frappe.get_all(
+        "Currency", filters={"name": ["in", currencies]}, fields=["name", "symbol"], as_list=True
+    )) if currencies else {}
     for course in courses:
-        if course.currency:
-            currency_doc = frappe.get_doc("Currency", course.currency)
-            course["currency_symbol"] = currency_doc.symbol
-        else:
-            course["currency_symbol"] = ""  # fallback if no currency
+        course["currency_symbol"] = symbols.get(course.currency) or ""  # fallback if no currency
 
     # --- CONTEXT FOR TEMPLATE ---
     context.courses = courses
@@ -67,7 +70,6 @@ def get_context(context):
 
 
 
-
 # import frappe
 
 # def get_context(context):
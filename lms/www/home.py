@@ -2,14 +2,13 @@ import frappe
 from . import get_base_context  # Import the shared function
 
 def get_context(context):
-    context = get_base_context(context)
+    # Guest requests are cached by lms.page_renderers.GuestPageRenderer
+    context.no_cache = 1
 
-    
     try:
-        categories = frappe.get_all("LMS Category", fields=["name", "category"])
+        context = get_base_context(context)
     except Exception as e:
         frappe.log_error(f"Error fetching categories: {e}", "Home Page Error")
-        categories = []
-    
-    context.categories = categories
+        context.categories = []
+
     return context
@@ -2,17 +2,11 @@ import frappe
 from . import get_base_context  # Import the shared function
 
 def get_context(context):
+    # Guest requests are cached by lms.page_renderers.GuestPageRenderer
+    context.no_cache = 1
+    # categories for the dropdown
     context = get_base_context(context)
     
-    try:
-        # Get course categories for dropdown
-        categories = frappe.get_all("LMS Category", fields=["name", "category"])
-    except Exception as e:
-        frappe.log_error(f"Error fetching categories: {e}", "Home Page Error")
-        categories = []
-    
-    context.categories = categories
-    
     try:
         # Get initial 3 courses
         courses = frappe.get_all(
@@ -32,10 +26,17 @@ def get_context(context):
             limit_page_length=3
         )
         
+        instructor_names = dict(frappe.get_all(
+            "User",
+            filters={"name": ["in", list({course.owner for course in courses})]},
+            fields=["name", "full_name"],
+            as_list=True,
+        )) if courses else {}
+
         # Enhance course data
         for course in courses:
             # Get instructor name
-            instructor_name = frappe.db.get_value("User", course.owner, "full_name")
+            instructor_name = instructor_names.get(course.owner)
             course.instructor_name = instructor_name or "Expert Instructor"
             
             # Generate initials